@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Asset store content-addressed — Salento Stay
+
+- Ogni JPG/PDF di INBOX entra una sola volta in .store/<sha[:2]>/<sha>,
+  come file a sé: il file di INBOX resta dell'utente, con i suoi permessi,
+  e modificarlo non tocca lo store
+- Dove il filesystem lo permette (btrfs, xfs, ...) il blob è un reflink:
+  i blocchi restano in comune con INBOX finché uno dei due non cambia
+  (copy-on-write), quindi la foto non occupa due volte il disco. Su ext4 e
+  simili resta una copia vera (fatta nel kernel con copy_file_range)
+- img/case/<slug>.jpg e pdf/case/<slug>.pdf diventano hardlink al blob:
+  niente più doppioni su disco, "copiare" costa un link
+- Blob e file pubblicati sono lo stesso inode: non vanno modificati sul
+  posto (si cambierebbe anche il blob). Per cambiare una foto si cambia
+  il file in INBOX e si rifà il build
+- Limite di dimensione: i blob orfani (nessun link fuori dallo store)
+  vengono rimossi partendo dai meno usati di recente (LRU)
+
+Run: python3 asset_store.py gc [--max-mb=N]
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: niente ioctl, si copia
+    fcntl = None
+
+ROOT = Path(".").resolve()
+STORE = ROOT / ".store"
+STORE_INDEX = STORE / "index.json"
+MAX_BYTES = 2048 * 1024 * 1024
+
+FICLONE = 0x40049409  # ioctl Linux: reflink del file intero
+
+_lock = threading.Lock()
+_index = None
+
+
+def file_digest(p: Path) -> str:
+    h = hashlib.sha256()
+    with p.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def blob_path(digest: str) -> Path:
+    return STORE / digest[:2] / digest
+
+
+def _load_index():
+    global _index
+    if _index is None:
+        try:
+            _index = json.loads(STORE_INDEX.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            _index = {}
+    return _index
+
+
+def save_index():
+    with _lock:
+        if _index is None:
+            return
+        STORE.mkdir(parents=True, exist_ok=True)
+        tmp = STORE_INDEX.with_suffix(".tmp")
+        tmp.write_text(json.dumps(_index, indent=1, sort_keys=True), encoding="utf-8")
+        tmp.replace(STORE_INDEX)
+
+
+def _touch(digest: str, size: int):
+    with _lock:
+        _load_index()[digest] = {"size": size, "used": time.time()}
+
+
+def _tmp_name(dst: Path) -> Path:
+    return dst.with_name(f".tmp-{os.getpid()}-{threading.get_ident()}-{dst.name}")
+
+
+def _link_or_copy(src: Path, dst: Path):
+    # link atomico: prima un nome temporaneo, poi rename sopra il vecchio file
+    tmp = _tmp_name(dst)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        # filesystem diversi / senza hardlink: copia normale
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _clone(src: Path, dst: Path):
+    # reflink se si può, se no copy_file_range, se no copia normale
+    with src.open("rb") as fi, dst.open("wb") as fo:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(fo.fileno(), FICLONE, fi.fileno())
+                return
+            except OSError:
+                pass
+        copy_range = getattr(os, "copy_file_range", None)
+        if copy_range is not None:
+            try:
+                while copy_range(fi.fileno(), fo.fileno(), 1 << 30):
+                    pass
+                return
+            except OSError:
+                pass
+    shutil.copyfile(src, dst)
+
+
+def put(src: Path, digest: str = None) -> str:
+    """Mette src nello store (se non c'è già) e restituisce il suo sha256."""
+    digest = digest or file_digest(src)
+    blob = blob_path(digest)
+    if not blob.exists():
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        # clone/copia, non link: un inode in comune con INBOX legherebbe i
+        # file dell'utente allo store (e ai file pubblicati)
+        tmp = _tmp_name(blob)
+        _clone(src, tmp)
+        os.replace(tmp, blob)
+    _touch(digest, blob.stat().st_size)
+    return digest
+
+
+def link(digest: str, dst: Path, out=None):
+    """Pubblica il blob in dst (hardlink); non fa nulla se dst è già quel blob.
+
+    Con una OutputTxn (site_io) il link viene preparato in staging e
+    pubblicato insieme al resto del build.
+    """
+    blob = blob_path(digest)
+    if dst.exists() and os.path.samefile(blob, dst):
+        return
+    if out is not None:
+        out.link(blob, dst)
+        return
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    _link_or_copy(blob, dst)
+
+
+def gc(max_bytes: int = MAX_BYTES) -> int:
+    """Rimuove blob orfani (LRU) finché lo store sta sotto max_bytes; ritorna i byte liberati."""
+    index = _load_index()
+    blobs = []
+    total = 0
+    for blob in STORE.glob("??/*"):
+        st = blob.stat()
+        total += st.st_size
+        if st.st_nlink == 1:
+            blobs.append((index.get(blob.name, {}).get("used", 0), blob, st.st_size))
+
+    freed = 0
+    for _, blob, size in sorted(blobs, key=lambda b: b[0]):
+        if total - freed <= max_bytes:
+            break
+        blob.unlink()
+        with _lock:
+            index.pop(blob.name, None)
+        freed += size
+
+    save_index()
+    return freed
+
+
+def main():
+    if sys.argv[1:2] != ["gc"]:
+        print("Uso: python3 asset_store.py gc [--max-mb=N]")
+        return
+
+    max_bytes = MAX_BYTES
+    for a in sys.argv[2:]:
+        if a.startswith("--max-mb="):
+            max_bytes = int(a.split("=", 1)[1]) * 1024 * 1024
+
+    freed = gc(max_bytes)
+    print(f"✅ Store ripulito: {freed / 1024 / 1024:.1f} MB liberati.")
+
+
+if __name__ == "__main__":
+    main()
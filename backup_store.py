@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backup delle patch, deduplicati e compressi — Salento Stay
+
+- Al posto delle copie .bak-<stamp> accanto ai file: ogni versione entra
+  UNA volta in .backups/objects/<sha[:2]>/<sha>.gz (sha256 del contenuto),
+  compressa con gzip; con il modulo zstandard installato .zst
+- Ogni run che cambia dei file scrive uno snapshot
+  .backups/snapshots/<stamp>.json: per ogni file la versione di prima
+  (hash, dimensione). Se una versione è già nello store costa solo l'hash:
+  rilanciare una patch che non cambia nulla non aggiunge niente. I file
+  che prima non c'erano (creati dalla patch) hanno {"sha": null}
+- Retention: per ogni file si tengono le ultime KEEP versioni più l'ultima
+  di ogni giorno per KEEP_DAYS giorni; gli oggetti che nessuno snapshot
+  usa più vengono cancellati
+- restore <stamp>: rimette i file dello snapshot come erano (OutputTxn,
+  tutto o niente) e cancella quelli che allora non c'erano; prima salva
+  lo stato attuale in un nuovo snapshot, quindi anche il restore si
+  annulla con un restore. styles.min.css (quello che le pagine caricano)
+  si rifà nella stessa OutputTxn dai file ripristinati, se lo snapshot
+  non lo rimette già
+- import-bak: porta i vecchi *.bak-<stamp> nello store e li cancella
+
+Uso:
+  python3 backup_store.py list
+  python3 backup_store.py restore <stamp> [file ...]
+  python3 backup_store.py prune [--keep=10] [--keep-days=30]
+  python3 backup_store.py import-bak
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import css_compact
+from site_io import OutputTxn
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ROOT = Path(".").resolve()
+STORE = ROOT / ".backups"
+OBJECTS = STORE / "objects"
+SNAPSHOTS = STORE / "snapshots"
+
+KEEP = 10
+KEEP_DAYS = 30
+
+# vecchi backup: index.html.bak-20260119-234319
+BAK_RE = re.compile(r"^(?P<name>.+)\.bak-(?P<stamp>\d{8}-\d{6})$")
+
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def object_path(sha: str, ext: str) -> Path:
+    return OBJECTS / sha[:2] / f"{sha}{ext}"
+
+
+def find_object(sha: str):
+    for ext in (".zst", ".gz"):
+        p = object_path(sha, ext)
+        if p.exists():
+            return p
+    return None
+
+
+def compress(data: bytes):
+    if zstandard is not None:
+        return ".zst", zstandard.ZstdCompressor(level=10).compress(data)
+    # mtime=0: stesso contenuto, stessi byte compressi
+    return ".gz", gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def put(data: bytes) -> str:
+    """Mette una versione nello store (se non c'è già); ritorna lo sha256."""
+    sha = digest(data)
+    if find_object(sha):
+        return sha
+    ext, blob = compress(data)
+    dst = object_path(sha, ext)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".tmp-{os.getpid()}-{dst.name}")
+    tmp.write_bytes(blob)
+    os.replace(tmp, dst)
+    return sha
+
+
+def get(sha: str) -> bytes:
+    p = find_object(sha)
+    if p is None:
+        raise SystemExit(f"❌ Versione {sha[:12]} mancante nello store")
+    raw = p.read_bytes()
+    if p.suffix == ".zst":
+        if zstandard is None:
+            raise SystemExit(f"❌ {p.name} è zstd: serve il modulo zstandard (pip install zstandard)")
+        data = zstandard.ZstdDecompressor().decompress(raw)
+    else:
+        data = gzip.decompress(raw)
+    if digest(data) != sha:
+        raise SystemExit(f"❌ {p.name} è corrotto (hash diverso)")
+    return data
+
+
+def rel(p: Path) -> str:
+    return Path(p).resolve().relative_to(ROOT).as_posix()
+
+
+def load(stamp: str) -> dict:
+    return json.loads((SNAPSHOTS / f"{stamp}.json").read_text(encoding="utf-8"))
+
+
+def stamps():
+    return sorted(p.stem for p in SNAPSHOTS.glob("*.json"))
+
+
+def write_snapshot(snap: dict):
+    SNAPSHOTS.mkdir(parents=True, exist_ok=True)
+    dst = SNAPSHOTS / f"{snap['stamp']}.json"
+    tmp = dst.with_name(f".tmp-{os.getpid()}-{dst.name}")
+    tmp.write_text(json.dumps(snap, indent=1, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, dst)
+
+
+def new_stamp(stamp: str) -> str:
+    # due run nello stesso secondo: 20260120-001541, 20260120-001541-2, ...
+    taken = set(stamps())
+    n, out = 1, stamp
+    while out in taken:
+        n += 1
+        out = f"{stamp}-{n}"
+    return out
+
+
+def save(versions, script: str, stamp: str = None):
+    """Snapshot delle versioni {path: testo o bytes} prima di sovrascriverle;
+    None per un file che non c'è ancora (il restore lo cancella).
+
+    -> stamp dello snapshot (None se non c'è niente da salvare).
+    """
+    if not versions:
+        return None
+    files = {}
+    for path, data in versions.items():
+        if data is None:
+            files[rel(path)] = {"sha": None, "size": 0}
+            continue
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        files[rel(path)] = {"sha": put(data), "size": len(data)}
+    snap = {
+        "stamp": new_stamp(stamp or datetime.now().strftime("%Y%m%d-%H%M%S")),
+        "script": script,
+        "files": files,
+    }
+    write_snapshot(snap)
+    prune()
+    return snap["stamp"]
+
+
+def day(stamp: str) -> str:
+    return stamp[:8]
+
+
+def prune(keep: int = KEEP, keep_days: int = KEEP_DAYS) -> int:
+    """Applica la retention e cancella gli oggetti orfani; ritorna i byte liberati."""
+    if not SNAPSHOTS.exists():
+        return 0
+    snaps = {s: load(s) for s in stamps()}
+
+    # versioni di ogni file, dalla più recente
+    history = {}
+    for s in sorted(snaps, reverse=True):
+        for name in snaps[s]["files"]:
+            history.setdefault(name, []).append(s)
+
+    since = (datetime.now() - timedelta(days=keep_days)).strftime("%Y%m%d")
+    keep_set = set()
+    for name, ss in history.items():
+        kept = set(ss[:keep])
+        days = set()
+        for s in ss:
+            # la più recente di ogni giorno (ss va dalla più recente)
+            if day(s) >= since and day(s) not in days:
+                days.add(day(s))
+                kept.add(s)
+        keep_set.update((s, name) for s in kept)
+
+    for s, snap in snaps.items():
+        files = {n: f for n, f in snap["files"].items() if (s, n) in keep_set}
+        if not files:
+            (SNAPSHOTS / f"{s}.json").unlink()
+        elif files != snap["files"]:
+            snap["files"] = files
+            write_snapshot(snap)
+
+    used = {f["sha"] for s, snap in snaps.items() for n, f in snap["files"].items() if (s, n) in keep_set}
+    freed = 0
+    for p in OBJECTS.glob("??/*"):
+        if p.name.split(".", 1)[0] not in used:
+            freed += p.stat().st_size
+            p.unlink()
+    return freed
+
+
+def resolve_stamp(prefix: str) -> str:
+    found = [s for s in stamps() if s.startswith(prefix)]
+    if not found:
+        raise SystemExit(f"❌ Nessuno snapshot {prefix} (python3 backup_store.py list)")
+    if len(found) > 1 and prefix not in found:
+        raise SystemExit(f"❌ {prefix} è ambiguo: {', '.join(found)}")
+    return prefix if prefix in found else found[0]
+
+
+def restore(stamp: str, only=()):
+    """Rimette i file dello snapshot; ritorna (file ripristinati, snapshot dello stato prima)."""
+    snap = load(resolve_stamp(stamp))
+    files = {n: f for n, f in snap["files"].items() if not only or n in only}
+    missing = [n for n in only if n not in snap["files"]]
+    if missing:
+        raise SystemExit(f"❌ Non nello snapshot {snap['stamp']}: {', '.join(missing)}")
+
+    # tutte le versioni prima di toccare il sito: un oggetto rotto non lascia il restore a metà
+    # (None: il file allora non c'era)
+    data = {ROOT / n: get(f["sha"]) if f["sha"] else None for n, f in files.items()}
+    current, changed = {}, {}
+    for p, d in data.items():
+        old = p.read_bytes() if p.exists() else None
+        if old != d:
+            changed[p] = d
+            current[p] = old
+    # le pagine caricano styles.min.css: dopo un restore deve seguire
+    # styles.css e le pagine rimesse, non restare quello patchato
+    if changed and css_compact.MIN_CSS not in data:
+        texts = {p: d.decode("utf-8", errors="ignore") for p, d in changed.items()
+                 if d is not None and p.suffix in (".css", ".html", ".js")}
+        built = css_compact.build(texts)
+        old_min = css_compact.MIN_CSS.read_bytes() if css_compact.MIN_CSS.exists() else None
+        if built is not None and built[0].encode("utf-8") != old_min:
+            changed[css_compact.MIN_CSS] = built[0].encode("utf-8")
+            current[css_compact.MIN_CSS] = old_min
+    before = save(current, f"restore {snap['stamp']}")
+    with OutputTxn() as out:
+        for p, d in changed.items():
+            if d is not None:
+                out.write_bytes(p, d)
+    # i file creati dopo lo snapshot si tolgono solo a scritture pubblicate
+    for p, d in changed.items():
+        if d is None:
+            p.unlink()
+    return sorted(rel(p) for p in changed), before
+
+
+def import_bak() -> int:
+    """Porta i vecchi *.bak-<stamp> nello store (uno snapshot per stamp) e li cancella."""
+    by_stamp = {}
+    for p in sorted([*ROOT.glob("*.bak-*"), *(ROOT / "case").glob("*.bak-*")]):
+        m = BAK_RE.match(p.name)
+        if m:
+            by_stamp.setdefault(m["stamp"], {})[p.with_name(m["name"])] = p
+    for stamp, files in sorted(by_stamp.items()):
+        if save({dst: bak.read_bytes() for dst, bak in files.items()}, "import-bak", stamp):
+            for bak in files.values():
+                bak.unlink()
+    return sum(len(f) for f in by_stamp.values())
+
+
+def store_bytes() -> int:
+    return sum(p.stat().st_size for p in STORE.rglob("*") if p.is_file()) if STORE.exists() else 0
+
+
+def arg(name, default):
+    for a in sys.argv[2:]:
+        if a.startswith(f"--{name}="):
+            return a.split("=", 1)[1]
+    return default
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    if cmd == "list":
+        all_stamps = stamps()
+        for s in all_stamps:
+            snap = load(s)
+            size = sum(f["size"] for f in snap["files"].values())
+            print(f"  {s:<20} {snap['script']:<28} {len(snap['files']):>5} file {size / 1024:9.1f} KB")
+        print(f"✅ {len(all_stamps)} snapshot, store {store_bytes() / 1024:.1f} KB.")
+    elif cmd == "restore" and len(sys.argv) > 2:
+        names, before = restore(sys.argv[2], [a for a in sys.argv[3:] if not a.startswith("--")])
+        for n in names:
+            print(f"  ↩️ {n}")
+        print(f"✅ Ripristinati {len(names)} file." + (f" Stato di prima: snapshot {before}." if before else ""))
+    elif cmd == "prune":
+        freed = prune(int(arg("keep", KEEP)), int(arg("keep-days", KEEP_DAYS)))
+        print(f"✅ Backup ripuliti: {freed / 1024:.1f} KB liberati.")
+    elif cmd == "import-bak":
+        n = import_bak()
+        print(f"✅ {n} file .bak-* portati nello store ({store_bytes() / 1024:.1f} KB).")
+    else:
+        print(__doc__.split("Uso:", 1)[1].rstrip())
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del build — Salento Stay
+
+- Genera cataloghi finti (10, 1k, 10k, 50k case) in .bench/work-<n>/:
+  catalog.jsonl + INBOX con JPG/PDF finti di dimensione realistica
+  (come quelli veri del sito: ~2 MB le foto, ~3 MB i PDF)
+- Per ogni catalogo misura:
+    e2e cold / e2e warm   bulk_fix.py completo (primo build e build a vuoto)
+    hash                  sha256 di ogni asset
+    ingest                ingest_one (store + hardlink) per casa
+    render                write_case_page per casa
+    cards                 build_cards_html, card per card
+    patch index           patch_index (streaming) su index.html
+    patch_index_text      tutte le pass del runner su un index.html con n
+                          card (una passata html_stream)
+    transform_text        la passata unica di html_stream (path img, lazy,
+                          card, FAB) sullo stesso index
+- Per ogni fase: campioni, p50, p95 e throughput (elementi/s)
+- Report JSON in .bench/bench-<stamp>.json; con --compare=vecchio.json
+  segnala le fasi il cui p95 peggiora oltre --tolerance (%) ed esce con 1
+- I cataloghi che non stanno sul disco vengono saltati: usa --asset-scale
+  per rimpicciolire gli asset (es. 0.05 per 50k case)
+
+Run:
+  python3 bench.py [--sizes=10,1000,10000,50000] [--asset-scale=1.0] [--repeat=5]
+                   [--compare=.bench/bench-XXXX.json] [--tolerance=25] [--keep]
+"""
+
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(".").resolve()
+HERE = Path(__file__).resolve().parent
+BENCH_DIR = ROOT / ".bench"
+
+SIZES = (10, 1000, 10000, 50000)
+JPG_KB = 2000
+PDF_KB = 3000
+REPEAT = 5
+TOLERANCE = 25.0
+
+ZONES = ("Baia Verde", "Gallipoli", "Lido San Giovanni", "Centro Storico", "Rivabella", "Alezio", "Punta Pizzo")
+HINTS = ("🏖️ A due passi dal mare", "🚗 Parcheggio privato", "🛏️ 3 camere + 2 bagni", "🌿 Giardino e barbecue", "")
+
+
+def arg(name, default):
+    for a in sys.argv[1:]:
+        if a.startswith(f"--{name}="):
+            return a.split("=", 1)[1]
+    return default
+
+
+def pct(values, q):
+    # percentile nearest-rank: con pochi campioni resta un valore misurato
+    s = sorted(values)
+    return s[min(len(s) - 1, max(0, round(q / 100 * len(s) + 0.5) - 1))]
+
+
+def fake_jpg(rnd, kb) -> bytes:
+    body = rnd.randbytes(max(64, int(kb * 1024 * rnd.uniform(0.6, 1.4))))
+    return b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00" + body + b"\xff\xd9"
+
+
+def fake_pdf(rnd, kb) -> bytes:
+    body = rnd.randbytes(max(64, int(kb * 1024 * rnd.uniform(0.6, 1.4))))
+    return b"%PDF-1.4\n" + body + b"\n%%EOF\n"
+
+
+def make_workspace(n: int, scale: float) -> Path:
+    """Catalogo finto di n case (deterministico) con index.html vero del sito."""
+    ws = BENCH_DIR / f"work-{n}"
+    shutil.rmtree(ws, ignore_errors=True)
+    (ws / "INBOX").mkdir(parents=True)
+    shutil.copy(HERE / "index.html", ws / "index.html")
+    # anche il CSS: il build rifà styles.min.css e il bench misura pure quello
+    shutil.copy(HERE / "styles.css", ws / "styles.css")
+
+    rnd = random.Random(n)
+    with (ws / "catalog.jsonl").open("w", encoding="utf-8") as f:
+        for i in range(n):
+            name = f"CASA {i:05d}"
+            rec = {
+                "name": name,
+                "slug": f"casa-{i:05d}",
+                "loc": rnd.choice(ZONES),
+                "guests": rnd.randint(2, 14),
+                "hint": rnd.choice(HINTS),
+                "img": f"CASA-{i:05d}.jpg",
+                "pdf": f"CASA-{i:05d}.pdf",
+            }
+            (ws / "INBOX" / rec["img"]).write_bytes(fake_jpg(rnd, JPG_KB * scale))
+            (ws / "INBOX" / rec["pdf"]).write_bytes(fake_pdf(rnd, PDF_KB * scale))
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    return ws
+
+
+def run_e2e(ws: Path) -> float:
+    t0 = time.perf_counter()
+    r = subprocess.run([sys.executable, str(HERE / "bulk_fix.py")], cwd=ws, capture_output=True, text=True)
+    if r.returncode:
+        raise SystemExit(f"bulk_fix.py fallito in {ws}:\n{r.stdout}{r.stderr}")
+    return time.perf_counter() - t0
+
+
+def worker():
+    # gira DENTRO il workspace (cwd): i moduli del sito calcolano ROOT all'import
+    sys.path.insert(0, str(HERE))
+    import bulk_fix
+    import catalog
+    import html_stream
+    import patch_runner
+    from asset_store import file_digest
+    from site_io import OutputTxn
+
+    repeat = int(arg("repeat", REPEAT))
+    samples = {}
+
+    def timed(name, fn, *args):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        samples.setdefault(name, []).append(time.perf_counter() - t0)
+        return out
+
+    conn = bulk_fix.open_build_db()
+    props = list(catalog.iter_props(conn))
+
+    digests = {}
+    for p in props:
+        for k in ("img", "pdf"):
+            src = bulk_fix.INBOX / p[k]
+            digests[src] = timed("hash", file_digest, src)
+
+    with OutputTxn(bulk_fix.ROOT) as out:
+        for p in props:
+            entry = {
+                "record": p["digest"],
+                "img": digests[bulk_fix.INBOX / p["img"]],
+                "pdf": digests[bulk_fix.INBOX / p["pdf"]],
+                "page": bulk_fix.PAGE_TEMPLATE_DIGEST,
+            }
+            timed("ingest", bulk_fix.ingest_one, out, p, entry, {})
+        for p in props:
+            timed("render", bulk_fix.write_case_page, out, p)
+
+        cards = bulk_fix.build_cards_html(props)
+        while True:
+            t0 = time.perf_counter()
+            if next(cards, None) is None:
+                break
+            samples.setdefault("cards", []).append(time.perf_counter() - t0)
+
+    for _ in range(repeat):
+        with OutputTxn(bulk_fix.ROOT) as out:
+            timed("patch index", bulk_fix.patch_index, conn, out)
+
+    html = (bulk_fix.ROOT / "index.html").read_text(encoding="utf-8")
+    for fn in (patch_runner.patch_index_text, html_stream.transform_text):
+        for _ in range(repeat):
+            timed(fn.__name__, fn, html)
+
+    print(json.dumps({"samples": samples}))
+
+
+# fasi che lavorano su tutto il catalogo in un colpo: throughput in case/s
+DOC_STAGES = {"e2e cold", "e2e warm", "patch index", "patch_index_text", "transform_text"}
+
+
+def summarize(samples, n):
+    stages = {}
+    for name, values in samples.items():
+        total = sum(values)
+        items = n * len(values) if name in DOC_STAGES else len(values)
+        stages[name] = {
+            "samples": len(values),
+            "total_s": total,
+            "p50_ms": pct(values, 50) * 1000,
+            "p95_ms": pct(values, 95) * 1000,
+            "per_s": items / total if total else None,
+        }
+    return stages
+
+
+def compare(results, old, tolerance: float) -> int:
+    worse = 0
+    print(f"\nConfronto (tolleranza p95 {tolerance:.0f}%):")
+    for n, stages in results.items():
+        for name, s in stages.items():
+            before = old.get(n, {}).get(name)
+            if not before or not before["p95_ms"]:
+                continue
+            delta = (s["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+            flag = "⚠️ " if delta > tolerance else "  "
+            worse += delta > tolerance
+            print(f"{flag}{n:>6} {name:<32} p95 {before['p95_ms']:9.2f} → {s['p95_ms']:9.2f} ms ({delta:+.0f}%)")
+    return worse
+
+
+def main():
+    if "--worker" in sys.argv:
+        worker()
+        return
+
+    sizes = [int(s) for s in arg("sizes", ",".join(map(str, SIZES))).split(",") if s]
+    scale = float(arg("asset-scale", 1.0))
+    tolerance = float(arg("tolerance", TOLERANCE))
+    # il riferimento si legge subito: il nuovo report potrebbe sovrascriverlo
+    old = arg("compare", None)
+    old = json.loads(Path(old).read_text(encoding="utf-8"))["sizes"] if old else None
+    BENCH_DIR.mkdir(exist_ok=True)
+
+    results = {}
+    for n in sizes:
+        need = n * (JPG_KB + PDF_KB) * scale * 1024 * 1.2
+        free = shutil.disk_usage(BENCH_DIR).free
+        if need > free:
+            print(f"⚠️ {n} case: servono ~{need / 1e9:.1f} GB, liberi {free / 1e9:.1f} GB. "
+                  f"Salto (prova --asset-scale={max(0.01, free / need * scale * 0.8):.2f}).")
+            continue
+
+        print(f"➡️ {n} case: genero il catalogo…")
+        ws = make_workspace(n, scale)
+        try:
+            samples = {"e2e cold": [run_e2e(ws)], "e2e warm": [run_e2e(ws)]}
+            r = subprocess.run([sys.executable, str(Path(__file__).resolve()), "--worker", *sys.argv[1:]],
+                               cwd=ws, capture_output=True, text=True)
+            if r.returncode:
+                raise SystemExit(f"Benchmark fallito ({n} case):\n{r.stderr}")
+            samples.update(json.loads(r.stdout.strip().splitlines()[-1])["samples"])
+        finally:
+            if "--keep" not in sys.argv:
+                shutil.rmtree(ws, ignore_errors=True)
+
+        results[str(n)] = stages = summarize(samples, n)
+        print(f"  {'fase':<32} {'campioni':>8} {'p50':>11} {'p95':>11} {'throughput':>14}")
+        for name, s in stages.items():
+            rate = f"{s['per_s']:,.0f}/s" if s["per_s"] else "-"
+            print(f"  {name:<32} {s['samples']:>8} {s['p50_ms']:8.2f} ms {s['p95_ms']:8.2f} ms {rate:>14}")
+
+    report = BENCH_DIR / f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+    report.write_text(json.dumps({
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "asset_scale": scale,
+        "cpus": os.cpu_count(),
+        "sizes": results,
+    }, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"✅ Report: {report}")
+
+    if old and compare(results, old, tolerance):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
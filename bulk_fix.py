@@ -1,130 +1,318 @@
 from pathlib import Path
-import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from urllib.parse import quote
+import hashlib
+import itertools
+import os
+import sys
+import time
 import re
 
-PROPS = [
-  {"name":"ATENA", "slug":"atena", "loc":"Baia Verde", "guests":9, "hint":"🛏️ 3 camere + 2 bagni", "img":"ATENA.jpg", "pdf":"ATENA.pdf"},
-  {"name":"BAIA VERDE", "slug":"baia-verde", "loc":"Baia Verde", "guests":6, "hint":"🚗 Parcheggio privato custodito", "img":"BAIA-VERDE.jpg", "pdf":"BAIA-VERDE.pdf"},
-  {"name":"VILLA AZZURRA", "slug":"villa-azzurra", "loc":"Baia Verde", "guests":10, "hint":"🌿 Giardino attrezzato + terrazzo", "img":"VILLA-AZZURRA.jpg", "pdf":"VILLA-AZZURRA.pdf"},
-  {"name":"ZEUS", "slug":"zeus", "loc":"Baia Verde", "guests":7, "hint":"🚿 Doccia esterna + giardino recintato", "img":"VILLETTA-ZEUS.jpg", "pdf":"VILLETTA-ZEUS.pdf"},
-  {"name":"SIRENA", "slug":"sirena", "loc":"Baia Verde", "guests":5, "hint":"🌿 Indipendente con giardino retrostante", "img":"SIRENA.jpg", "pdf":"SIRENA.pdf"},
-  {"name":"ARMONIA", "slug":"armonia", "loc":"Gallipoli", "guests":5, "hint":"🌅 Balcone vista mare", "img":"ARMONIA.jpg", "pdf":"ARMONIA.pdf"},
-  {"name":"VILLETTA GEMMA C", "slug":"villetta-gemma-c", "loc":"Gallipoli", "guests":4, "hint":"🆕 Nuova costruzione + doccia esterna", "img":"VILLETTA-GEMMA-C.jpg", "pdf":"VILLETTA-GEMMA-C.pdf"},
-  {"name":"BAIACRI", "slug":"baiacri", "loc":"Gallipoli", "guests":6, "hint":"🌅 Balcone vista mare (tende parasole)", "img":"BAIACRI.jpg", "pdf":"BAIACRI.pdf"},
-  {"name":"MIRAMARE", "slug":"miramare", "loc":"Gallipoli", "guests":8, "hint":"🛁 2 bagni + 3 camere", "img":"MIRAMARE.jpg", "pdf":"MIRAMARE.pdf"},
-  {"name":"LA PERLA", "slug":"la-perla", "loc":"Gallipoli", "guests":10, "hint":"❄️ Clima in ogni ambiente", "img":"LA-PERLA.jpg", "pdf":"LA-PERLA.pdf"},
-  {"name":"MONDONUOVO", "slug":"mondonuovo", "loc":"Gallipoli", "guests":7, "hint":"🏊 Piscina nel residence", "img":"MONDONUOVO.jpg", "pdf":"MONDONUOVO.pdf"},
-]
+import asset_store
+import catalog
+import css_compact
+import facets
+import image_size
+import image_variants
+import photo_placeholder
+import photo_tune
+import search_index
+import tpl
+from fix_whatsapp_mobile import fab_href, h1_title
+from site_io import OutputTxn
+from profiler import Profiler
+from asset_store import file_digest
 
 ROOT = Path(".").resolve()
 INBOX = ROOT / "INBOX"
 IMG_DIR = ROOT / "img" / "case"
 PDF_DIR = ROOT / "pdf" / "case"
 CASE_DIR = ROOT / "case"
+BATCH = 256
 
-def must_exist(p: Path):
-  if not p.exists():
-    raise SystemExit(f"File mancante: {p}")
-
-def write_case_page(prop):
-  slug = prop["slug"]
-  img = f"/img/case/{slug}.jpg"
-  pdf = f"/pdf/case/{slug}.pdf"
-  title = prop["name"]
-  loc = prop["loc"]
-  guests = prop["guests"]
-  hint = prop["hint"]
-
-  wa_msg = f"Ciao! Vorrei disponibilità per {title} ({loc}) per {guests} ospiti."
-  wa_url = "https://wa.me/393292272939?text=" + re.sub(r" ", "%20", wa_msg)
-
-  html = f"""<!doctype html>
-<html lang="it">
-<head>
-  <meta charset="utf-8" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <title>{title} | Affitti Gallipoli</title>
-  <link rel="stylesheet" href="/styles.css" />
-</head>
-<body>
-  <header class="topbar">
-    <div class="container topbar__inner">
-      <a class="brand" href="/">
-        <div class="brand__logo">AG</div>
-        <div>
-          <div class="brand__name">Affitti Gallipoli</div>
-          <div class="brand__tagline">Case vacanza</div>
-        </div>
-      </a>
-      <a class="btn btn--ghost" href="/">← Home</a>
-    </div>
-  </header>
-
-  <main class="container">
-    <section class="hero">
-      <div class="hero__grid">
-        <div>
-          <div class="pill">📍 {loc} &nbsp;•&nbsp; 👥 {guests} ospiti</div>
-          <h1>{title}</h1>
-          <p class="lead">{hint}</p>
-          <div class="hero__cta">
-            <a class="btn btn--primary" href="{pdf}" target="_blank" rel="noopener">Scarica scheda PDF</a>
-            <a class="btn btn--secondary" href="{wa_url}" target="_blank" rel="noopener">Chiedi disponibilità</a>
-          </div>
-        </div>
-        <div class="hero__media">
-          <img src="{img}" alt="{title}">
-        </div>
-      </div>
-    </section>
-  </main>
-</body>
-</html>
+# stato del build (hash di record, sorgenti e template) nello stesso DB del catalogo
+BUILD_SCHEMA = """
+CREATE TABLE IF NOT EXISTS build_props (
+  slug TEXT PRIMARY KEY, record TEXT, img TEXT, pdf TEXT, page TEXT
+);
+CREATE TABLE IF NOT EXISTS build_pending (
+  slug TEXT PRIMARY KEY, record TEXT, img TEXT, pdf TEXT, page TEXT
+);
+CREATE TABLE IF NOT EXISTS build_sources (
+  path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT
+);
+CREATE TABLE IF NOT EXISTS fragments (
+  key TEXT PRIMARY KEY, html TEXT
+);
 """
-  (CASE_DIR / f"{slug}.html").write_text(html, encoding="utf-8")
-
-def build_cards_html():
-  cards = []
-  for p in PROPS:
-    slug = p["slug"]
-    cards.append(f"""
-      <article class="card">
-        <img src="/img/case/{slug}.jpg" alt="{p['name']}">
-        <div class="card__body">
-          <h3>{p['name']}</h3>
-          <ul class="meta">
-            <li>📍 {p['loc']}</li>
-            <li>👥 {p['guests']} ospiti</li>
-            <li>{p['hint']}</li>
-          </ul>
-          <div class="card__foot">
-            <a class="link" href="/case/{slug}.html">Vedi dettagli →</a>
-          </div>
-        </div>
-      </article>
-    """.strip())
-  return '<div class="cards">\n' + "\n".join(cards) + "\n</div>\n"
-
-def patch_index():
+
+WA_NUMBER = "393292272939"
+
+def text_digest(s: str) -> str:
+  return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+def open_build_db():
+  conn = catalog.connect()
+  conn.executescript(BUILD_SCHEMA)
+  if catalog.CATALOG_FILE.exists():
+    catalog.sync_file(conn)
+  if "--force" in sys.argv:
+    # --force: si dimentica tutto e si ricostruisce da zero
+    with conn:
+      conn.execute("DELETE FROM build_props")
+      conn.execute("DELETE FROM build_sources")
+      conn.execute("DELETE FROM meta WHERE key = 'index_digest'")
+  with conn:
+    # residui di un build interrotto prima del commit: non valgono nulla
+    conn.execute("DELETE FROM build_pending")
+  return conn
+
+def batched(it, n):
+  it = iter(it)
+  while True:
+    chunk = list(itertools.islice(it, n))
+    if not chunk:
+      return
+    yield chunk
+
+def jobs_from_argv() -> int:
+  # --jobs=N limita i worker; di default uno per core
+  for a in sys.argv[1:]:
+    if a.startswith("--jobs="):
+      return max(1, int(a.split("=", 1)[1]))
+  return os.cpu_count() or 1
+
+def run_pool(pool, fn, args):
+  # fn(*a) per ogni a, nel pool di processi se c'è e se vale la pena
+  if pool and len(args) > 1:
+    return list(pool.map(fn, *zip(*args)))
+  return list(itertools.starmap(fn, args))
+
+def hash_sources(conn, paths, pool):
+  # rilegge un file solo se size/mtime sono cambiati dall'ultimo build;
+  # l'hashing è lavoro CPU, quindi va nel pool di processi
+  keys = {p: p.relative_to(ROOT).as_posix() for p in paths}
+  marks = ",".join("?" * len(keys))
+  known = {r["path"]: r for r in conn.execute(
+    f"SELECT path, size, mtime_ns, sha256 FROM build_sources WHERE path IN ({marks})", list(keys.values()))}
+
+  digests = {}
+  stale = []
+  for p, key in keys.items():
+    st = p.stat()
+    old = known.get(key)
+    if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+      digests[p] = old["sha256"]
+    else:
+      stale.append((p, st))
+
+  if len(stale) > 1 and pool:
+    fresh = list(pool.map(file_digest, [p for p, _ in stale]))
+  else:
+    fresh = [file_digest(p) for p, _ in stale]
+
+  with conn:
+    conn.executemany(
+      "INSERT OR REPLACE INTO build_sources (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+      [(keys[p], st.st_size, st.st_mtime_ns, d) for (p, st), d in zip(stale, fresh)])
+  for (p, _), digest in zip(stale, fresh):
+    digests[p] = digest
+  return digests
+
+class DbFragments:
+  # backing persistente della FragmentCache: card già renderizzate nel DB
+  def __init__(self, conn):
+    self.conn = conn
+
+  def get(self, key):
+    row = self.conn.execute("SELECT html FROM fragments WHERE key = ?", (key,)).fetchone()
+    return row["html"] if row else None
+
+  def __setitem__(self, key, html):
+    self.conn.execute("INSERT OR REPLACE INTO fragments (key, html) VALUES (?, ?)", (key, html))
+
+def page_context(prop, base, meta=None, size=None, placeholder=None):
+  # meta: dimensioni della foto se le sue varianti sono pronte (image_variants);
+  # size: (larghezza, altezza) della foto pubblicata (image_size);
+  # placeholder: colore e LQIP per lo sfondo della card (photo_placeholder)
+  wa_msg = f"Ciao! Vorrei disponibilità per {prop['name']} ({prop['loc']}) per {prop['guests']} ospiti."
+  return {
+    "base": base,
+    "title": prop["name"],
+    "name": prop["name"],
+    "slug": prop["slug"],
+    "loc": prop["loc"],
+    "guests": prop["guests"],
+    "hint": prop["hint"],
+    "img": f"{base}img/case/{prop['slug']}.jpg",
+    "card_sources": image_variants.sources("card", prop["slug"], meta, base),
+    "card_srcset": image_variants.srcset_attrs("card", prop["slug"], meta, base),
+    "hero_sources": image_variants.sources("hero", prop["slug"], meta, base),
+    "hero_srcset": image_variants.srcset_attrs("hero", prop["slug"], meta, base),
+    "lb_srcset": image_variants.srcset_attrs("lightbox", prop["slug"], meta, base, prefix="lb-"),
+    "img_size": image_size.attrs(size),
+    "card_placeholder": photo_placeholder.style(placeholder),
+    "pdf": f"{base}pdf/case/{prop['slug']}.pdf",
+    "wa_url": f"https://wa.me/{WA_NUMBER}?text=" + quote(wa_msg),
+    # FAB e footer come li riscrive fix_whatsapp_mobile: il runner sulle
+    # schede appena generate non ha niente da cambiare
+    "fab_url": fab_href(h1_title(prop["name"])),
+    "wa_contact_url": fab_href(),
+  }
+
+def write_case_page(out, prop, meta=None, size=None):
+  ctx = page_context(prop, "../", meta, size)
+  ctx["body"] = tpl.load("case.html").render(ctx)
+  html = tpl.load("layout.html").render(ctx)
+  out.write_text(CASE_DIR / f"{prop['slug']}.html", html)
+
+CARDS_START = "<!-- AUTO_CARDS_START -->"
+CARDS_END = "<!-- AUTO_CARDS_END -->"
+CARDS_DIV = re.compile(r'<div\b[^>]*class="[^"]*\bcards\b[^"]*"[^>]*>', re.I)
+DIV_TAG = re.compile(r"<(/?)div\b", re.I)
+
+def build_cards_html(props, frags=None, media=None):
+  # genera le card una alla volta: chi scrive non tiene mai tutta la griglia in memoria;
+  # media(p): (varianti, misure, segnaposto) della foto (entrano nella chiave del frammento)
+  card = tpl.load("card.html")
+  frags = frags or tpl.FragmentCache()
+  for p in props:
+    photo = media(p) if media else (None, None, None)
+    mkey = media_key(*photo)
+    key = f"{p['digest']}:{mkey}" if mkey else p["digest"]
+    yield "\n" + frags.render(card, key, page_context(p, "", *photo))
+
+def write_cards(out, cards):
+  out.write(CARDS_START + "\n")
+  for c in cards:
+    out.write(c)
+  out.write("\n" + CARDS_END + "\n")
+
+def skip_div(lines, depth):
+  # consuma righe fino alla </div> che chiude la griglia; ritorna il resto della riga
+  for line in lines:
+    for m in DIV_TAG.finditer(line):
+      depth += -1 if m.group(1) else 1
+      if depth == 0:
+        return line[m.start():]
+  raise SystemExit("index.html: la griglia delle card non viene mai chiusa.")
+
+def patch_index(conn, out):
+  # streaming: prefisso copiato riga per riga, card dal generatore, suffisso;
+  # il file nuovo sta in staging e viene pubblicato al commit della OutputTxn
   idx = ROOT / "index.html"
-  html = idx.read_text(encoding="utf-8")
+  if not stream_index(conn, idx, out.path(idx)):
+    raise SystemExit('Non trovo la griglia <div class="cards"> in index.html')
 
-  start = "<!-- AUTO_CARDS_START -->"
-  end = "<!-- AUTO_CARDS_END -->"
-  cards = build_cards_html()
+def media_key(meta, size, placeholder):
+  # per le chiavi di card e pagine: cambia se cambia ciò che mostrano della
+  # foto (varianti, misure, segnaposto); "" se non c'è niente di tutto questo
+  parts = (image_variants.media_key(meta), image_size.attrs(size).strip(), photo_placeholder.digest(placeholder))
+  return ":".join(parts) if any(parts) else ""
 
-  if start in html and end in html:
-    before = html.split(start)[0]
-    after = html.split(end)[1]
-    new_html = before + start + "\n" + cards + end + after
-    idx.write_text(new_html, encoding="utf-8")
-    return
+def photo_media(sha, cards=0):
+  # (varianti, misure, segnaposto) della foto sha, come le ha lasciate il build;
+  # cards: case nella home (con tante, segnaposto senza LQIP)
+  return image_variants.manifest(sha), image_size.lookup(sha), photo_placeholder.for_catalog(photo_placeholder.manifest(sha), cards)
 
-  # fallback: replace first <div class="cards">...</div>
-  new_html = re.sub(r"<div class=\"cards\">.*?</div>\s*", cards, html, count=1, flags=re.S)
-  idx.write_text(new_html, encoding="utf-8")
+def photo_digest(conn, slug):
+  # foto di questo build (build_pending), o dell'ultimo se la casa non è passata di qui
+  for table in ("build_pending", "build_props"):
+    row = conn.execute(f"SELECT img FROM {table} WHERE slug = ?", (slug,)).fetchone()
+    if row:
+      return row["img"]
+  return ""
 
-def main():
+def stream_index(conn, idx, tmp) -> bool:
+  done = False
+  with conn, idx.open(encoding="utf-8") as src, tmp.open("w", encoding="utf-8") as out:
+    n = conn.execute("SELECT COUNT(*) FROM props").fetchone()[0]
+    cards = build_cards_html(catalog.iter_props(conn), tpl.FragmentCache(size=256, backing=DbFragments(conn)),
+                             lambda p: photo_media(photo_digest(conn, p["slug"]), n))
+    lines = iter(src)
+    for line in lines:
+      if done:
+        out.write(line)
+        continue
+
+      if CARDS_START in line:
+        out.write(line[:line.index(CARDS_START)])
+        write_cards(out, cards)
+        for line in lines:
+          if CARDS_END in line:
+            out.write(line[line.index(CARDS_END) + len(CARDS_END):].lstrip("\n"))
+            break
+        else:
+          raise SystemExit(f"index.html: {CARDS_START} senza {CARDS_END}.")
+        done = True
+        continue
+
+      m = CARDS_DIV.search(line)
+      if m:
+        # prima volta: i marker vanno DENTRO la griglia, così le barre filtri
+        # inserite prima di .cards restano fuori dalla zona rigenerata
+        out.write(line[:m.end()] + "\n")
+        write_cards(out, cards)
+        out.write(skip_div(itertools.chain([line[m.end():]], lines), 1))
+        done = True
+        continue
+
+      out.write(line)
+
+    # via i frammenti di template che non esistono più
+    conn.execute("DELETE FROM fragments WHERE substr(key, 1, 64) != ?", (tpl.load("card.html").digest,))
+  return done
+
+# hash dei template (include compresi): se cambiano si rigenera tutto
+PAGE_TEMPLATE_DIGEST = text_digest(tpl.load("layout.html").digest + tpl.load("case.html").digest)
+CARDS_TEMPLATE_DIGEST = tpl.load("card.html").digest
+
+def ingest_one(out, prop, entry, old):
+  # asset di una casa (I/O): gira in un thread del pool
+  t0 = time.perf_counter()
+  slug = prop["slug"]
+  result = {"slug": slug, "copied": 0, "page": False, "error": None}
+  try:
+    dst_img = IMG_DIR / f"{slug}.jpg"
+    dst_pdf = PDF_DIR / f"{slug}.pdf"
+    tuned = photo_tune.master(entry["img"])
+    if tuned is not None:
+      # foto ricompressa (photo_tune.py): hardlink dalla sua cache
+      if not (dst_img.exists() and os.path.samefile(tuned, dst_img)):
+        out.link(tuned, dst_img)
+        result["copied"] += 1
+    # una sola scrittura nello store, poi hardlink in img/ e pdf/
+    elif entry["img"] != old.get("img") or not dst_img.exists():
+      asset_store.link(asset_store.put(INBOX / prop["img"], entry["img"]), dst_img, out)
+      result["copied"] += 1
+    result["copied"] += image_variants.publish(out, entry["img"], slug, IMG_DIR)
+    if entry["pdf"] != old.get("pdf") or not dst_pdf.exists():
+      asset_store.link(asset_store.put(INBOX / prop["pdf"], entry["pdf"]), dst_pdf, out)
+      result["copied"] += 1
+  except OSError as e:
+    result["error"] = f"{type(e).__name__}: {e}"
+  result["seconds"] = time.perf_counter() - t0
+  return result
+
+def render_one(out, prop, entry, old, result):
+  # pagina di una casa: passata separata dagli asset, così il profilo
+  # distingue la copia dal render
+  if result["error"]:
+    return result
+  t0 = time.perf_counter()
+  try:
+    page = CASE_DIR / f"{prop['slug']}.html"
+    if (entry["record"], entry["page"]) != (old.get("record"), old.get("page")) or not page.exists():
+      variants, size, _ = photo_media(entry["img"])
+      write_case_page(out, prop, variants, size)
+      result["page"] = True
+  except OSError as e:
+    result["error"] = f"{type(e).__name__}: {e}"
+  result["seconds"] += time.perf_counter() - t0
+  return result
+
+def build(prof):
   if not INBOX.exists():
     raise SystemExit("Crea la cartella INBOX e mettici dentro JPG+PDF.")
 
@@ -132,22 +320,165 @@ def main():
   PDF_DIR.mkdir(parents=True, exist_ok=True)
   CASE_DIR.mkdir(parents=True, exist_ok=True)
 
-  for p in PROPS:
-    src_img = INBOX / p["img"]
-    src_pdf = INBOX / p["pdf"]
-    must_exist(src_img)
-    must_exist(src_pdf)
+  with prof.stage("catalog"):
+    conn = open_build_db()
+    # tutti i file mancanti in un colpo solo, non uno per run
+    missing = [INBOX / p[k] for p in catalog.iter_props(conn) for k in ("img", "pdf") if not (INBOX / p[k]).exists()]
+    cards = conn.execute("SELECT COUNT(*) FROM props").fetchone()[0]
+  if missing:
+    raise SystemExit("File mancanti:\n" + "\n".join(f"  {m}" for m in missing))
+
+  jobs = jobs_from_argv()
+  total = pages = copied = 0
+  errors = []
+  tuned = []
+  timings = []
+  # home, indice di ricerca e tabelle dei filtri: stesse case, stessa
+  # chiave (template delle card e formati dei due JSON compresi)
+  index_hash = hashlib.sha256(
+    f"{CARDS_TEMPLATE_DIGEST}:search-v{search_index.VERSION}:facets-v{facets.VERSION}".encode("utf-8"))
 
-    dst_img = IMG_DIR / f"{p['slug']}.jpg"
-    dst_pdf = PDF_DIR / f"{p['slug']}.pdf"
+  # a blocchi: memoria costante qualunque sia la dimensione del catalogo;
+  # tutto l'output passa da una OutputTxn e viene pubblicato in un colpo solo
+  with OutputTxn(ROOT, prof) as out, \
+       (ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else nullcontext()) as cpu_pool, \
+       ThreadPoolExecutor(max_workers=jobs) as io_pool:
+    for chunk in batched(catalog.iter_props(conn), BATCH):
+      marks = ",".join("?" * len(chunk))
+      old_props = {r["slug"]: dict(r) for r in conn.execute(
+        f"SELECT * FROM build_props WHERE slug IN ({marks})", [p["slug"] for p in chunk])}
 
-    shutil.copy2(src_img, dst_img)
-    shutil.copy2(src_pdf, dst_pdf)
+      with prof.stage("hash"):
+        digests = hash_sources(conn, [INBOX / p[k] for p in chunk for k in ("img", "pdf")], cpu_pool)
+      # foto nuove ricompresse, varianti e segnaposto (CPU: pool di processi), una
+      # volta per foto anche se due case la condividono; quelle già in
+      # cache costano una lettura
+      imgs = [(INBOX / p["img"], digests[INBOX / p["img"]]) for p in chunk]
+      with prof.stage("tune"):
+        stale = {sha: (src, sha) for src, sha in imgs if photo_tune.manifest(sha) is None}
+        if stale and photo_tune.Image is not None:
+          run_pool(cpu_pool, photo_tune.tune, list(stale.values()))
+          tuned += [(p["slug"], photo_tune.manifest(sha)) for p, (_, sha) in zip(chunk, imgs)
+                    if sha in stale and photo_tune.manifest(sha)]
+      with prof.stage("variants"):
+        stale = {sha: (src, sha) for src, sha in imgs if not image_variants.current(image_variants.manifest(sha))}
+        if stale and image_variants.Image is not None:
+          run_pool(cpu_pool, image_variants.render, list(stale.values()))
+      with prof.stage("placeholders"):
+        stale = {sha: (src, sha) for src, sha in imgs if photo_placeholder.manifest(sha) is None}
+        if stale and photo_placeholder.Image is not None:
+          run_pool(cpu_pool, photo_placeholder.make, list(stale.values()))
 
-    write_case_page(p)
+      entries = []
+      for p in chunk:
+        img = digests[INBOX / p["img"]]
+        # misure dalle intestazioni (cache per sha): l'originale ruotato
+        # secondo l'EXIF ha le stesse della foto ricompressa
+        image_size.measure(INBOX / p["img"], img)
+        variants, size, placeholder = photo_media(img, cards)
+        page_media = media_key(variants, size, None)
+        entries.append({
+          "record": p["digest"],
+          "img": img,
+          "pdf": digests[INBOX / p["pdf"]],
+          # la pagina dipende anche dalle varianti e dalle misure della foto
+          # (il segnaposto sta solo nella card)
+          "page": text_digest(PAGE_TEMPLATE_DIGEST + page_media) if page_media else PAGE_TEMPLATE_DIGEST,
+          "media": media_key(variants, size, placeholder),
+        })
 
-  patch_index()
-  print("OK: create pagine + copiati asset + aggiornata home.")
+      olds = [old_props.get(p["slug"], {}) for p in chunk]
+      with prof.stage("ingest"):
+        results = list(io_pool.map(ingest_one, [out] * len(chunk), chunk, entries, olds))
+      with prof.stage("render cases"):
+        results = list(io_pool.map(render_one, [out] * len(chunk), chunk, entries, olds, results))
+
+      # una casa fallita resta "sporca" e viene ritentata al prossimo build;
+      # le altre diventano "fatte" solo dopo il commit dell'output
+      with conn:
+        conn.executemany(
+          "INSERT OR REPLACE INTO build_pending (slug, record, img, pdf, page) VALUES (?, ?, ?, ?, ?)",
+          [(p["slug"], e["record"], e["img"], e["pdf"], e["page"])
+           for p, e, r in zip(chunk, entries, results) if not r["error"]])
+
+      for e in entries:
+        index_hash.update((f"{e['record']}:{e['media']}" if e["media"] else e["record"]).encode("utf-8"))
+      total += len(chunk)
+      pages += sum(r["page"] for r in results)
+      copied += sum(r["copied"] for r in results)
+      errors += [r for r in results if r["error"]]
+      if "--timings" in sys.argv:
+        timings += [(r["seconds"], r) for r in results]
+
+    index_digest = index_hash.hexdigest()
+    index_changed = not errors and index_digest != catalog.get_meta(conn, "index_digest")
+    if index_changed:
+      with prof.stage("patch index"):
+        patch_index(conn, out)
+    if not errors and (index_changed or not search_index.SEARCH_INDEX.exists()):
+      with prof.stage("search index"):
+        index = search_index.build(catalog.iter_props(conn))
+        out.write_text(search_index.SEARCH_INDEX, search_index.dumps(index))
+    if not errors and (index_changed or not facets.FACETS.exists()):
+      with prof.stage("facets"):
+        out.write_text(facets.FACETS, facets.dumps(facets.build(catalog.iter_props(conn))))
+
+  with prof.stage("state"), conn:
+    conn.execute("INSERT OR REPLACE INTO build_props SELECT * FROM build_pending")
+    conn.execute("DELETE FROM build_pending")
+    conn.execute("DELETE FROM build_props WHERE slug NOT IN (SELECT slug FROM props)")
+    if index_changed:
+      catalog.set_meta(conn, "index_digest", index_digest)
+  with prof.stage("gc"):
+    asset_store.gc()
+    if not errors:
+      photos = {r["slug"]: r["img"] for r in conn.execute("SELECT slug, img FROM build_props")}
+      image_variants.gc(photos, IMG_DIR)
+      photo_tune.gc(set(photos.values()))
+      photo_placeholder.gc(set(photos.values()))
+      image_size.gc(set(photos.values()))
+    image_size.save()
+  # dopo il commit: le pagine nuove sono al loro posto e contano per i
+  # selettori usati. Niente da rifare se CSS, script, home e template sono
+  # quelli dell'ultima volta e nessuna pagina è cambiata
+  with prof.stage("css"):
+    css_key = text_digest(PAGE_TEMPLATE_DIGEST + "".join(
+      file_digest(ROOT / f) for f in ("styles.css", *css_compact.PAGES, *css_compact.SCRIPTS) if (ROOT / f).exists()))
+    # senza styles.css (es. i workspace di bench.py più vecchi) non c'è niente da compattare
+    built = None
+    if pages or css_key != catalog.get_meta(conn, "css_digest") or not css_compact.MIN_CSS.exists():
+      built = css_compact.build()
+    if built is not None:
+      css, stats = built
+      with OutputTxn(ROOT, prof) as out:
+        if not css_compact.MIN_CSS.exists() or css_compact.MIN_CSS.read_text(encoding="utf-8") != css:
+          out.write_text(css_compact.MIN_CSS, css)
+      with conn:
+        catalog.set_meta(conn, "css_digest", css_key)
+      prof.note(css=stats)
+  prof.note(props=total, pages=pages, assets=copied, errors=len(errors), index_changed=index_changed, jobs=jobs,
+            tuned=len(tuned), tuned_saved=sum(m["in"] - m["out"] for _, m in tuned))
+
+  # foto ricompresse in questo build: quanto si è risparmiato per casa
+  for slug, meta in tuned:
+    print(photo_tune.line(slug, meta))
+
+  for _, r in sorted(timings, key=lambda t: t[0], reverse=True):
+    print(f"  {r['slug']:<24} {r['seconds'] * 1000:8.1f} ms  asset: {r['copied']}  pagina: {'sì' if r['page'] else 'no'}")
+
+  if errors:
+    for r in errors:
+      print(f"ERRORE {r['slug']}: {r['error']}")
+    raise SystemExit(f"{len(errors)} case non importate su {total}; home non aggiornata.")
+
+  print(f"OK: {pages} pagine rigenerate ({total - pages} invariate), {copied} asset collegati, "
+        f"home {'aggiornata' if index_changed else 'invariata'} ({jobs} worker).")
+
+def main():
+  # --profile[=report.json] [--cprofile]: tempi, I/O e memoria per fase
+  prof = Profiler.from_argv("bulk_fix")
+  with prof:
+    build(prof)
 
 if __name__ == "__main__":
   main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Catalogo case — Salento Stay
+
+- Le case vivono in catalog.jsonl (una riga JSON per casa, versionato)
+- Il build lavora su un indice SQLite (.catalog.sqlite, rigenerabile):
+  slug chiave primaria, indici su zona/ospiti/ordine
+- Import in streaming da export CSV o JSONL (upsert: changed_at cambia
+  solo se il contenuto della casa cambia davvero); dopo l'import
+  catalog.jsonl viene riscritto dal DB
+- iter_props() legge a blocchi (keyset pagination): memoria costante
+  anche con decine di migliaia di case
+
+Run:
+  python3 catalog.py import export.csv [--replace]
+  python3 catalog.py import export.jsonl [--replace]
+  python3 catalog.py list [--since=<timestamp>]
+"""
+
+import csv
+import hashlib
+import itertools
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(".").resolve()
+CATALOG_FILE = ROOT / "catalog.jsonl"
+CATALOG_DB = ROOT / ".catalog.sqlite"
+
+FIELDS = ("name", "slug", "loc", "guests", "hint", "img", "pdf")
+BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS props (
+  slug TEXT PRIMARY KEY,
+  name TEXT NOT NULL,
+  loc TEXT NOT NULL,
+  guests INTEGER NOT NULL,
+  hint TEXT NOT NULL DEFAULT '',
+  img TEXT NOT NULL,
+  pdf TEXT NOT NULL,
+  pos INTEGER NOT NULL,
+  digest TEXT NOT NULL,
+  changed_at REAL NOT NULL,
+  seen INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS props_loc ON props(loc);
+CREATE INDEX IF NOT EXISTS props_guests ON props(guests);
+CREATE INDEX IF NOT EXISTS props_pos ON props(pos, slug);
+-- list --since filtra la scansione in ordine di catalogo: un indice su
+-- changed_at non lo userebbe nessuno, e costava a ogni upsert
+DROP INDEX IF EXISTS props_changed;
+CREATE TABLE IF NOT EXISTS meta (
+  key TEXT PRIMARY KEY,
+  value TEXT
+);
+"""
+
+UPSERT = """
+INSERT INTO props (slug, name, loc, guests, hint, img, pdf, pos, digest, changed_at, seen)
+VALUES (:slug, :name, :loc, :guests, :hint, :img, :pdf, :pos, :digest, :now, :seen)
+ON CONFLICT(slug) DO UPDATE SET
+  name = excluded.name, loc = excluded.loc, guests = excluded.guests,
+  hint = excluded.hint, img = excluded.img, pdf = excluded.pdf,
+  pos = CASE WHEN :keep_pos THEN props.pos ELSE excluded.pos END,
+  seen = excluded.seen,
+  changed_at = CASE WHEN props.digest = excluded.digest THEN props.changed_at ELSE excluded.changed_at END,
+  digest = excluded.digest
+"""
+
+
+def record_digest(prop) -> str:
+    data = json.dumps({k: prop[k] for k in FIELDS}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def connect(path: Path = CATALOG_DB) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path))
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def get_meta(conn, key, default=None):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else default
+
+
+def set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def clean_record(raw, where="") -> dict:
+    missing = [k for k in FIELDS if k != "hint" and not str(raw.get(k) or "").strip()]
+    if missing:
+        raise SystemExit(f"Casa incompleta {where}: mancano {', '.join(missing)}")
+    rec = {k: str(raw.get(k) or "").strip() for k in FIELDS}
+    try:
+        rec["guests"] = int(rec["guests"])
+    except ValueError:
+        raise SystemExit(f"Ospiti non numerico {where}: {raw.get('guests')!r}")
+    return rec
+
+
+def read_jsonl(path: Path):
+    with path.open(encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if line.strip():
+                yield clean_record(json.loads(line), f"({path.name}:{n})")
+
+
+def read_csv(path: Path):
+    with path.open(encoding="utf-8", newline="") as f:
+        for n, row in enumerate(csv.DictReader(f), 2):
+            yield clean_record(row, f"({path.name}:{n})")
+
+
+def read_any(path: Path):
+    if path.suffix.lower() == ".csv":
+        return read_csv(path)
+    return read_jsonl(path)
+
+
+def upsert(conn, records, replace=False) -> int:
+    """Upsert in streaming (a blocchi); con replace=True elimina le case assenti.
+
+    Con replace l'ordine è quello del file; senza, le case già presenti
+    mantengono la loro posizione e le nuove vanno in coda.
+    """
+    seen = int(get_meta(conn, "generation", 0)) + 1
+    now = time.time()
+    base = 0 if replace else conn.execute("SELECT COALESCE(MAX(pos), -1) + 1 FROM props").fetchone()[0]
+    count = 0
+    with conn:
+        records = iter(records)
+        while True:
+            chunk = list(itertools.islice(records, BATCH))
+            if not chunk:
+                break
+            for rec in chunk:
+                rec.update(pos=base + count, digest=record_digest(rec), now=now, seen=seen, keep_pos=not replace)
+                count += 1
+            conn.executemany(UPSERT, chunk)
+        if replace:
+            conn.execute("DELETE FROM props WHERE seen != ?", (seen,))
+        set_meta(conn, "generation", seen)
+    return count
+
+
+def sync_file(conn, path: Path = CATALOG_FILE) -> bool:
+    """Reimporta catalog.jsonl solo se è cambiato dall'ultimo sync."""
+    st = path.stat()
+    stamp = f"{st.st_size}:{st.st_mtime_ns}"
+    if get_meta(conn, "source_stamp") == stamp:
+        return False
+    upsert(conn, read_jsonl(path), replace=True)
+    with conn:
+        set_meta(conn, "source_stamp", stamp)
+    return True
+
+
+def export_jsonl(conn, path: Path = CATALOG_FILE):
+    """Riscrive catalog.jsonl dal DB (in streaming) e lo marca come già sincronizzato."""
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        for p in iter_props(conn):
+            f.write(json.dumps({k: p[k] for k in FIELDS}, ensure_ascii=False) + "\n")
+    tmp.replace(path)
+    st = path.stat()
+    with conn:
+        set_meta(conn, "source_stamp", f"{st.st_size}:{st.st_mtime_ns}")
+
+
+def iter_props(conn, since=None, batch=BATCH):
+    """Case nell'ordine del catalogo, lette a blocchi: il cursore non resta aperto tra un blocco e l'altro."""
+    where = "AND changed_at > :since" if since is not None else ""
+    sql = f"""
+      SELECT {", ".join(FIELDS)}, pos, digest, changed_at FROM props
+      WHERE (pos, slug) > (:pos, :slug) {where}
+      ORDER BY pos, slug LIMIT :batch
+    """
+    pos, slug = -1, ""
+    while True:
+        rows = conn.execute(sql, {"pos": pos, "slug": slug, "since": since, "batch": batch}).fetchall()
+        for row in rows:
+            yield dict(row)
+        if len(rows) < batch:
+            return
+        pos, slug = rows[-1]["pos"], rows[-1]["slug"]
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in ("import", "list"):
+        print(__doc__.strip().split("Run:")[1])
+        return
+
+    conn = connect()
+    if CATALOG_FILE.exists():
+        sync_file(conn)
+
+    if args[0] == "import":
+        if len(args) < 2:
+            raise SystemExit("Indica il file da importare (.csv o .jsonl).")
+        n = upsert(conn, read_any(Path(args[1])), replace="--replace" in args)
+        export_jsonl(conn)
+        print(f"✅ Importate {n} case: {CATALOG_DB.name} e {CATALOG_FILE.name} aggiornati.")
+        return
+
+    since = None
+    for a in args[1:]:
+        if a.startswith("--since="):
+            since = float(a.split("=", 1)[1])
+    for p in iter_props(conn, since=since):
+        print(f"{p['slug']:<24} {p['loc']:<20} {p['guests']:>3} ospiti  {p['name']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compattatore della cascata CSS — Salento Stay
+
+styles.css cresce a blocchi appesi dalle patch (PACK A UI, WA FAB REFINED,
+WA SVG FIX, ...) che ridefiniscono le stesse regole, spesso con
+!important. styles.css resta il sorgente (le patch ci cercano i loro
+MARK); le pagine caricano styles.min.css, generato da qui:
+
+- Dichiarazioni morte: una dichiarazione è sempre sovrascritta se lo
+  STESSO selettore rimette la stessa proprietà più avanti (o con
+  !important) in un contesto che vale ogni volta che vale il suo (stessa
+  @media o fuori da ogni @media). Non conta come "vincente" un valore che
+  un browser potrebbe scartare (env(), min()/max()/clamp(), dvh, -webkit-,
+  ...): lì la dichiarazione prima fa da fallback e resta
+- Regole unite: lo stesso selettore nello stesso contesto finisce in una
+  regola sola, ma solo se nessuna regola in mezzo tocca le stesse
+  proprietà (o shorthand/longhand collegate): l'ordine della cascata non
+  cambia
+- Selettori inutili: via quelli che chiedono una classe, un id, un tag o
+  un attributo che non compare in index.html, privacy.html, case/*.html
+  né negli script (classi aggiunte da JS: lb, is-visible, open, ...)
+- @media consecutive con la stessa condizione diventano una; commenti e
+  spazi via
+
+Le regole che il parser non capisce (@keyframes, @font-face, CSS annidato)
+passano così come sono e fanno da barriera per l'unione delle regole.
+
+Run:
+  python3 css_compact.py [--check]     (--check: solo statistiche, non scrive)
+"""
+
+import re
+import sys
+from pathlib import Path
+
+ROOT = Path(".").resolve()
+CSS = ROOT / "styles.css"
+MIN_CSS = ROOT / "styles.min.css"
+CASE_DIR = ROOT / "case"
+PAGES = ("index.html", "privacy.html")
+SCRIPTS = ("script.js",)
+
+# at-rule che contengono altre regole (si analizzano dentro)
+GROUPS = {"media", "supports"}
+
+# valori che un browser vecchio può scartare: non sovrascrivono chi c'è prima
+FRAGILE = re.compile(r"env\(|min\(|max\(|clamp\(|color-mix\(|[\d.](?:dvh|svh|lvh|dvw|svw|lvw)\b|-webkit-|-moz-|-ms-", re.I)
+
+# shorthand che non hanno il prefisso delle loro longhand
+ALIASES = {
+    "inset": ("top", "right", "bottom", "left"),
+    "gap": ("row-gap", "column-gap"),
+    "place-items": ("align-items", "justify-items"),
+    "place-content": ("align-content", "justify-content"),
+    "place-self": ("align-self", "justify-self"),
+    "flex-flow": ("flex-direction", "flex-wrap"),
+    "font": ("line-height",),
+    "grid": ("grid-template", "grid-auto"),
+}
+
+COMMENT = re.compile(r"/\*.*?\*/", re.S)
+WORD = re.compile(r"[A-Za-z_][\w-]*")
+
+
+class Rule:
+    def __init__(self, ctx, selector, decls):
+        self.ctx = ctx            # (condizioni @media/@supports, dalla più esterna)
+        self.selector = selector  # un selettore (le liste si dividono)
+        self.decls = decls        # [(proprietà, valore, important)]
+
+
+class Raw:
+    def __init__(self, ctx, text):
+        self.ctx = ctx
+        self.text = text          # at-rule o regola non analizzata, già compatta
+
+
+# --- parser ---------------------------------------------------------------
+
+def split_top(text, sep):
+    """Divide su sep fuori da stringhe e parentesi."""
+    out, depth, quote, start = [], 0, None, 0
+    for i, c in enumerate(text):
+        if quote:
+            if c == quote and text[i - 1] != "\\":
+                quote = None
+        elif c in "\"'":
+            quote = c
+        elif c in "([":
+            depth += 1
+        elif c in ")]":
+            depth -= 1
+        elif c == sep and depth == 0:
+            out.append(text[start:i])
+            start = i + 1
+    out.append(text[start:])
+    return out
+
+
+def squeeze(s):
+    """Spazi compattati (fuori dalle stringhe)."""
+    parts = re.split(r"(\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*')", s)
+    for i in range(0, len(parts), 2):
+        p = re.sub(r"\s+", " ", parts[i])
+        p = re.sub(r"\s*([,>{}])\s*", r"\1", p)
+        parts[i] = re.sub(r"\s*;\s*", ";", p)
+    return "".join(parts).strip()
+
+
+def find_close(text, i):
+    """Indice della } che chiude la { in text[i-1]."""
+    depth, quote = 1, None
+    while i < len(text):
+        c = text[i]
+        if quote:
+            if c == quote and text[i - 1] != "\\":
+                quote = None
+        elif c in "\"'":
+            quote = c
+        elif c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return len(text)
+
+
+IMPORTANT = re.compile(r"\s*!\s*important\s*$", re.I)
+
+
+def parse_decls(body):
+    decls = []
+    for d in split_top(body, ";"):
+        if ":" not in d:
+            continue
+        prop, value = (x.strip() for x in d.split(":", 1))
+        if not prop.startswith("--"):  # le custom property distinguono maiuscole
+            prop = prop.lower()
+        important = bool(IMPORTANT.search(value))
+        decls.append((prop, squeeze(IMPORTANT.sub("", value)), important))
+    return decls
+
+
+def parse(text, ctx=()):
+    """CSS → lista piatta di Rule/Raw, in ordine di cascata."""
+    text = COMMENT.sub("", text)
+    items, i = [], 0
+    while True:
+        i = re.compile(r"\s*").match(text, i).end()
+        j = text.find("{", i)
+        k = text.find(";", i)
+        if text.startswith("@", i) and k != -1 and (j == -1 or k < j):
+            # @import, @charset, ...: restano in cima com'erano
+            items.append(Raw(ctx, squeeze(text[i:k + 1])))
+            i = k + 1
+            continue
+        if j == -1:
+            break
+        prelude = text[i:j].strip()
+        end = find_close(text, j + 1)
+        body = text[j + 1:end]
+        i = end + 1
+        if prelude.startswith("@"):
+            name = WORD.match(prelude[1:])
+            if name and name.group(0).lower() in GROUPS:
+                cond = re.sub(r"\s*:\s*", ":", squeeze(prelude))
+                items += parse(body, ctx + (cond,))
+            else:
+                items.append(Raw(ctx, squeeze(prelude) + "{" + squeeze(body) + "}"))
+        elif "{" in body:
+            items.append(Raw(ctx, squeeze(prelude) + "{" + squeeze(body) + "}"))
+        elif prelude:
+            decls = parse_decls(body)
+            sels = [squeeze(s) for s in split_top(prelude, ",")]
+            # un selettore che il browser non capisce butta tutta la lista:
+            # con pseudo-classi di un solo motore la lista resta intera
+            if len(sels) > 1 and re.search(r"::?-", prelude):
+                sels = [",".join(sels)]
+            items += [Rule(ctx, s, list(decls)) for s in sels]
+    return items
+
+
+# --- cascata --------------------------------------------------------------
+
+def base(prop):
+    return re.sub(r"^-(webkit|moz|ms|o)-", "", prop)
+
+
+def related(a, b):
+    a, b = base(a), base(b)
+    if a == b or a == "all" or b == "all":
+        return True
+    if a.startswith("--") or b.startswith("--"):
+        return False
+    if a.startswith(b + "-") or b.startswith(a + "-"):
+        return True
+    return any(x in ALIASES.get(y, ()) or any(x.startswith(l + "-") for l in ALIASES.get(y, ()))
+               for x, y in ((a, b), (b, a)))
+
+
+def covers(later_ctx, ctx):
+    # la regola dopo vale ogni volta che vale quella prima
+    return later_ctx == ctx or later_ctx == ()
+
+
+def drop_dead(items):
+    """Toglie le dichiarazioni che lo stesso selettore sovrascrive sempre."""
+    by_sel = {}
+    for n, it in enumerate(items):
+        if isinstance(it, Rule):
+            by_sel.setdefault(it.selector, []).append(n)
+
+    dropped = 0
+    for positions in by_sel.values():
+        # chi può vincere di sicuro: ((regola, posizione), contesto, proprietà, important)
+        strong = [((n, k), items[n].ctx, p, imp) for n in positions
+                  for k, (p, v, imp) in enumerate(items[n].decls) if not FRAGILE.search(p + ":" + v)]
+        for n in positions:
+            rule = items[n]
+            keep = []
+            for k, (p, v, imp) in enumerate(rule.decls):
+                # vince chi viene dopo (a pari importanza) o chi è !important
+                dead = any(q == p and at != (n, k) and covers(c, rule.ctx) and
+                           ((qi and not imp) or (at > (n, k) and qi == imp))
+                           for at, c, q, qi in strong)
+                if dead:
+                    dropped += 1
+                else:
+                    keep.append((p, v, imp))
+            rule.decls = keep
+    return dropped
+
+
+def merge_rules(items):
+    """Unisce le regole uguali (selettore + contesto) se la cascata lo permette."""
+    out, last, merged = [], {}, 0
+    for it in items:
+        if isinstance(it, Rule) and it.decls:
+            key = (it.ctx, it.selector)
+            n = last.get(key)
+            # le dichiarazioni salgono fino a out[n]: nessuna regola in mezzo
+            # deve toccare le stesse proprietà, sennò cambia chi vince
+            if n is not None and not any(
+                isinstance(b, Raw) or any(related(p, q) for p, _, _ in it.decls for q, _, _ in b.decls)
+                for b in out[n + 1:]
+            ):
+                out[n].decls += it.decls
+                merged += 1
+                continue
+            last[key] = len(out)
+        out.append(it)
+    return out, merged
+
+
+# --- selettori inutili ----------------------------------------------------
+
+def site_tokens(texts):
+    """Classi, id, tag, attributi delle pagine + parole degli script."""
+    used = {"class": set(), "id": set(), "tag": set(), "attr": set()}
+    for name, text in texts:
+        # script (file .js o dentro le pagine): ogni parola può essere una
+        # classe, un id, un tag o un attributo creato da JS
+        scripts = [text] if name.endswith(".js") else re.findall(r"<script\b[^>]*>([\s\S]*?)</script>", text, re.I)
+        for js in scripts:
+            words = set(WORD.findall(js))
+            for kind in used.values():
+                kind |= words
+        if name.endswith(".js"):
+            continue
+        for m in re.finditer(r"<([A-Za-z][\w-]*)([^>]*)>", text):
+            used["tag"].add(m.group(1).lower())
+            for a, dq, sq in re.findall(r"([\w:-]+)\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|\S+)", m.group(2)):
+                a, v = a.lower(), dq or sq
+                used["attr"].add(a)
+                if a == "class":
+                    used["class"].update(v.split())
+                elif a == "id":
+                    used["id"].add(v)
+            # attributi senza valore (hidden, defer, ...)
+            for a in re.findall(r"\s([\w:-]+)(?=[\s/]|$)", m.group(2)):
+                used["attr"].add(a.lower())
+    return used
+
+
+def can_match(selector, used):
+    if "\\" in selector:
+        return True
+    # dentro :not()/:is()/:has()/:where() non si giudica
+    s = selector
+    while True:
+        t = re.sub(r"\([^()]*\)", "", s)
+        if t == s:
+            break
+        s = t
+    attrs = re.findall(r"\[\s*([\w:-]+)", s)
+    s = re.sub(r"\[[^\]]*\]", "", s)
+    s = re.sub(r"::?[\w-]+", "", s)
+    if any(a.lower() not in used["attr"] for a in attrs):
+        return False
+    if any(c not in used["class"] for c in re.findall(r"\.([\w-]+)", s)):
+        return False
+    if any(i not in used["id"] for i in re.findall(r"#([\w-]+)", s)):
+        return False
+    tags = re.findall(r"(?:^|[\s>+~,])([A-Za-z][\w-]*)", s)
+    return all(t.lower() in used["tag"] for t in tags)
+
+
+def purge(items, used):
+    keep = [it for it in items if not isinstance(it, Rule) or can_match(it.selector, used)]
+    return keep, len(items) - len(keep)
+
+
+# --- output ---------------------------------------------------------------
+
+def decl_text(decls):
+    return ";".join(f"{p}:{v}{'!important' if imp else ''}" for p, v, imp in decls)
+
+
+def emit(items):
+    """Lista piatta → CSS: regole con le stesse dichiarazioni in fila diventano
+    una lista di selettori, contesti uguali in fila una sola @media."""
+    blocks = []  # (ctx, testo)
+    for it in items:
+        if isinstance(it, Rule):
+            if not it.decls:
+                continue
+            text = decl_text(it.decls)
+            prev = blocks[-1] if blocks else None
+            if prev and prev[0] == it.ctx and isinstance(prev[1], list) and prev[1][1] == text:
+                prev[1][0].append(it.selector)
+                continue
+            blocks.append((it.ctx, [[it.selector], text]))
+        else:
+            blocks.append((it.ctx, it.text))
+
+    out, open_ctx = [], ()
+    for ctx, b in blocks:
+        if ctx != open_ctx:
+            # chiude solo i contesti che cambiano: @media annidate restano aperte
+            same = 0
+            while same < min(len(ctx), len(open_ctx)) and ctx[same] == open_ctx[same]:
+                same += 1
+            out.append("}" * (len(open_ctx) - same) + ("\n" if open_ctx and not same else ""))
+            out.append("".join(c + "{" for c in ctx[same:]))
+            open_ctx = ctx
+        out.append(",".join(b[0]) + "{" + b[1] + "}" if isinstance(b, list) else b)
+        if not ctx:
+            out.append("\n")
+    out.append("}" * len(open_ctx))
+    return "".join(out).strip() + "\n"
+
+
+def compact(css, used):
+    """-> (css compatto, statistiche)"""
+    items = parse(css)
+    rules = sum(isinstance(it, Rule) for it in items)
+    items, purged = purge(items, used)
+    dead = drop_dead(items)
+    items, merged = merge_rules(items)
+    out = emit(items)
+    return out, {"rules": rules, "purged": purged, "dead_decls": dead, "merged": merged,
+                 "bytes_in": len(css.encode("utf-8")), "bytes_out": len(out.encode("utf-8"))}
+
+
+def site_texts(overrides=None):
+    """(nome, testo) di pagine e script; overrides: {path: testo} non ancora scritti."""
+    overrides = {Path(p).resolve(): t for p, t in (overrides or {}).items()}
+    paths = [ROOT / p for p in PAGES + SCRIPTS]
+    paths += sorted(CASE_DIR.glob("*.html")) if CASE_DIR.exists() else []
+    paths += [p for p in overrides if p.suffix in (".html", ".js") and p not in paths]
+    for p in paths:
+        if p in overrides:
+            yield p.name, overrides[p]
+        elif p.exists():
+            yield p.name, p.read_text(encoding="utf-8", errors="ignore")
+
+
+def build(overrides=None):
+    """styles.min.css per il sito com'è (più i testi in overrides).
+
+    -> (css, statistiche), o None se styles.css non c'è (niente da compattare).
+    """
+    overrides = overrides or {}
+    css = overrides.get(CSS)
+    if css is None:
+        if not CSS.exists():
+            return None
+        css = CSS.read_text(encoding="utf-8")
+    return compact(css, site_tokens(site_texts(overrides)))
+
+
+def main():
+    built = build()
+    if built is None:
+        raise SystemExit(f"❌ Manca {CSS.name}")
+    out, stats = built
+    print(f"  regole {stats['rules']}, selettori inutili {stats['purged']}, "
+          f"dichiarazioni morte {stats['dead_decls']}, regole unite {stats['merged']}")
+    print(f"  {stats['bytes_in'] / 1024:.1f} KB → {stats['bytes_out'] / 1024:.1f} KB")
+    if "--check" in sys.argv:
+        return
+    if MIN_CSS.exists() and MIN_CSS.read_text(encoding="utf-8") == out:
+        print("✅ styles.min.css già aggiornato.")
+        return
+    from site_io import OutputTxn
+    with OutputTxn() as txn:
+        txn.write_text(MIN_CSS, out)
+    print("✅ styles.min.css scritto.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,6 @@
 import re
-from pathlib import Path
-from datetime import datetime
-
-ROOT = Path(".")
-INDEX = ROOT / "index.html"
-CSS = ROOT / "styles.css"
-JS = ROOT / "script.js"
-CASE_DIR = ROOT / "case"
-
-STAMP = datetime.now().strftime("%Y%m%d-%H%M%S")
-
-def backup(p: Path):
-    if p.exists():
-        p.with_suffix(p.suffix + f".bak-{STAMP}").write_text(p.read_text(encoding="utf-8"), encoding="utf-8")
+from html_stream import fab
+from patch_runner import Pass, run
 
 WA_SVG = '''
 <svg class="wa-fab__svg" viewBox="0 0 32 32" aria-hidden="true" focusable="false">
@@ -20,28 +8,16 @@ WA_SVG = '''
 </svg>
 '''.strip()
 
-def ensure_fab(html: str) -> str:
-    # se già c'è waSticky, non reinserire
-    if 'id="waSticky"' in html:
-        return html
+FAB_ICON = f'\n    <span class="wa-fab__icon" aria-hidden="true">{WA_SVG}</span>\n'
 
-    fab = f"""
+FAB_HTML = f"""
   <!-- WhatsApp Sticky FAB -->
-  <a id="waSticky" class="wa-fab" href="#" target="_blank" rel="noopener" aria-label="Contattaci su WhatsApp">
-    <span class="wa-fab__icon" aria-hidden="true">{WA_SVG}</span>
-  </a>
+  <a id="waSticky" class="wa-fab" href="#" target="_blank" rel="noopener" aria-label="Contattaci su WhatsApp">{FAB_ICON}  </a>
 """
-    return re.sub(r"</body>", fab + "\n</body>", html, flags=re.IGNORECASE, count=1)
-
-def force_svg_inside_fab(html: str) -> str:
-    # se esiste waSticky, sostituisce il contenuto interno con svg (evita emoji/scritta)
-    pat = r'(<a[^>]*id="waSticky"[^>]*>)([\s\S]*?)(</a>)'
-    m = re.search(pat, html, flags=re.IGNORECASE)
-    if not m:
-        return html
-    start, end = m.group(1), m.group(3)
-    inner = f'\n    <span class="wa-fab__icon" aria-hidden="true">{WA_SVG}</span>\n'
-    return html[:m.start()] + start + inner + end + html[m.end():]
+
+# se manca waSticky lo aggiunge prima di </body>; se c'è, ne sostituisce il
+# contenuto interno con lo svg (evita emoji/scritta). Una passata sola.
+FAB = fab(inject=FAB_HTML, icon=FAB_ICON)
 
 def strip_old_hide_rules(css: str) -> str:
     # rimuove blocchi vecchi che nascondono la wa-fab (display:none !important) per evitare conflitti
@@ -182,27 +158,17 @@ def ensure_js(js: str) -> str:
 """
     return js + "\n" + block
 
-def process_html_file(p: Path):
-    backup(p)
-    html = p.read_text(encoding="utf-8")
-    html = ensure_fab(html)
-    html = force_svg_inside_fab(html)
-    p.write_text(html, encoding="utf-8")
+# HTML: index + pagine case, poi CSS e JS
+PASS = Pass("fab_refine", "WA FAB REFINED",
+            files={"css": ensure_css, "js": ensure_js},
+            html={"index": (FAB,), "case": (FAB,)},
+            after=("fix_fab_text",))
 
 def main():
-    # HTML: index + pagine case
-    if INDEX.exists():
-        process_html_file(INDEX)
-    if CASE_DIR.exists():
-        for f in CASE_DIR.glob("*.html"):
-            process_html_file(f)
-
-    # CSS
-    if CSS.exists():
-        backup(CSS)
-        css = CSS.read_text(encoding="utf-8")
-        CSS.write_text(ensure_css(css), encoding="utf-8")
-
-    # JS
-    if JS.exists():
-        backup(JS)
+    run([PASS], "fab_refine")
+
+    print("✅ WhatsApp FAB rifinito: SVG, comparsa dopo scroll su desktop, sempre visibile su mobile.")
+    print("➡️ Test: python3 -m http.server 8000  →  http://localhost:8000")
+
+if __name__ == "__main__":
+    main()
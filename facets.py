@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tabelle dei filtri (zona × fascia ospiti) — Salento Stay
+
+- bulk_fix.py scrive facets.json insieme alla home e a search-index.json:
+  per ogni combinazione zona × fascia (più "all" su tutte e due) quante
+  case ci sono e quali, già in ogni ordinamento della barra
+- Il client non scandisce le card: i numeri sui chip e la lista da
+  mostrare sono una lettura della tabella (la ricerca libera resta sui
+  bitset, perché le query non si possono precalcolare)
+- Formato compatto: ids = slug nell'ordine del catalogo; orders[modo] =
+  posizioni in ids nell'ordine di quel modo; per ogni cella e modo le
+  posizioni DENTRO orders[modo], crescenti e scritte a differenze
+- Fasce: quelle di chip e schede della home (BANDS); le celle vuote non
+  si scrivono
+
+Run:
+  python3 facets.py build
+  python3 facets.py show
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import catalog
+from search_index import fold
+from site_io import OutputTxn
+
+ROOT = Path(".").resolve()
+FACETS = ROOT / "facets.json"
+
+# cambia se cambia il formato: bulk_fix lo mette nella chiave della home
+VERSION = 1
+
+# le fasce della barra (fix_clean_filters_v3) e delle schede .option-card
+BANDS = ("2-4", "4-8", "8-12", "12+")
+
+# stessi nomi dei modi di ordinamento in script.js ("featured" = ordine del catalogo)
+SORTS = ("featured", "guests-asc", "guests-desc", "zone-asc", "name-asc")
+
+
+def band_range(band: str):
+    if band.endswith("+"):
+        return int(band[:-1]), 99
+    lo, hi = band.split("-")
+    return int(lo), int(hi)
+
+
+def in_band(guests: int, band: str) -> bool:
+    lo, hi = band_range(band)
+    return lo <= guests <= hi
+
+
+def zone_key(loc: str) -> str:
+    # come zoneKey in script.js: la zona in minuscolo
+    return loc.strip().lower()
+
+
+def sort_keys(props):
+    """Modo -> posizioni in props nell'ordine di quel modo (a parità, ordine del catalogo)."""
+    pos = range(len(props))
+    return {
+        "featured": list(pos),
+        "guests-asc": sorted(pos, key=lambda i: (props[i]["guests"], i)),
+        "guests-desc": sorted(pos, key=lambda i: (-props[i]["guests"], i)),
+        "zone-asc": sorted(pos, key=lambda i: (fold(props[i]["loc"]), i)),
+        "name-asc": sorted(pos, key=lambda i: (fold(props[i]["name"]), i)),
+    }
+
+
+def gaps(values):
+    out, last = [], 0
+    for v in values:
+        out.append(v - last)
+        last = v
+    return out
+
+
+def build(props) -> dict:
+    props = [{"slug": p["slug"], "name": p["name"], "loc": p["loc"], "guests": int(p["guests"])} for p in props]
+    zones = {}
+    for p in props:
+        zones.setdefault(zone_key(p["loc"]), p["loc"].strip())
+    zone_list = sorted(zones, key=lambda k: (fold(zones[k]), k))
+
+    # celle di ogni casa: (sua zona | all) × (sue fasce | all)
+    cells_of = [[f"{z}|{b}" for z in ("all", zone_key(p["loc"]))
+                 for b in ("all", *[b for b in BANDS if in_band(p["guests"], b)])] for p in props]
+
+    # un giro per modo: ogni casa finisce, al suo rango, nelle sue celle
+    orders = sort_keys(props)
+    ranks = {}
+    for mode in SORTS:
+        for r, i in enumerate(orders[mode]):
+            for key in cells_of[i]:
+                ranks.setdefault(key, {m: [] for m in SORTS})[mode].append(r)
+    cells = {key: {"n": len(ranks[key]["featured"]), **{m: gaps(ranks[key][m]) for m in SORTS}}
+             for key in sorted(ranks)}
+
+    return {
+        "v": VERSION,
+        "ids": [p["slug"] for p in props],
+        "bands": list(BANDS),
+        "zones": [{"key": k, "name": zones[k]} for k in zone_list],
+        "orders": {mode: orders[mode] for mode in SORTS if mode != "featured"},
+        "cells": cells,
+    }
+
+
+def dumps(table: dict) -> str:
+    return json.dumps(table, ensure_ascii=False, separators=(",", ":"))
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    if cmd == "build":
+        conn = catalog.connect()
+        if catalog.CATALOG_FILE.exists():
+            catalog.sync_file(conn)
+        table = build(catalog.iter_props(conn))
+        with OutputTxn() as out:
+            out.write_text(FACETS, dumps(table))
+        print(f"✅ {FACETS.name}: {len(table['ids'])} case, {len(table['cells'])} celle, "
+              f"{FACETS.stat().st_size / 1024:.1f} KB.")
+    elif cmd == "show":
+        if not FACETS.exists():
+            raise SystemExit(f"❌ Manca {FACETS.name} (python3 facets.py build)")
+        table = json.loads(FACETS.read_text(encoding="utf-8"))
+        cols = ["all", *table["bands"]]
+        print(f"  {'zona':<22}" + "".join(f"{b:>7}" for b in cols))
+        for z in [{"key": "all", "name": "Tutte"}, *table["zones"]]:
+            row = [table["cells"].get(f"{z['key']}|{b}", {}).get("n", 0) for b in cols]
+            print(f"  {z['name']:<22}" + "".join(f"{n:>7}" for n in row))
+    else:
+        print(__doc__.split("Run:", 1)[1].rstrip())
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,15 @@
 import re
-from pathlib import Path
-from datetime import datetime
+from html_stream import Slot
+from patch_runner import Pass, run
 
-ROOT = Path(".")
-INDEX = ROOT / "index.html"
-CSS = ROOT / "styles.css"
-CASE_DIR = ROOT / "case"
-
-STAMP = datetime.now().strftime("%Y%m%d-%H%M%S")
-
-def backup(p: Path):
-    if p.exists():
-        p.with_suffix(p.suffix + f".bak-{STAMP}").write_text(p.read_text(encoding="utf-8"), encoding="utf-8")
-
-def ensure_visible_class(html: str) -> str:
+def ensure_visible_class(eng):
     # rende sempre visibile il FAB senza dipendere da JS: aggiunge is-visible alla classe
-    def repl(m):
-        tag = m.group(0)
-        # sostituisce class="wa-fab" o class="wa-fab ..."
-        if 'class="' in tag:
-            tag = re.sub(r'class="([^"]*)"', lambda mm: f'class="{mm.group(1)}{" is-visible" if "is-visible" not in mm.group(1) else ""}"', tag)
-        return tag
+    def on_id(tag, value, doc):
+        cls = tag.get("class")
+        if tag.name == "a" and value == "waSticky" and cls is not None and "is-visible" not in cls:
+            tag.set("class", f"{cls} is-visible")
 
-    return re.sub(r'<a[^>]*id="waSticky"[^>]*>', repl, html, flags=re.IGNORECASE)
+    eng.on_attr("id", on_id, contains="waSticky")
 
 def ensure_css_has_is_visible(css: str) -> str:
     # nel dubbio, aggiunge regola is-visible se manca
@@ -30,66 +17,72 @@ def ensure_css_has_is_visible(css: str) -> str:
         return css
     return css + "\n\n/* Force visible state */\n.wa-fab.is-visible{opacity:1;transform:none;pointer-events:auto;}\n"
 
-def remove_duplicate_pdf_buttons_in_case(html: str) -> str:
+# <a>/<button> che contengono solo questi testi
+DUPLICATE = re.compile(r"\s*(?:Scarica\s+scheda\s+PDF|Apri\s+scheda\s*\(PDF\)"
+                       r"|Chiedi\s+disponibilit[aà]\s+su\s+WhatsApp|Chiedi\s+disponibilit[aà])\s*", re.I)
+
+def remove_duplicate_pdf_buttons_in_case(eng):
     """
     Se c'è action-bar, rimuove bottoni duplicati fuori da action-bar:
     - Scarica scheda PDF
     - Apri scheda (PDF)
     - Chiedi disponibilità
     - Chiedi disponibilità su WhatsApp
+    e i div rimasti vuoti. La barra può arrivare dopo i bottoni (o la
+    mette action_bar di pack_a a fine pagina): finché non si sa, il
+    bottone resta in sospeso in uno slot.
     """
-    m = re.search(r'(<div class="action-bar"[\s\S]*?</div>)', html, flags=re.IGNORECASE)
-    if not m:
-        return html
-
-    action_bar = m.group(1)
-    placeholder = "__ACTION_BAR__PLACEHOLDER__"
-    temp = html.replace(action_bar, placeholder, 1)
-
-    # Rimuovi anchor/button con quei testi (fuori dall'action bar)
-    texts = [
-        r"Scarica\s+scheda\s+PDF",
-        r"Apri\s+scheda\s*\(PDF\)",
-        r"Chiedi\s+disponibilit[aà]\s+su\s+WhatsApp",
-        r"Chiedi\s+disponibilit[aà]"
-    ]
-
-    for t in texts:
-        # <a ...> TESTO </a>
-        temp = re.sub(rf'<a\b[^>]*>\s*{t}\s*</a>', "", temp, flags=re.IGNORECASE)
-        # <button ...> TESTO </button> (nel caso)
-        temp = re.sub(rf'<button\b[^>]*>\s*{t}\s*</button>', "", temp, flags=re.IGNORECASE)
-
-    # pulisci div vuoti rimasti (un paio di volte)
-    for _ in range(3):
-        temp = re.sub(r'<div[^>]*>\s*</div>', "", temp, flags=re.IGNORECASE)
-
-    # rimetti action bar
-    temp = temp.replace(placeholder, action_bar, 1)
-    return temp
-
-def process_html_file(p: Path, is_case: bool):
-    backup(p)
-    html = p.read_text(encoding="utf-8")
-    html = ensure_visible_class(html)
-    if is_case:
-        html = remove_duplicate_pdf_buttons_in_case(html)
-    p.write_text(html, encoding="utf-8")
+    def has_bar(doc):
+        return doc.state.get("dup_bar") or (doc.state.get("bar_slot") and "pdf" in doc.state)
+
+    def unless_bar(pieces, doc):
+        if doc.state.get("dup_bar"):
+            return []
+        return [doc.slot(lambda doc: "" if has_bar(doc) else "".join(map(str, pieces)))]
+
+    def button(pieces, doc):
+        inner = pieces[1:-1]
+        if all(isinstance(p, str) for p in inner) and DUPLICATE.fullmatch("".join(inner)):
+            return unless_bar(pieces, doc)
+        return pieces
+
+    def empty_div(pieces, doc):
+        # pulisci div vuoti rimasti (anche quelli dei bottoni tolti)
+        inner = pieces[1:-1]
+        if any(not isinstance(p, (str, Slot)) or isinstance(p, str) and p.strip() for p in inner):
+            return pieces
+        if any(isinstance(p, Slot) for p in inner):
+            return [doc.slot(lambda doc: "" if has_bar(doc) and not "".join(map(str, inner)).strip()
+                             else "".join(map(str, pieces)))]
+        return unless_bar(pieces, doc)
+
+    def on_div(tag, doc):
+        if tag.get("class") == "action-bar" and not doc.state.get("dup_bar"):
+            # la prima action-bar resta com'è, fino al suo primo </div>
+            doc.state["dup_bar"] = doc.state["dup_in_bar"] = True
+        elif not doc.state.get("dup_in_bar"):
+            doc.capture(tag, empty_div)
+
+    def on_div_end(end, doc):
+        doc.state["dup_in_bar"] = False
+
+    def on_button(tag, doc):
+        if not doc.state.get("dup_in_bar"):
+            doc.capture(tag, button)
+
+    eng.on_start("div", on_div)
+    eng.on_end("div", on_div_end)
+    eng.on_start(("a", "button"), on_button)
+
+# CSS: solo aggiunta is-visible se manca
+PASS = Pass("fix_fab_and_duplicates", "is-visible",
+            files={"css": ensure_css_has_is_visible},
+            html={"index": (ensure_visible_class,),
+                  "case": (ensure_visible_class, remove_duplicate_pdf_buttons_in_case)},
+            after=("fab_refine",))
 
 def main():
-    # HTML
-    if INDEX.exists():
-        process_html_file(INDEX, is_case=False)
-
-    if CASE_DIR.exists():
-        for f in CASE_DIR.glob("*.html"):
-            process_html_file(f, is_case=True)
-
-    # CSS (solo aggiunta is-visible se manca)
-    if CSS.exists():
-        backup(CSS)
-        css = CSS.read_text(encoding="utf-8")
-        CSS.write_text(ensure_css_has_is_visible(css), encoding="utf-8")
+    run([PASS], "fix_fab_and_duplicates")
 
     print("✅ FIX OK: FAB sempre visibile (desktop+mobile) + rimozione bottoni PDF/WA duplicati nelle schede.")
     print("➡️ Test: python3 -m http.server 8000  →  http://localhost:8000")
@@ -1,37 +1,33 @@
 import re
-from pathlib import Path
-from datetime import datetime
+from patch_runner import Pass, run
 
-ROOT = Path(".")
-INDEX = ROOT / "index.html"
-CASE_DIR = ROOT / "case"
-CSS = ROOT / "styles.css"
-STAMP = datetime.now().strftime("%Y%m%d-%H%M%S")
+ICON = re.compile(r'<span[^>]*class="[^"]*wa-fab__icon[^"]*"[\s\S]*?</span>', re.I)
 
-def backup(p: Path):
-    if p.exists():
-        p.with_suffix(p.suffix + f".bak-{STAMP}").write_text(p.read_text(encoding="utf-8"), encoding="utf-8")
-
-def strip_text_span(html: str) -> str:
+def strip_text_span(eng):
     # rimuove eventuali <span class="wa-fab__text">WhatsApp</span>
-    html = re.sub(r'<span[^>]*class="[^"]*wa-fab__text[^"]*"[^>]*>[\s\S]*?</span>', '', html, flags=re.I)
-    return html
+    def on_class(tag, value, doc):
+        if tag.name == "span":
+            doc.capture(tag, lambda pieces, doc: [])
+
+    eng.on_attr("class", on_class, contains="wa-fab__text")
 
-def force_icon_only_inside_sticky(html: str) -> str:
-    # se dentro #waSticky c'è qualsiasi testo "WhatsApp", lo elimina
-    pat = r'(<a[^>]*id="waSticky"[^>]*>)([\s\S]*?)(</a>)'
-    m = re.search(pat, html, flags=re.I)
-    if not m:
-        return html
+def force_icon_only_inside_sticky(eng):
+    # se dentro #waSticky (il primo) c'è qualsiasi testo "WhatsApp", lo elimina
+    def patch(pieces, doc):
+        inner = "".join(map(str, pieces[1:-1]))
+        # tieni SOLO lo span icona + svg (se esiste)
+        icon = ICON.search(inner)
+        new_inner = icon.group(0) if icon else inner
+        # pulizia extra: rimuovi eventuali "WhatsApp" testuali residui
+        new_inner = re.sub(r'WhatsApp', '', new_inner, flags=re.I)
+        return [pieces[0], new_inner, pieces[-1]]
 
-    start, inner, end = m.group(1), m.group(2), m.group(3)
-    # tieni SOLO lo span icona + svg (se esiste)
-    icon = re.search(r'(<span[^>]*class="[^"]*wa-fab__icon[^"]*"[\s\S]*?</span>)', inner, flags=re.I)
-    new_inner = icon.group(1) if icon else inner
-    # pulizia extra: rimuovi eventuali "WhatsApp" testuali residui
-    new_inner = re.sub(r'WhatsApp', '', new_inner, flags=re.I)
+    def on_id(tag, value, doc):
+        if tag.name == "a" and value == "waSticky" and not doc.state.get("fab_text_done"):
+            doc.state["fab_text_done"] = True
+            doc.capture(tag, patch)
 
-    return html[:m.start()] + start + new_inner + end + html[m.end():]
+    eng.on_attr("id", on_id, contains="waSticky")
 
 def ensure_css_kill_text(css: str) -> str:
     if "/* === FAB TEXT KILL (iOS) === */" in css:
@@ -68,25 +64,15 @@ def ensure_css_kill_text(css: str) -> str:
 """
     return css + "\n\n" + block
 
-def process_html(p: Path):
-    backup(p)
-    html = p.read_text(encoding="utf-8")
-    html = strip_text_span(html)
-    html = force_icon_only_inside_sticky(html)
-    p.write_text(html, encoding="utf-8")
+HTML = (strip_text_span, force_icon_only_inside_sticky)
 
-def main():
-    if INDEX.exists():
-        process_html(INDEX)
+PASS = Pass("fix_fab_text", "FAB TEXT KILL",
+            files={"css": ensure_css_kill_text},
+            html={"index": HTML, "case": HTML},
+            after=("fix_whatsapp_mobile",))
 
-    if CASE_DIR.exists():
-        for f in CASE_DIR.glob("*.html"):
-            process_html(f)
-
-    if CSS.exists():
-        backup(CSS)
-        css = CSS.read_text(encoding="utf-8")
-        CSS.write_text(ensure_css_kill_text(css), encoding="utf-8")
+def main():
+    run([PASS], "fix_fab_text")
 
     print("✅ FATTO: testo WhatsApp rimosso dal FAB + CSS anti-bug iOS applicato.")
 
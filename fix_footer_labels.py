@@ -1,62 +1,54 @@
 from pathlib import Path
-import re
 
-ROOT = Path(".").resolve()
+from patch_runner import Pass, run
 
-def patch_index():
-    p = ROOT / "index.html"
-    if not p.exists():
-        raise SystemExit("index.html non trovato")
-
-    html = p.read_text(encoding="utf-8", errors="ignore")
-
-    # Sostituisce solo il blocco footer__links con due voci pulite
-    def repl(m):
-        return (
-            '<div class="footer__links">\n'
-            '      <a href="/privacy.html">Privacy</a>\n'
-            '      <a href="#form">Contatti</a>\n'
-            '    </div>'
-        )
-
-    html2, n = re.subn(
-        r'<div class="footer__links">.*?</div>',
-        repl,
-        html,
-        count=1,
-        flags=re.S
-    )
-
-    if n == 0:
-        raise SystemExit('Non trovo <div class="footer__links"> in index.html')
-
-    p.write_text(html2, encoding="utf-8")
-    print("OK index.html footer links")
+ROOT = Path(".").resolve()
 
-def patch_privacy():
-    p = ROOT / "privacy.html"
-    if not p.exists():
-        raise SystemExit("privacy.html non trovato")
-
-    html = p.read_text(encoding="utf-8", errors="ignore")
-
-    # Qui "Contatti" deve essere WhatsApp con id waFooter (per script.js)
-    html = re.sub(
-        r'<div class="footer__links">.*?</div>',
-        '<div class="footer__links">\n'
-        '        <a href="/privacy.html">Privacy</a>\n'
-        '        <a id="waFooter" href="#">Contatti</a>\n'
-        '      </div>',
-        html,
-        count=1,
-        flags=re.S
-    )
-
-    p.write_text(html, encoding="utf-8")
-    print("OK privacy.html footer links")
+def footer_links(inner, required=False):
+    # Sostituisce solo il (primo) blocco footer__links con due voci pulite
+    def register(eng):
+        def patch(pieces, doc):
+            return [pieces[0], inner, pieces[-1]]
+
+        def on_div(tag, doc):
+            if tag.get("class") == "footer__links" and not doc.state.get("footer_links"):
+                doc.state["footer_links"] = True
+                doc.capture(tag, patch)
+
+        def check(doc):
+            if not doc.state.get("footer_links"):
+                raise SystemExit('Non trovo <div class="footer__links"> in index.html')
+
+        eng.on_start("div", on_div)
+        if required:
+            eng.on_finish(check)
+    return register
+
+patch_index = footer_links(
+    '\n'
+    '      <a href="/privacy.html">Privacy</a>\n'
+    '      <a href="#form">Contatti</a>\n'
+    '    ',
+    required=True)
+
+# Qui "Contatti" deve essere WhatsApp con id waFooter (per script.js)
+patch_privacy = footer_links(
+    '\n'
+    '        <a href="/privacy.html">Privacy</a>\n'
+    '        <a id="waFooter" href="#">Contatti</a>\n'
+    '      ')
+
+# privacy.html la crea site_fix
+PASS = Pass("fix_footer_labels", "footer__links",
+            html={"index": (patch_index,), "privacy": (patch_privacy,)},
+            after=("site_fix",))
 
 if __name__ == "__main__":
-    patch_index()
-    patch_privacy()
+    # index e privacy insieme: se uno dei due fallisce non si tocca nulla
+    for name in ("index.html", "privacy.html"):
+        if not (ROOT / name).exists():
+            raise SystemExit(f"{name} non trovato")
+    run([PASS], "fix_footer_labels")
+    print("OK index.html footer links")
+    print("OK privacy.html footer links")
     print("Fatto.")
-
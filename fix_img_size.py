@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Misure sulle foto delle pagine — Salento Stay
+
+- Le <img> locali senza width/height (card della home, schede case,
+  privacy) prendono le misure vere del file, lette dalle intestazioni
+  (image_size.py, cache per sha256), e aspect-ratio nello style: il
+  browser tiene lo spazio della foto prima che arrivi, niente salti
+- Le foto remote (hero della home) e quelle che hanno già le misure
+  (pagine del build) restano come sono
+- CSS: img {height: auto}, se no l'attributo height vale come altezza
+  fissa anche quando max-width stringe la foto
+
+Run:
+  python3 fix_img_size.py
+"""
+
+import re
+from pathlib import Path
+
+import image_size
+from html_stream import img_size
+from patch_runner import Pass, run
+
+ROOT = Path(".").resolve()
+
+MARK = "IMG SIZE"
+
+# la regola base delle immagini (reset in cima a styles.css)
+IMG_RULE = re.compile(r"^img\s*\{[^}]*\}[^\n]*\n", re.M)
+
+
+def save_sizes(eng):
+    # le misure nuove su disco a fine pagina: i worker di patch_runner non hanno un "dopo"
+    eng.on_finish(lambda doc: image_size.save())
+
+
+HTML = (img_size, save_sizes)
+
+
+def ensure_css(css: str) -> str:
+    if f"/* === {MARK} === */" in css:
+        return css
+    block = (f"/* === {MARK} === */\n"
+             "/* width/height sulle <img> (fix_img_size.py, bulk_fix.py): proporzioni sì, altezza fissa no */\n"
+             "img{height:auto}\n")
+    # accanto al reset, non in fondo: CLEAN_FILTERS_V3 rifà da capo tutto
+    # quello che sta dopo il suo blocco
+    m = IMG_RULE.search(css)
+    if m is None:
+        return css.rstrip() + "\n\n" + block
+    return css[:m.end()] + block + css[m.end():]
+
+
+# dopo le pass che mettono o spostano <img> (percorsi relativi, card cliccabili)
+PASS = Pass("fix_img_size", MARK,
+            files={"css": ensure_css},
+            html={"index": HTML, "case": HTML, "privacy": HTML},
+            after=("pack_a", "fix_clean_filters_v3", "site_fix"))
+
+if __name__ == "__main__":
+    run([PASS], "fix_img_size")
+    print("✅ Misure sulle <img> locali.")
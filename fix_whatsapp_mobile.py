@@ -1,14 +1,6 @@
-import re
-from pathlib import Path
-from datetime import datetime
+import html
 from urllib.parse import quote
-
-ROOT = Path(".")
-CSS = ROOT / "styles.css"
-HTML_FILES = [ROOT / "index.html"]
-CASE_DIR = ROOT / "case"
-
-STAMP = datetime.now().strftime("%Y%m%d-%H%M%S")
+from patch_runner import Pass, run
 
 WHATSAPP_NUMBER = "393292272939"  # tuo numero (internazionale senza +)
 DEFAULT_MSG = "Ciao! Vorrei informazioni e disponibilità per una casa a Gallipoli."
@@ -20,89 +12,83 @@ WA_SVG = r'''
 </svg>
 '''.strip()
 
-def backup(p: Path):
-    if p.exists():
-        p.with_suffix(p.suffix + f".bak-{STAMP}").write_text(p.read_text(encoding="utf-8"), encoding="utf-8")
-
 def wa_link(msg: str) -> str:
     # api.whatsapp.com a volte è più “affidabile” su mobile rispetto a wa.me
     return f"https://api.whatsapp.com/send?phone={WHATSAPP_NUMBER}&text={quote(msg)}"
 
-def extract_title(html: str) -> str:
-    # prova a prendere H1 come nome casa
-    m = re.search(r"<h1[^>]*>\s*([^<]{2,80})\s*</h1>", html, flags=re.I)
-    if m:
-        t = re.sub(r"\s+", " ", m.group(1)).strip()
-        return t
-    return ""
-
-def normalize_fab(html: str, msg: str) -> str:
-    # 1) rimuove eventuali duplicati di waSticky (se presenti)
-    blocks = list(re.finditer(r'<a[^>]*id="waSticky"[^>]*>[\s\S]*?</a>', html, flags=re.I))
-    if len(blocks) > 1:
-        # tieni il primo, elimina gli altri
-        keep = blocks[0].group(0)
-        for b in reversed(blocks[1:]):
-            html = html[:b.start()] + "" + html[b.end():]
-        # ricalcola primo (può essere cambiato)
-        blocks = list(re.finditer(r'<a[^>]*id="waSticky"[^>]*>[\s\S]*?</a>', html, flags=re.I))
-
-    if not blocks:
-        return html  # se non c'è, non inventiamo nulla
-
-    fab = blocks[0].group(0)
-
-    # 2) forza href funzionante direttamente in HTML + target blank
-    href = wa_link(msg)
-    fab = re.sub(r'href="[^"]*"', f'href="{href}"', fab, flags=re.I)
-    if 'href="' not in fab:
-        fab = fab.replace("<a ", f'<a href="{href}" ', 1)
-
-    if re.search(r'\btarget=', fab, flags=re.I) is None:
-        fab = fab.replace("<a ", '<a target="_blank" rel="noopener" ', 1)
-
-    # 3) forza classe wa-fab + is-visible
-    def fix_class(m):
-        cls = m.group(1)
-        parts = cls.split()
-        for need in ["wa-fab", "is-visible"]:
-            if need not in parts:
-                parts.append(need)
-        return f'class="{" ".join(parts)}"'
-    if re.search(r'class="[^"]*"', fab, flags=re.I):
-        fab = re.sub(r'class="([^"]*)"', fix_class, fab, count=1, flags=re.I)
-    else:
-        fab = fab.replace("<a ", '<a class="wa-fab is-visible" ', 1)
-
-    # 4) contenuto: SOLO icona + svg (niente testo visibile)
-    inner = f'''
+def h1_title(text):
+    # nome casa dal testo dell'h1: None se è vuoto o troppo lungo
+    t = " ".join(text.split())
+    return t if 2 <= len(t) <= 80 else None
+
+def fab_href(title=None):
+    # href del FAB (anche quello che mette bulk_fix nelle schede: il build è
+    # già come lo lascerebbe questa patch)
+    return wa_link(f"Ciao! Vorrei disponibilità per {title}." if title else DEFAULT_MSG)
+
+# contenuto del FAB: SOLO icona + svg (il testo lo nasconde il CSS)
+FAB_INNER = f'''
 <span class="wa-fab__icon" aria-hidden="true">{WA_SVG}</span>
 <span class="wa-fab__text" aria-hidden="true">WhatsApp</span>
 '''.strip()
-    fab = re.sub(r'(<a[^>]*id="waSticky"[^>]*>)[\s\S]*?(</a>)', rf'\1{inner}\2', fab, flags=re.I)
-
-    # sostituisci nel documento
-    html = html[:blocks[0].start()] + fab + html[blocks[0].end():]
-    return html
-
-def normalize_top_buttons(html: str, msg: str) -> str:
-    href = wa_link(msg)
-    for btn_id in ["waHero", "waFooter"]:
-        # se esiste un anchor con quell'id, setta href (fallback HTML)
-        html = re.sub(
-            rf'(<a[^>]*id="{btn_id}"[^>]*)(>)',
-            lambda m: (m.group(1) + ('' if re.search(r'href="', m.group(1), flags=re.I) else f' href="{href}"') + m.group(2)),
-            html,
-            flags=re.I
-        )
-        # se l'href c'è già, lo aggiorna
-        html = re.sub(
-            rf'(<a[^>]*id="{btn_id}"[^>]*href=")[^"]*(")',
-            rf'\1{href}\2',
-            html,
-            flags=re.I
-        )
-    return html
+
+def page_title(eng):
+    # prova a prendere H1 come nome casa (il primo con solo testo dentro)
+    def title(pieces, doc):
+        inner = pieces[1:-1]
+        if "wa_title" not in doc.state and all(isinstance(p, str) for p in inner):
+            t = h1_title(html.unescape("".join(inner)))
+            if t:
+                doc.state["wa_title"] = t
+        return pieces
+
+    def on_h1(tag, doc):
+        if "wa_title" not in doc.state:
+            doc.capture(tag, title)
+
+    eng.on_start("h1", on_h1)
+
+def normalize_fab(eng):
+    def patch(pieces, doc):
+        # 1) rimuove eventuali duplicati di waSticky: tiene il primo
+        doc.state["wa_fabs"] = doc.state.get("wa_fabs", 0) + 1
+        if doc.state["wa_fabs"] > 1:
+            return []
+
+        # 2) forza href funzionante direttamente in HTML + target blank
+        # (il titolo è l'h1 della pagina, che viene prima del FAB in fondo)
+        fab = pieces[0]
+        href = fab_href(doc.state.get("wa_title"))
+        if fab.get("href") != href:
+            fab.set("href", href)
+        if not fab.has("target"):
+            fab.set("target", "_blank")
+            fab.set("rel", "noopener")
+
+        # 3) forza classe wa-fab + is-visible
+        parts = fab.classes
+        need = [c for c in ("wa-fab", "is-visible") if c not in parts]
+        if need:
+            fab.set("class", " ".join(parts + need))
+
+        # 4) contenuto: SOLO icona + svg (niente testo visibile)
+        return [fab, FAB_INNER, pieces[-1]]
+
+    def on_id(tag, value, doc):
+        if tag.name == "a" and value == "waSticky":
+            doc.capture(tag, patch)
+
+    eng.on_attr("id", on_id, contains="waSticky")
+
+def normalize_top_buttons(eng):
+    # waHero/waFooter: href al numero (fallback HTML), sempre col messaggio generico
+    href = wa_link(DEFAULT_MSG)
+
+    def on_id(tag, value, doc):
+        if tag.name == "a" and value in ("waHero", "waFooter") and tag.get("href") != href:
+            tag.set("href", href)
+
+    eng.on_attr("id", on_id, contains="wa")
 
 def ensure_css(css: str) -> str:
     marker = "/* === WA FAB MOBILE FIX === */"
@@ -171,30 +157,15 @@ def ensure_css(css: str) -> str:
 """
     return css + "\n\n" + block
 
+HTML = (page_title, normalize_top_buttons, normalize_fab)
+
+PASS = Pass("fix_whatsapp_mobile", "WA FAB MOBILE FIX",
+            files={"css": ensure_css},
+            html={"index": HTML, "case": HTML},
+            after=("wa_svg_fix",))
+
 def main():
-    # lista file HTML
-    if CASE_DIR.exists():
-        HTML_FILES.extend(sorted(CASE_DIR.glob("*.html")))
-
-    # CSS
-    if CSS.exists():
-        backup(CSS)
-        css = CSS.read_text(encoding="utf-8")
-        CSS.write_text(ensure_css(css), encoding="utf-8")
-
-    # HTML
-    for p in HTML_FILES:
-        if not p.exists():
-            continue
-        backup(p)
-        html = p.read_text(encoding="utf-8")
-
-        title = extract_title(html)
-        msg = DEFAULT_MSG if not title else f"Ciao! Vorrei disponibilità per {title}."
-        html = normalize_top_buttons(html, DEFAULT_MSG)
-        html = normalize_fab(html, msg)
-
-        p.write_text(html, encoding="utf-8")
+    run([PASS], "fix_whatsapp_mobile")
 
     print("✅ FATTO: su mobile sparisce la scritta, FAB è cerchio SVG premium e il link punta sempre al numero.")
     print("➡️ Ora fai commit & push.")
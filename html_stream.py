@@ -0,0 +1,998 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motore di trasformazione HTML in una passata — Salento Stay
+
+Le patch facevano 5-15 re.sub in fila, ognuna su tutto il documento. Qui
+il file viene letto a blocchi e spezzato in token (testo, tag, commenti)
+UNA volta; ogni trasformazione registra i suoi handler e lavora sui tag
+mentre passano:
+
+    on_start("img", fn)          fn(tag, doc) su ogni <img ...>
+    on_end("body", fn)           fn(end, doc) su ogni </body>
+    on_attr(("src", "href"), fn, contains="/img/")
+                                 fn(tag, valore, doc) -> nuovo valore o None
+
+- Il tokenizer si ferma solo sui tag osservati (e sui tag con un attributo
+  osservato che contiene `contains`): il resto esce a blocchi di testo,
+  trovati da una regex sola. Il costo è una scansione del file, più un giro
+  Python per tag interessante, qualunque sia il numero di trasformazioni
+- Il tokenizer è lossless: un tag non toccato esce byte per byte uguale,
+  un attributo cambiato viene sostituito al suo posto nel testo originale
+- tag.before / tag.after: HTML da mettere prima/dopo il tag; end.then:
+  pezzi da emettere subito dopo il tag di chiusura
+- doc.capture(tag, fn): trattiene UN elemento (fino al suo tag di
+  chiusura) e lo passa a fn come lista di pezzi; serve per le card. Un
+  elemento non chiuso, con dentro un altro dello stesso tipo o più grande
+  di MAX_CAPTURE esce così com'è (niente card "fuse")
+- doc.slot(fn): segnaposto riempito a fine documento, quando fn sa tutto
+  (es. il titolo e il PDF per la action bar); l'output viene trattenuto
+  solo da quando si apre il primo slot
+- doc.drop(until): toglie tutto da qui fino al token per cui until è vero
+  (vecchi blocchi tra un marcatore e la griglia delle card); se il
+  documento finisce prima, il pezzo trattenuto torna com'è. Un drop aperto
+  dentro un altro toglie la sua parte anche se quello fuori poi torna,
+  come i re.sub in fila che c'erano prima
+- doc.render(html): markup aggiunto da una trasformazione (il FAB che
+  manca) passato dalle stesse trasformazioni, come se ci fosse già
+- on_comment(fn) sui commenti, on_finish(fn) a fine documento (controlli,
+  HTML da mettere in fondo)
+- Memoria: un blocco di lettura + l'elemento catturato più grande
+
+Trasformazioni pronte (TRANSFORMS): rel-img-paths, lazy-img, img-size,
+wa-ghost, card-data, card-overlay, card-media-link, fab, action-bar.
+
+Uso:
+    engine = Engine([rel_img_paths, lazy_img, fab(inject=FAB_HTML)])
+    engine.transform_file(INDEX, out.path(INDEX))
+
+Run:
+  python3 html_stream.py [--t=lazy-img,rel-img-paths,...] [--profile] file.html ...
+"""
+
+import html as htmllib
+import re
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+CHUNK = 1 << 16
+MAX_TAG = 1 << 16       # un "<" senza ">" entro questa distanza è testo
+MAX_CAPTURE = 1 << 20   # oltre, la cattura si arrende e l'elemento esce com'è
+
+RAW_TEXT = ("script", "style")
+
+# tag completo, ">" dentro le virgolette compreso (unrolled: niente backtracking
+# annidato); un "<" fuori dalle virgolette chiude il tentativo
+TAG = re.compile(r"""</?([A-Za-z][\w:-]*)[^<>"']*(?:(?:"[^"]*"|'[^']*')[^<>"']*)*>""")
+# tag ancora a metà: arriva fino alla fine del buffer senza errori
+TAG_OPEN = re.compile(r"""</?[A-Za-z][\w:-]*[^<>"']*(?:(?:"[^"]*"|'[^']*')[^<>"']*)*(?:"[^"]*|'[^']*)?\Z""")
+ATTR = re.compile(r"""([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?""")
+RAW_END = {name: re.compile(f"</{name}", re.I) for name in RAW_TEXT}
+ANY = re.compile("<")
+
+
+def tokenize(chunks, interest=lambda: ANY):
+    """(tipo, testo, nome) da un iterabile di stringhe; tipo: text/start/end/comment/other.
+
+    interest() dà la regex dei soli "<" da spezzare in token (può cambiare
+    tra un token e l'altro): tutto il resto esce come testo a blocchi interi,
+    la ricerca gira in C e non c'è un giro Python per ogni tag.
+    """
+    it = iter(chunks)
+    buf, pos, eof = "", 0, False
+    raw_end = None  # dentro <script>/<style>: si cerca solo la chiusura
+    scan = 0        # commento aperto: fin dove si è già cercato "-->"
+    while True:
+        n = len(buf)
+        while pos < n:
+            if raw_end:
+                m = raw_end.search(buf, pos)
+                if m:
+                    if m.start() > pos:
+                        yield "text", buf[pos:m.start()], None
+                    pos, raw_end = m.start(), None
+                    continue
+                safe = n if eof else max(pos, n - 8)
+                if safe > pos:
+                    yield "text", buf[pos:safe], None
+                    pos = safe
+                break
+
+            m = interest().search(buf, pos)
+            if m is None:
+                # niente da spezzare; si tiene solo un possibile tag a metà in coda
+                cut = n
+                if not eof:
+                    lt = buf.rfind("<", pos)
+                    if lt > buf.rfind(">", pos) and n - lt < MAX_TAG:
+                        cut = lt
+                if cut > pos:
+                    yield "text", buf[pos:cut], None
+                    pos = cut
+                break
+            i = m.start()
+            if i > pos:
+                yield "text", buf[pos:i], None
+                pos = i
+            if n - pos < 4 and not eof:
+                break
+
+            if buf.startswith("<!--", pos):
+                j = buf.find("-->", max(pos + 4, scan))
+                if j >= 0:
+                    yield "comment", buf[pos:j + 3], None
+                    pos, scan = j + 3, 0
+                    continue
+                if eof:
+                    # commento mai chiuso: per il browser arriva fino in fondo
+                    yield "text", buf[pos:], None
+                    pos = n
+                    continue
+                scan = n - 2
+                break
+            elif buf.startswith(("<!", "<?"), pos):
+                j = buf.find(">", pos)
+                if j >= 0:
+                    yield "other", buf[pos:j + 1], None
+                    pos = j + 1
+                    continue
+            else:
+                m = TAG.match(buf, pos)
+                if m:
+                    raw = m.group(0)
+                    name = m.group(1).lower()
+                    if raw[1] == "/":
+                        yield "end", raw, name
+                    else:
+                        yield "start", raw, name
+                        if name in RAW_END and not raw.endswith("/>"):
+                            raw_end = RAW_END[name]
+                    pos = m.end()
+                    continue
+                if eof or not TAG_OPEN.match(buf, pos):
+                    yield "text", "<", None
+                    pos += 1
+                    continue
+
+            # costrutto non chiuso: si aspetta il prossimo blocco, o (a fine
+            # file / troppo lungo) il "<" è testo
+            if eof or n - pos > MAX_TAG:
+                yield "text", "<", None
+                pos += 1
+                continue
+            break
+
+        if eof:
+            return
+        chunk = next(it, None)
+        if chunk is None:
+            eof = True
+        buf, pos, scan = buf[pos:] + (chunk or ""), 0, max(0, scan - pos)
+
+
+def _quote(value) -> str:
+    return htmllib.escape(str(value), quote=True)
+
+
+QUOTED = {"&amp;": "&", "&lt;": "<", "&gt;": ">", "&quot;": '"', "&#x27;": "'", "&#39;": "'"}
+QUOTED_RE = re.compile("|".join(QUOTED))
+
+
+def _unquote(value: str) -> str:
+    # il contrario di _quote e basta: "&copy=" in un href resta com'è
+    return QUOTED_RE.sub(lambda m: QUOTED[m.group()], value) if "&" in value else value
+
+
+class Tag:
+    """Tag di apertura: attributi letti solo se servono, riscritti al loro posto."""
+
+    __slots__ = ("name", "raw", "_attrs", "changes", "added", "before", "after")
+
+    def __init__(self, name, raw):
+        self.name = name
+        self.raw = raw
+        self._attrs = None
+        self.changes = {}  # nome -> nuovo valore (None = rimosso)
+        self.added = {}
+        self.before = ""
+        self.after = ""
+
+    @property
+    def self_closing(self) -> bool:
+        return self.raw.endswith("/>")
+
+    def _end(self) -> int:
+        return len(self.raw) - (2 if self.self_closing else 1)
+
+    def attrs(self):
+        if self._attrs is None:
+            found = {}
+            for m in ATTR.finditer(self.raw, 1 + len(self.name), self._end()):
+                key = m.group(1).lower()
+                if key not in found:
+                    v2, v3, v4 = m.group(2, 3, 4)
+                    value = v2 if v2 is not None else v3 if v3 is not None else v4 if v4 is not None else ""
+                    found[key] = (_unquote(value), m.start(), m.end(), m.group(1))
+            self._attrs = found
+        return self._attrs
+
+    def get(self, name, default=None):
+        if self.changes or self.added:
+            if name in self.changes:
+                value = self.changes[name]
+                return default if value is None else value
+            if name in self.added:
+                return self.added[name]
+        a = (self._attrs if self._attrs is not None else self.attrs()).get(name)
+        return a[0] if a else default
+
+    def has(self, name) -> bool:
+        return self.get(name) is not None
+
+    def set(self, name, value):
+        if name in self.attrs():
+            self.changes[name] = value
+        else:
+            self.added[name] = value
+
+    def remove(self, name):
+        self.added.pop(name, None)
+        if name in self.attrs():
+            self.changes[name] = None
+
+    @property
+    def classes(self):
+        return (self.get("class") or "").split()
+
+    def add_class(self, cls):
+        if cls not in self.classes:
+            self.set("class", " ".join(self.classes + [cls]))
+
+    def __str__(self):
+        s = self.raw
+        if self.changes or self.added:
+            parts, last = [], 0
+            for key, (_, start, end, orig) in sorted(self.attrs().items(), key=lambda kv: kv[1][1]):
+                if key in self.changes:
+                    value = self.changes[key]
+                    parts.append(s[last:start].rstrip() if value is None else s[last:start])
+                    if value is not None:
+                        parts.append(f'{orig}="{_quote(value)}"')
+                    last = end
+            end = self._end()
+            parts.append(s[last:end])
+            parts.extend(f' {k}="{_quote(v)}"' for k, v in self.added.items())
+            parts.append(s[end:])
+            s = "".join(parts)
+        return self.before + s + self.after
+
+
+class End:
+    __slots__ = ("name", "raw", "before", "after", "then")
+
+    def __init__(self, name, raw):
+        self.name = name
+        self.raw = raw
+        self.before = ""
+        self.after = ""
+        self.then = []
+
+    def __str__(self):
+        return self.before + self.raw + self.after
+
+
+class Slot:
+    """Segnaposto risolto a fine documento."""
+
+    def __init__(self, doc, fn):
+        self.doc = doc
+        self.fn = fn
+
+    def __str__(self):
+        return self.fn(self.doc) or ""
+
+
+class Capture:
+    __slots__ = ("tag", "fns", "pieces", "size")
+
+    def __init__(self, tag, fn):
+        self.tag = tag
+        self.fns = [fn]
+        self.pieces = []
+        self.size = 0
+
+
+class Drop:
+    __slots__ = ("until", "inclusive", "tags", "strip", "rest", "held", "size")
+
+    def __init__(self, until, inclusive, tags, strip, rest):
+        self.until = until
+        self.inclusive = inclusive
+        self.tags = tuple(tags)
+        self.strip = strip
+        self.rest = rest
+        self.held = []
+        self.size = 0
+
+
+def text_of(pieces) -> str:
+    """Testo (senza tag) di una lista di pezzi catturati."""
+    return re.sub(r"<[^>]+>", "", "".join(map(str, pieces)))
+
+
+class Doc:
+    """Stato di UN documento durante la passata."""
+
+    def __init__(self, engine, write, state=None, fragment=False):
+        self.engine = engine
+        self.write = write
+        self.state = {} if state is None else state  # appunti delle trasformazioni (per documento)
+        self.fragment = fragment  # pezzo aggiunto da render(): niente on_finish
+        self.captures = []
+        self.drops = []      # drop aperti, l'ultimo è quello che trattiene
+        self.lstrip = False  # dopo un drop(strip=...): via gli spazi / l'a capo che seguono
+        self.indent = ""     # rientro in fondo al testo già passato: un drop(line=True) lo toglie
+        self.pending = None  # output trattenuto dal primo slot in poi
+        self._regex = engine.regex()
+
+    def interest(self):
+        return self._regex
+
+    @property
+    def dropping(self):
+        return self.drops[-1] if self.drops else None
+
+    def _captures_changed(self):
+        # la chiusura (e l'apertura) dei tag catturati, e i tag che possono
+        # chiudere un drop, vanno visti anche se nessuno li osserva
+        names = {c.tag.name for c in self.captures}
+        for d in self.drops:
+            names.update(d.tags)
+        self._regex = self.engine.regex(frozenset(names))
+
+    def capture(self, tag, fn):
+        top = self.captures[-1] if self.captures else None
+        if top is not None and top.tag is tag:
+            top.fns.append(fn)
+        else:
+            self.captures.append(Capture(tag, fn))
+            self._captures_changed()
+
+    def slot(self, fn) -> Slot:
+        return Slot(self, fn)
+
+    def drop(self, until, inclusive=False, tags=(), strip=False, rest=None, line=False):
+        """Toglie dall'output tutto da qui (il token corrente compreso) fino
+        al token per cui until(tipo, testo, nome) è vero.
+
+        inclusive: anche quel token va via (una chiusura), se no resta (e i
+        suoi handler girano a drop finito); tags: i tag che until deve
+        vedere; strip: via anche gli spazi dopo; line: la riga intera, cioè
+        il rientro prima e un a capo dopo; rest(pezzi) -> pezzi da emettere
+        se il documento finisce prima (None: tornano com'erano).
+        """
+        if line:
+            self.indent = ""
+        self.drops.append(Drop(until, inclusive, tags, "line" if line else strip, rest))
+        self._captures_changed()
+
+    def _stop_drop(self, d):
+        # via d e i drop aperti dentro (la loro parte era dentro la sua)
+        del self.drops[self.drops.index(d):]
+        self._captures_changed()
+        self.lstrip = d.strip
+        return d
+
+    def render(self, html: str) -> str:
+        """html aggiunto da una trasformazione, passato dalle stesse
+        trasformazioni con lo stato di questo documento."""
+        parts = []
+        frag = Doc(self.engine, parts.append, state=self.state, fragment=True)
+        frag.feed(tokenize([html], frag.interest))
+        return "".join(parts)
+
+    def _hold(self, piece):
+        d = self.drops[-1]
+        d.held.append(piece)
+        d.size += len(piece) if isinstance(piece, str) else len(getattr(piece, "raw", ""))
+        if d.size > MAX_CAPTURE:
+            # troppo lungo: si arrende, quello che ha trattenuto esce com'è
+            self._stop_drop(d)
+            self.lstrip = False
+            for p in d.held:
+                self.emit(p)
+
+    def emit(self, piece):
+        if self.captures:
+            c = self.captures[-1]
+            c.pieces.append(piece)
+            c.size += len(piece) if isinstance(piece, str) else len(getattr(piece, "raw", ""))
+            if c.size > MAX_CAPTURE:
+                self._abort(len(self.captures) - 1)
+            return
+        if self.drops:
+            self._hold(piece)
+            return
+        self._out(piece)
+
+    def _out(self, piece):
+        if self.indent:
+            indent, self.indent = self.indent, ""
+            self._out(indent)
+        if isinstance(piece, Slot) and self.pending is None:
+            self.pending = []
+        if self.pending is not None:
+            self.pending.append(piece)
+        else:
+            self.write(piece if isinstance(piece, str) else str(piece))
+
+    def _abort(self, index):
+        # la cattura index (e quelle dentro) escono senza trasformazioni
+        while len(self.captures) > index:
+            c = self.captures.pop()
+            self._captures_changed()
+            for p in c.pieces:
+                self.emit(p)
+
+    def _close(self, end):
+        idx = next((i for i in range(len(self.captures) - 1, -1, -1)
+                    if self.captures[i].tag.name == end.name), None)
+        if idx is None:
+            return False
+        if idx < len(self.captures) - 1:
+            self._abort(idx + 1)
+        c = self.captures[-1]
+        c.pieces.append(end)
+        self.captures.pop()
+        self._captures_changed()
+        pieces = c.pieces
+        for fn in c.fns:
+            if not pieces:
+                break  # elemento già tolto da una fn prima
+            pieces = fn(pieces, self)
+        for p in pieces:
+            self.emit(p)
+        return True
+
+    def feed(self, tokens):
+        for kind, raw, name in tokens:
+            if self.drops:
+                # ogni until vede ogni token; si chiude il drop più esterno
+                # che arriva qui, e con lui quelli aperti dentro
+                hit = None
+                for d in list(self.drops):
+                    if d.until(kind, raw, name) and hit is None:
+                        hit = d
+                if hit is not None:
+                    if hit.inclusive:
+                        del self.drops[self.drops.index(hit) + 1:]
+                        self._token(kind, raw, name)
+                        if hit in self.drops:
+                            self._stop_drop(hit)
+                    else:
+                        self._stop_drop(hit)
+                        self._token(kind, raw, name)
+                    continue
+            self._token(kind, raw, name)
+        self.finish()
+
+    def _token(self, kind, raw, name):
+        if self.lstrip:
+            if kind == "text":
+                if self.lstrip == "line":
+                    self.lstrip = False
+                    if raw.startswith("\n"):
+                        raw = raw[1:]
+                else:
+                    raw = raw.lstrip()
+                if not raw:
+                    return
+            self.lstrip = False
+        eng = self.engine
+        if kind == "start":
+            if self.captures:
+                # una card dentro una card = la prima non era chiusa
+                for i, c in enumerate(self.captures):
+                    if c.tag.name == name:
+                        self._abort(i)
+                        break
+            elif name not in eng.starts and not eng.attrs:
+                self._pass(raw)  # tag che non interessa a nessuno: esce com'è
+                return
+            tag = Tag(name, raw)
+            for fn in eng.starts.get(name, ()):
+                fn(tag, self)
+            for key, fn, needle in eng.attrs:
+                old = tag.get(key)
+                if old is not None and needle in old:
+                    new = fn(tag, old, self)
+                    if new is not None and new != old:
+                        tag.set(key, new)
+            self.emit(tag)
+
+        elif kind == "end":
+            if not self.captures and name not in eng.ends:
+                self._pass(raw)
+                return
+            end = End(name, raw)
+            for fn in eng.ends.get(name, ()):
+                fn(end, self)
+            if not self._close(end):
+                self.emit(end)
+            for p in end.then:
+                self.emit(p)
+
+        else:
+            if kind == "comment":
+                for fn in eng.comments:
+                    fn(raw, self)
+            if self.captures:
+                self.emit(raw)
+            elif kind == "text" and not self.drops:
+                # il rientro in fondo resta da parte finché non arriva altro
+                head = raw.rstrip(" \t")
+                if head.endswith("\n") and len(head) < len(raw):
+                    self._out(head)
+                    self.indent = raw[len(head):]
+                else:
+                    self._out(raw)
+            else:
+                self._pass(raw)
+
+    def _pass(self, raw):
+        if self.drops:
+            self._hold(raw)
+        else:
+            self._out(raw)
+
+    def finish(self):
+        self._abort(0)
+        while self.drops:
+            # il documento finisce prima della fine del drop: quello che ha
+            # trattenuto torna (nel drop di fuori, se c'è)
+            d = self._stop_drop(self.drops[-1])
+            self.lstrip = False
+            for p in (d.held if d.rest is None else d.rest(d.held)):
+                self.emit(p)
+        if not self.fragment:
+            for fn in self.engine.finishers:
+                tail = fn(self)
+                if tail:
+                    self.emit(tail)
+        if self.indent:
+            self._out("")
+        if self.pending is not None:
+            for p in self.pending:
+                self.write(str(p))
+            self.pending = None
+
+
+class Engine:
+    def __init__(self, transforms=()):
+        self.starts = defaultdict(list)
+        self.ends = defaultdict(list)
+        self.attrs = []  # (attributo, fn, contains)
+        self.comments = []   # fn(testo, doc) su ogni commento
+        self.finishers = []  # fn(doc) -> HTML da mettere in fondo o None
+        self.watched = {"start": set(), "end": set()}  # tag che arrivano come Tag/End
+        self._regex = {}
+        for register in transforms:
+            register(self)
+
+    @staticmethod
+    def _names(names):
+        return (names,) if isinstance(names, str) else names
+
+    def watch(self, tags, start=True, end=True):
+        """Tag da vedere come oggetti anche senza handler (es. i link dentro una card)."""
+        for kind, on in (("start", start), ("end", end)):
+            if on:
+                self.watched[kind].update(self._names(tags))
+        self._regex.clear()
+
+    def on_start(self, tags, fn):
+        self.watch(tags, end=False)
+        for t in self._names(tags):
+            self.starts[t].append(fn)
+
+    def on_end(self, tags, fn):
+        self.watch(tags, start=False)
+        for t in self._names(tags):
+            self.ends[t].append(fn)
+
+    def on_attr(self, names, fn, contains=""):
+        for a in self._names(names):
+            self.attrs.append((a, fn, contains))
+        self._regex.clear()
+
+    def on_comment(self, fn):
+        self.comments.append(fn)
+
+    def on_finish(self, fn):
+        self.finishers.append(fn)
+
+    def regex(self, captured=frozenset()):
+        """I "<" da spezzare in token (il resto è testo), con i tag catturati aperti."""
+        rx = self._regex.get(captured)
+        if rx is None:
+            alt = lambda names: "|".join(map(re.escape, sorted(names)))
+            parts = [r"<!--", rf"<(?:{alt(RAW_TEXT)})\b"]
+            if self.watched["start"]:
+                parts.append(rf"<(?:{alt(self.watched['start'])})\b")
+            if self.watched["end"] | captured:
+                parts.append(rf"</(?:{alt(self.watched['end'] | captured)})\b")
+            if captured:
+                parts.append(rf"<(?:{alt(captured)})\b")
+            for a, _, needle in self.attrs:
+                # tag (qualsiasi) con l'attributo a il cui valore contiene needle
+                parts.append(rf"""<[A-Za-z][^<>]*?[\s"']{re.escape(a)}\s*=\s*["']?[^"'<>]*?{re.escape(needle)}""")
+            rx = self._regex[captured] = re.compile("|".join(dict.fromkeys(parts)), re.I)
+        return rx
+
+    def run(self, chunks, write):
+        doc = Doc(self, write)
+        doc.feed(tokenize(chunks, doc.interest))
+
+    def transform_text(self, text: str) -> str:
+        parts = []
+        self.run((text[i:i + CHUNK] for i in range(0, len(text), CHUNK)), parts.append)
+        return "".join(parts)
+
+    def transform_file(self, src: Path, dst: Path):
+        """src → dst a blocchi (dst di solito è out.path(src) di OutputTxn)."""
+        with open(src, encoding="utf-8", errors="ignore", newline="") as fin, \
+                open(dst, "w", encoding="utf-8", newline="") as fout:
+            self.run(iter(lambda: fin.read(CHUNK), ""), fout.write)
+
+
+# --- trasformazioni -------------------------------------------------------
+
+def rel_img_paths(eng):
+    """src/href "/img/..." → "img/..." (il sito gira anche da sottocartella)."""
+    eng.on_attr(("src", "href"), lambda tag, value, doc: value[1:] if value.startswith("/img/") else None,
+                contains="/img/")
+
+
+def lazy_img(eng):
+    """loading=lazy + decoding=async sulle <img> che non dicono niente."""
+    def on_img(tag, doc):
+        if not tag.has("loading"):
+            tag.set("loading", "lazy")
+            tag.set("decoding", "async")
+    eng.on_start("img", on_img)
+
+
+def site_file(src: str, root: Path):
+    """src di un'<img> -> file del sito sotto root, o None (remota, data:, fuori dal sito).
+
+    Le pagine stanno in root o una cartella sotto (case/): "img/x.jpg",
+    "/img/x.jpg" e "../img/x.jpg" sono lo stesso file.
+    """
+    src = htmllib.unescape(src).split("#", 1)[0].split("?", 1)[0].strip()
+    if not src or src.startswith(("//", "data:")) or "://" in src:
+        return None
+    parts = [p for p in src.split("/") if p not in ("", ".", "..")]
+    path = root.joinpath(*parts) if parts else None
+    return path if path is not None and path.is_file() else None
+
+
+def img_size(eng):
+    """width/height + aspect-ratio (dalle intestazioni, image_size.py) sulle
+    <img> locali che non hanno misure: il browser tiene lo spazio prima che
+    arrivi la foto."""
+    import image_size
+
+    def on_img(tag, doc):
+        if tag.has("width") or tag.has("height"):
+            return
+        path = site_file(tag.get("src") or "", image_size.ROOT)
+        size = image_size.measure(path) if path else None
+        if not size:
+            return
+        w, h = size
+        tag.set("width", str(w))
+        tag.set("height", str(h))
+        style = (tag.get("style") or "").strip().rstrip(";")
+        if "aspect-ratio" not in style:
+            tag.set("style", f"{style}; aspect-ratio: {w} / {h}" if style else f"aspect-ratio: {w} / {h}")
+    eng.on_start("img", on_img)
+
+
+def _is_card(tag) -> bool:
+    return "card" in tag.classes
+
+
+def _case_href(pieces):
+    for p in pieces:
+        if isinstance(p, Tag) and p.name == "a" and "case/" in (p.get("href") or ""):
+            return p.get("href")
+    return None
+
+
+def wa_ghost(eng):
+    """Toglie dalle card i link/span con il solo testo "WhatsApp"."""
+    def drop(pieces, doc):
+        return [] if text_of(pieces[1:-1]).strip() == "WhatsApp" else pieces
+
+    def on_article(tag, doc):
+        doc.state["in_card"] = _is_card(tag)
+
+    def on_article_end(end, doc):
+        doc.state["in_card"] = False
+
+    def on_inline(tag, doc):
+        if doc.state.get("in_card"):
+            doc.capture(tag, drop)
+
+    eng.on_start("article", on_article)
+    eng.on_end("article", on_article_end)
+    eng.on_start(("a", "span"), on_inline)
+
+
+GUESTS = re.compile(r"👥\s*([0-9]{1,2})\s*osp", re.I)
+GUESTS_ALT = re.compile(r"\b([0-9]{1,2})\s*ospiti\b", re.I)
+ZONE = re.compile(r"📍\s*([A-Za-zÀ-ÿ0-9'’\-\s]{2,40})")
+
+
+def _card_data(card, body):
+    if not card.has("data-guests"):
+        m = GUESTS.search(body) or GUESTS_ALT.search(body)
+        if m:
+            card.set("data-guests", m.group(1))
+    if not card.has("data-zone"):
+        m = ZONE.search(body)
+        if m:
+            card.set("data-zone", " ".join(m.group(1).split()))
+
+
+def card_data(eng):
+    """data-guests/data-zone dalle chip della card (👥 N ospiti, 📍 zona)."""
+    def patch(pieces, doc):
+        _card_data(pieces[0], "".join(map(str, pieces[1:])))
+        return pieces
+
+    def on_article(tag, doc):
+        if _is_card(tag):
+            doc.capture(tag, patch)
+
+    eng.on_start("article", on_article)
+
+
+def card_overlay(eng):
+    """data-guests/data-zone dalle chip + link overlay che rende cliccabile la card."""
+    def patch(pieces, doc):
+        card = pieces[0]
+        body = "".join(map(str, pieces[1:]))
+        _card_data(card, body)
+        if "cardLinkOverlay" not in body:
+            href = _case_href(pieces)
+            if href:
+                card.after += f'<a class="cardLinkOverlay" href="{href}" aria-label="Apri dettagli"></a>'
+        return pieces
+
+    def on_article(tag, doc):
+        if _is_card(tag):
+            doc.capture(tag, patch)
+
+    eng.on_start("article", on_article)
+    eng.watch("a", end=False)
+
+
+def card_media_link(eng, any_card=False):
+    """Foto della card cliccabile (<a class="card__mediaLink">) se non è già in un link.
+
+    any_card: ogni <article class="... card ...">, non solo class="card".
+    """
+    def patch(pieces, doc):
+        body = "".join(map(str, pieces[1:]))
+        if re.search(r"<a[^>]*>\s*<img", body, flags=re.I):
+            return pieces
+        href = _case_href(pieces)
+        img = next((p for p in pieces if isinstance(p, Tag) and p.name == "img"), None)
+        if href and img is not None:
+            img.before += f'<a class="card__mediaLink" href="{href}">'
+            img.after = "</a>" + img.after
+        return pieces
+
+    def on_article(tag, doc):
+        if _is_card(tag) if any_card else tag.get("class") == "card":
+            doc.capture(tag, patch)
+
+    eng.on_start("article", on_article)
+    eng.watch(("a", "img"), end=False)
+
+
+def fab(inject=None, icon=None):
+    """FAB WhatsApp: inject = markup da aggiungere prima di </body> se manca
+    #waSticky; icon = contenuto che sostituisce quello del FAB esistente."""
+    def register(eng):
+        def on_id(tag, value, doc):
+            if value != "waSticky":
+                return
+            doc.state["fab"] = True
+            if icon is not None:
+                doc.capture(tag, lambda pieces, doc: [pieces[0], icon, pieces[-1]])
+
+        def on_body_end(end, doc):
+            if inject and not doc.state.get("fab"):
+                doc.state["fab"] = True
+                # passa dalle altre trasformazioni (href, classi, icona)
+                end.before = doc.render(inject) + "\n" + end.before
+
+        eng.on_attr("id", on_id, contains="waSticky")
+        eng.on_end("body", on_body_end)
+    return register
+
+
+def default_fab(eng):
+    """FAB dei template del build (templates/fab.html + wa_icon.html)."""
+    import tpl
+    fab(inject="\n" + tpl.load("fab.html").render({"fab_url": "#"}),
+        icon=tpl.load("wa_icon.html").source)(eng)
+
+
+def action_bar(eng):
+    """Scheda casa: barra PDF + WhatsApp subito dopo il primo </h1>."""
+    def on_class(tag, value, doc):
+        doc.state["has_bar"] = True
+
+    def on_href(tag, value, doc):
+        if "pdf" not in doc.state and value.lower().endswith(".pdf"):
+            doc.state["pdf"] = value
+
+    def on_h1(tag, doc):
+        if "title" not in doc.state:
+            doc.capture(tag, title)
+
+    def title(pieces, doc):
+        doc.state.setdefault("title", text_of(pieces[1:-1]).strip())
+        return pieces
+
+    def bar(doc):
+        if doc.state.get("has_bar") or "pdf" not in doc.state:
+            return ""
+        return f"""
+      <!-- Pack A: Action Bar -->
+      <div class="action-bar">
+        <a class="btn btn--primary pdf-btn" href="{doc.state['pdf']}" target="_blank" rel="noopener">Apri scheda (PDF)</a>
+        <a class="btn btn--secondary wa-btn" id="waProperty" href="#" target="_blank" rel="noopener"
+           data-property-name="{doc.state.get('title', 'questa casa')}">Chiedi disponibilità su WhatsApp</a>
+      </div>
+"""
+
+    def on_h1_end(end, doc):
+        if not doc.state.get("bar_slot"):
+            doc.state["bar_slot"] = True
+            end.then.append(doc.slot(bar))
+
+    eng.on_attr("class", on_class, contains="action-bar")
+    eng.on_attr("href", on_href, contains=".")
+    eng.on_start("h1", on_h1)
+    eng.on_end("h1", on_h1_end)
+
+
+# --- blocchi da togliere / aggiungere (le patch dei filtri) ---------------
+
+CARDS = re.compile(r"\bcards\b", re.I)
+
+
+def cards_grid(kind, raw, name) -> bool:
+    """until per doc.drop: la griglia delle card (<div class="... cards ...">)."""
+    return kind == "start" and name == "div" and CARDS.search(Tag(name, raw).get("class") or "") is not None
+
+
+def end_of(name):
+    """until per doc.drop: la prima chiusura </name>."""
+    return lambda kind, raw, n: kind == "end" and n == name
+
+
+def after_first(name):
+    """rest per doc.drop: se lo stop non arriva, via solo fino alla prima
+    </name> (e gli spazi dopo), il resto torna."""
+    def rest(held):
+        for i, p in enumerate(held):
+            if isinstance(p, End) and p.name == name or isinstance(p, str) and p.lower() == f"</{name}>":
+                tail = held[i + 1:]
+                while tail and isinstance(tail[0], str) and not tail[0].strip():
+                    tail.pop(0)
+                if tail and isinstance(tail[0], str):
+                    tail[0] = tail[0].lstrip()
+                return tail
+        return held
+    return rest
+
+
+def drop_after_comment(marker, until, **opts):
+    """Toglie il blocco che parte dal commento marker (regex) fino a until
+    (opts come doc.drop)."""
+    def register(eng):
+        def on_comment(raw, doc):
+            if marker.fullmatch(raw):
+                doc.drop(until, **opts)
+        eng.on_comment(on_comment)
+    return register
+
+
+def drop_by_id(name, id, until, **opts):
+    """Toglie <name id="id"> fino a until (opts come doc.drop)."""
+    def register(eng):
+        def on_id(tag, value, doc):
+            if tag.name == name and value == id:
+                doc.drop(until, **opts)
+        eng.on_attr("id", on_id, contains=id)
+    return register
+
+
+def insert_before_cards(block, marker):
+    """block (che comincia con il commento marker) subito prima della
+    griglia delle card, o in fondo se non c'è; niente se il documento ha
+    già il marker."""
+    key = f"inserted:{marker}"
+
+    def register(eng):
+        def on_comment(raw, doc):
+            if raw == marker:
+                doc.state[key] = True
+
+        def on_div(tag, doc):
+            if key not in doc.state and cards_grid("start", tag.raw, tag.name):
+                doc.state[key] = True
+                tag.before = block + "\n" + tag.before
+
+        def at_end(doc):
+            if key not in doc.state:
+                return "\n" + block
+
+        eng.on_comment(on_comment)
+        eng.on_start("div", on_div)
+        eng.on_finish(at_end)
+    return register
+
+
+TRANSFORMS = {
+    "rel-img-paths": rel_img_paths,
+    "lazy-img": lazy_img,
+    "img-size": img_size,
+    "wa-ghost": wa_ghost,
+    "card-data": card_data,
+    "card-overlay": card_overlay,
+    "card-media-link": card_media_link,
+    "fab": default_fab,
+    "action-bar": action_bar,
+}
+DEFAULT = ("rel-img-paths", "lazy-img", "card-overlay", "fab")
+
+
+def transform_text(html: str, names=DEFAULT) -> str:
+    return Engine([TRANSFORMS[n] for n in names]).transform_text(html)
+
+
+def main():
+    from profiler import Profiler
+    from site_io import OutputTxn
+
+    names = DEFAULT
+    files = []
+    for a in sys.argv[1:]:
+        if a.startswith("--t="):
+            names = tuple(n for n in a.split("=", 1)[1].split(",") if n)
+        elif not a.startswith("--"):
+            files.append(Path(a))
+    unknown = [n for n in names if n not in TRANSFORMS]
+    if unknown or not files:
+        raise SystemExit(f"Uso: python3 html_stream.py [--t={','.join(TRANSFORMS)}] file.html ..."
+                         + (f"\n❌ Trasformazioni sconosciute: {', '.join(unknown)}" if unknown else ""))
+
+    engine = Engine([TRANSFORMS[n] for n in names])
+    prof = Profiler.from_argv("html_stream")
+    with prof, OutputTxn(prof=prof) as out:
+        with prof.stage("html"):
+            for f in files:
+                engine.transform_file(f, out.path(f))
+        prof.note(files=len(files), transforms=list(names))
+    print(f"✅ {len(files)} file, una passata: {', '.join(names)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Misure delle foto senza decodificarle — Salento Stay
+
+- Le <img> di card e schede non dicono quanto sono grandi: finché la foto
+  non arriva il browser non sa che spazio tenerle e la pagina salta.
+  Con width/height (e aspect-ratio) lo spazio è riservato da subito
+- Si leggono solo le intestazioni, niente pixel e niente Pillow:
+    JPEG  il segmento SOF (C0–CF tranne C4/C8/CC), saltando gli altri per
+          lunghezza; l'Orientation dell'EXIF (APP1) 5–8 scambia i lati,
+          come fanno i browser e photo_tune.normalize()
+    PNG   IHDR
+    WebP  VP8 / VP8L / VP8X
+    GIF   lo schermo logico
+- Cache in .store/sizes.json: misure per sha256 del file (stessa foto,
+  stesso posto in INBOX o in img/) e, per i file del sito, size/mtime
+  dell'ultima volta come in build_sources: un file che non cambia non si
+  rilegge né si ri-hasha
+- bulk_fix.py misura le foto di INBOX (ha già gli sha) e le mette nei
+  template; fix_img_size.py (pass di patch_runner) fa lo stesso sulle
+  <img> locali delle pagine che non le hanno
+
+Run:
+  python3 image_size.py <foto> [...]
+  python3 image_size.py list
+"""
+
+import json
+import os
+import struct
+import sys
+from pathlib import Path
+
+from asset_store import file_digest
+
+ROOT = Path(".").resolve()
+CACHE = ROOT / ".store" / "sizes.json"
+
+# cambia se cambia il modo di misurare: la cache si rifà
+VERSION = 1
+
+# SOF: C0–CF tranne DHT (C4), JPG (C8) e DAC (CC)
+SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# marker senza lunghezza: TEM, RST0–7, SOI
+STANDALONE = {0x01, *range(0xD0, 0xD9)}
+
+_cache = None
+_dirty = False
+
+
+def _orientation(exif: bytes) -> int:
+    """Tag 0x0112 dell'IFD0 (blocco TIFF dopo "Exif\\0\\0"), 1 se non c'è."""
+    if len(exif) < 8 or exif[:2] not in (b"II", b"MM"):
+        return 1
+    order = "<" if exif[:2] == b"II" else ">"
+    ifd = struct.unpack(order + "I", exif[4:8])[0]
+    if ifd + 2 > len(exif):
+        return 1
+    count = struct.unpack(order + "H", exif[ifd:ifd + 2])[0]
+    for n in range(count):
+        at = ifd + 2 + n * 12
+        if at + 12 > len(exif):
+            break
+        tag, kind = struct.unpack(order + "HH", exif[at:at + 4])
+        if tag == 0x0112 and kind == 3:  # SHORT
+            return struct.unpack(order + "H", exif[at + 8:at + 10])[0]
+    return 1
+
+
+def _jpeg(f):
+    orient = 1
+    while True:
+        b = f.read(1)
+        if not b:
+            return None
+        if b != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":  # riempimento tra i marker
+            marker = f.read(1)
+        if not marker:
+            return None
+        m = marker[0]
+        if m in STANDALONE or m == 0x00:
+            continue
+        if m in (0xD9, 0xDA):  # EOI, SOS: SOF non c'era
+            return None
+        head = f.read(2)
+        if len(head) < 2:
+            return None
+        length = struct.unpack(">H", head)[0] - 2
+        if m in SOF:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            h, w = struct.unpack(">HH", data[1:5])
+            return (h, w) if orient in (5, 6, 7, 8) else (w, h)
+        if m == 0xE1 and orient == 1:
+            data = f.read(length)
+            if data[:6] == b"Exif\0\0":
+                orient = _orientation(data[6:])
+        else:
+            f.seek(length, os.SEEK_CUR)
+
+
+def _png(head):
+    if head[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", head[16:24])
+
+
+def _webp(head):
+    chunk = head[12:16]
+    if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+        w, h = struct.unpack("<HH", head[26:30])
+        return w & 0x3FFF, h & 0x3FFF
+    if chunk == b"VP8L" and head[20:21] == b"\x2f":
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+    return None
+
+
+def read(path: Path):
+    """(larghezza, altezza) come la foto va mostrata, o None se il formato non si conosce."""
+    with open(path, "rb") as f:
+        head = f.read(32)
+        if head[:2] == b"\xff\xd8":
+            f.seek(2)
+            return _jpeg(f)
+    if head[:8] == b"\x89PNG\r\n\x1a\n":
+        return _png(head)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return _webp(head)
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", head[6:10])
+    return None
+
+
+def _load():
+    global _cache
+    if _cache is None:
+        try:
+            data = json.loads(CACHE.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        if data.get("v") != VERSION:
+            data = {"v": VERSION, "sizes": {}, "files": {}}
+        _cache = data
+    return _cache
+
+
+def save():
+    """Scrive la cache se è cambiata, unendola a quella su disco (altri processi
+    del pool di patch_runner possono aver misurato altre foto)."""
+    global _cache
+    if not _dirty:
+        return
+    mine = _load()
+    _cache = None
+    disk = _load()
+    disk["sizes"].update(mine["sizes"])
+    disk["files"].update(mine["files"])
+    _write(disk)
+
+
+def _write(data):
+    global _dirty
+    CACHE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = CACHE.with_name(f".tmp-{os.getpid()}-{CACHE.name}")
+    tmp.write_text(json.dumps(data, separators=(",", ":"), sort_keys=True), encoding="utf-8")
+    os.replace(tmp, CACHE)
+    _dirty = False
+
+
+def lookup(sha: str):
+    """Misure già note della foto sha, o None."""
+    size = _load()["sizes"].get(sha)
+    return tuple(size) if size else None
+
+
+def measure(path: Path, sha: str = None):
+    """(larghezza, altezza) di path (sha se già noto), dalla cache se c'è.
+
+    -> None se il file manca o il formato non si conosce. Le misure nuove
+    restano in memoria fino a save().
+    """
+    global _dirty
+    cache = _load()
+    if sha is None:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        full = path.resolve()
+        key = full.relative_to(ROOT).as_posix() if ROOT in full.parents else str(full)
+        known = cache["files"].get(key)
+        if known and known[:2] == [st.st_size, st.st_mtime_ns]:
+            sha = known[2]
+        else:
+            sha = file_digest(path)
+            cache["files"][key] = [st.st_size, st.st_mtime_ns, sha]
+            _dirty = True
+    size = lookup(sha)
+    if size is None:
+        try:
+            size = read(path)
+        except OSError:
+            return None
+        if size is None:
+            return None
+        cache["sizes"][sha] = list(size)
+        _dirty = True
+    return size
+
+
+def gc(current) -> int:
+    """Tiene le misure delle foto in current (sha) e dei file del sito che
+    esistono ancora e scrive la cache (senza unirla: è il build, che gira
+    da solo); -> voci tolte."""
+    cache = _load()
+    files = {k: v for k, v in cache["files"].items() if (ROOT / k).exists()}
+    keep = set(current) | {v[2] for v in files.values()}
+    sizes = {k: v for k, v in cache["sizes"].items() if k in keep}
+    dropped = len(cache["files"]) - len(files) + len(cache["sizes"]) - len(sizes)
+    if dropped or _dirty:
+        cache["files"], cache["sizes"] = files, sizes
+        _write(cache)
+    return dropped
+
+
+def attrs(size) -> str:
+    """' width="W" height="H" style="aspect-ratio: W / H"' per un'<img>, '' senza misure."""
+    if not size:
+        return ""
+    w, h = size
+    return f' width="{w}" height="{h}" style="aspect-ratio: {w} / {h}"'
+
+
+def main():
+    args = sys.argv[1:]
+    if args == ["list"]:
+        cache = _load()
+        for key, (_, _, sha) in sorted(cache["files"].items()):
+            size = cache["sizes"].get(sha)
+            print(f"  {key:<48} {'×'.join(map(str, size)) if size else '?'}")
+        print(f"✅ {len(cache['sizes'])} misure, {len(cache['files'])} file del sito.")
+    elif args:
+        for a in args:
+            size = measure(Path(a))
+            print(f"  {a:<48} {'×'.join(map(str, size)) if size else '⚠️ formato sconosciuto'}")
+        save()
+    else:
+        print(__doc__.split("Run:", 1)[1].rstrip())
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
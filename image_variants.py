@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Foto in più larghezze per card, scheda e lightbox — Salento Stay
+
+- Le foto di INBOX sono originali da 1.5–3 MB: nelle card (una colonna
+  da ~370px) e sul telefono ne basta una frazione. Per ogni foto si fanno
+  delle varianti ridotte, una per larghezza, e le pagine le offrono con
+  srcset/sizes: il browser scarica la più piccola che gli basta
+- SLOTS: larghezze e sizes di ogni posto in cui la foto compare. I sizes
+  vengono dalle regole di styles.css (.container, .cards, .hero__grid,
+  .lb__inner): se cambiano quelle, vanno cambiati qui
+- Cache in .store/variants/<sha[:2]>/<sha>-<KEY>/: sha256 della foto
+  originale + KEY (larghezze, formati con le loro opzioni, VERSION).
+  meta.json (dimensioni dell'originale, formati) si scrive per ultimo: c'è solo se le varianti sono tutte
+  pronte. Stessa foto e stesse impostazioni: niente da rifare
+- In img/case/<slug>-<w>w.jpg le varianti sono hardlink alla cache, come
+  gli originali nello store (asset_store.py)
+- Formati: ogni larghezza anche in AVIF e WebP, se il Pillow installato
+  li sa scrivere (features.check), accanto al JPEG progressivo. Le pagine
+  li offrono in <picture>, <source> in ordine (AVIF, WebP) e il JPEG
+  nell'<img>: il browser prende il primo che conosce
+- Serve Pillow (pip install Pillow); senza, niente varianti e le pagine
+  restano con la sola foto originale
+
+Run:
+  python3 image_variants.py list
+  python3 image_variants.py formats
+  python3 image_variants.py gc
+"""
+
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+import sys
+from pathlib import Path
+
+from photo_tune import normalize
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = features = None
+
+ROOT = Path(".").resolve()
+CACHE = ROOT / ".store" / "variants"
+
+# cambia se cambia il modo di fare le varianti (non solo le impostazioni)
+VERSION = 3
+
+# formato -> (estensione, MIME, opzioni di Pillow); AVIF e WebP a qualità
+# più bassa del JPEG a parità di resa. In ordine di preferenza: il JPEG
+# c'è sempre ed è l'ultimo (l'<img>)
+ENCODERS = {
+    "avif": ("avif", "image/avif", {"quality": 55, "speed": 6}),
+    "webp": ("webp", "image/webp", {"quality": 76, "method": 6}),
+    "jpeg": ("jpg", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True, "subsampling": "4:2:0"}),
+}
+
+
+def encoders():
+    """Formati che il Pillow di questa macchina sa scrivere, in ordine di preferenza."""
+    if Image is None:
+        return ()
+    return tuple(f for f in ENCODERS if f == "jpeg" or features.check(f))
+
+
+FORMATS = encoders()
+
+# larghezze in px reali (1x, 1.5x, 2x, ...); sizes dalle regole di styles.css:
+# .container min(1140px, 92vw); .cards 3 colonne (gap 16px), una sotto 980px;
+# .hero__grid 1.05fr/.95fr (gap 28px), una colonna sotto 920px;
+# .lb__inner min(1100px, 94vw)
+SLOTS = {
+    "card": {
+        "widths": (320, 480, 640, 960),
+        "sizes": "(max-width: 980px) 92vw, (max-width: 1239px) calc((92vw - 32px) / 3), 370px",
+    },
+    "hero": {
+        "widths": (480, 720, 1080, 1440),
+        "sizes": "(max-width: 920px) 92vw, (max-width: 1239px) calc((92vw - 28px) * .475), 530px",
+    },
+    "lightbox": {
+        "widths": (960, 1440, 2048),
+        "sizes": "(max-width: 1170px) 94vw, 1100px",
+    },
+}
+
+# chiave della cache: solo ciò che cambia i file (i sizes cambiano il markup).
+# Non dipende da cosa sa fare il Pillow installato: i formati fatti davvero
+# sono in meta.json, così la cache vale anche su una macchina senza AVIF
+# (o senza Pillow) e si completa dove l'encoder c'è (current())
+KEY = hashlib.sha256(json.dumps(
+    {"v": VERSION, "w": {s: SLOTS[s]["widths"] for s in SLOTS},
+     "f": [[f, ENCODERS[f][2]] for f in ENCODERS]},
+    sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+# chiave del markup: entra nelle chiavi di card e pagine (bulk_fix.py)
+MARKUP_KEY = hashlib.sha256(json.dumps(
+    {"key": KEY, "sizes": {s: SLOTS[s]["sizes"] for s in SLOTS}},
+    sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+# villa-azzurra-640w.jpg, villa-azzurra-640w.avif
+VARIANT_RE = re.compile(r"^(?P<slug>.+)-(?P<w>\d+)w\.(?:jpg|webp|avif)$")
+
+_meta = {}
+
+
+def entry_dir(sha: str) -> Path:
+    return CACHE / sha[:2] / f"{sha}-{KEY}"
+
+
+def slot_widths(slot: str, width: int):
+    """Larghezze di uno slot per un originale largo width: mai ingrandire.
+
+    Se lo slot vorrebbe almeno l'originale, l'originale (ricompresso) è
+    la variante più grande.
+    """
+    wanted = SLOTS[slot]["widths"]
+    out = [w for w in wanted if w < width]
+    if max(wanted) >= width:
+        out.append(width)
+    return out
+
+
+def all_widths(width: int):
+    return sorted({w for slot in SLOTS for w in slot_widths(slot, width)})
+
+
+def manifest(sha: str):
+    """{"w", "h", "formats"} se le varianti di sha sono pronte, se no None."""
+    meta = _meta.get(sha)
+    if meta is None:
+        try:
+            meta = json.loads((entry_dir(sha) / "meta.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        _meta[sha] = meta
+    return meta
+
+
+def current(meta) -> bool:
+    """Varianti pronte e con tutti i formati che questo Pillow sa scrivere."""
+    return meta is not None and set(FORMATS) <= set(meta["formats"])
+
+
+def render(src: Path, sha: str):
+    """Varianti di una foto nella cache (gira nel pool di processi).
+
+    -> meta, o None se Pillow manca o la foto non si apre. Una voce con
+    meno formati di quelli possibili qui si rifà.
+    """
+    meta = manifest(sha)
+    if current(meta) or Image is None:
+        return meta
+    dst = entry_dir(sha)
+    tmp = dst.with_name(f".tmp-{os.getpid()}-{dst.name}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    try:
+        with Image.open(src) as raw:
+            # ruotata e in sRGB come la foto intera (photo_tune.py)
+            im = normalize(raw)
+            width, height = im.size
+            for w in all_widths(width):
+                h = max(1, round(height * w / width))
+                small = im if w == width else im.resize((w, h), Image.LANCZOS)
+                for fmt in FORMATS:
+                    ext, _, opts = ENCODERS[fmt]
+                    small.save(tmp / f"{w}.{ext}", fmt.upper(), **opts)
+        meta = {"w": width, "h": height, "formats": list(FORMATS)}
+        (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        # la voce vecchia (meno formati) si sposta via: i file già
+        # pubblicati sono hardlink e restano validi
+        old = dst.with_name(f".old-{os.getpid()}-{dst.name}")
+        if dst.exists():
+            os.replace(dst, old)
+        try:
+            os.replace(tmp, dst)
+        except OSError:
+            # un altro processo l'ha già fatta: vale la sua
+            shutil.rmtree(tmp, ignore_errors=True)
+        shutil.rmtree(old, ignore_errors=True)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        return None
+    _meta.pop(sha, None)
+    return manifest(sha)
+
+
+def variant_name(slug: str, w: int, fmt: str = "jpeg") -> str:
+    return f"{slug}-{w}w.{ENCODERS[fmt][0]}"
+
+
+def variant_files(meta):
+    """(larghezza, formato) di tutte le varianti di una foto."""
+    return [(w, fmt) for w in all_widths(meta["w"]) for fmt in meta["formats"]]
+
+
+def publish(out, sha: str, slug: str, img_dir: Path) -> int:
+    """Hardlink delle varianti in img_dir (via OutputTxn); ritorna quante ne ha collegate."""
+    meta = manifest(sha)
+    if meta is None:
+        return 0
+    n = 0
+    for w, fmt in variant_files(meta):
+        src, dst = entry_dir(sha) / f"{w}.{ENCODERS[fmt][0]}", img_dir / variant_name(slug, w, fmt)
+        if dst.exists() and os.path.samefile(src, dst):
+            continue
+        out.link(src, dst)
+        n += 1
+    return n
+
+
+def media_key(meta) -> str:
+    # per le chiavi di card e pagine: cambia se cambia il markup delle foto
+    return f"{MARKUP_KEY}:{meta['w']}x{meta['h']}:{','.join(meta['formats'])}" if meta else ""
+
+
+def srcset(slot: str, slug: str, meta, base: str = "", fmt: str = "jpeg") -> str:
+    return ", ".join(f"{base}img/case/{variant_name(slug, w, fmt)} {w}w" for w in slot_widths(slot, meta["w"]))
+
+
+def srcset_attrs(slot: str, slug: str, meta, base: str = "", prefix: str = "") -> str:
+    """' srcset="..." sizes="..."' (JPEG) per lo slot (o data-<prefix>srcset), '' senza varianti."""
+    if not meta:
+        return ""
+    attr = f"data-{prefix}" if prefix else ""
+    return (f' {attr}srcset="{html.escape(srcset(slot, slug, meta, base))}"'
+            f' {attr}sizes="{html.escape(SLOTS[slot]["sizes"])}"')
+
+
+def sources(slot: str, slug: str, meta, base: str = "") -> str:
+    """<source> di <picture> per i formati moderni (AVIF, WebP), '' senza varianti."""
+    if not meta:
+        return ""
+    return "".join(
+        f'<source type="{ENCODERS[fmt][1]}" srcset="{html.escape(srcset(slot, slug, meta, base, fmt))}"'
+        f' sizes="{html.escape(SLOTS[slot]["sizes"])}">'
+        for fmt in meta["formats"] if fmt != "jpeg")
+
+
+def gc(current, img_dir: Path) -> int:
+    """Toglie varianti pubblicate e voci di cache che nessuna casa usa più.
+
+    current: {slug: sha della foto}. -> byte liberati nella cache.
+    """
+    wanted = set()
+    for slug, sha in current.items():
+        meta = manifest(sha)
+        if meta is not None:
+            wanted.update(variant_name(slug, w, fmt) for w, fmt in variant_files(meta))
+    for p in img_dir.glob("*w.*"):
+        if VARIANT_RE.match(p.name) and p.name not in wanted and p.stem not in current:
+            p.unlink()
+
+    keep = {entry_dir(sha).name for sha in current.values()}
+    freed = 0
+    for d in CACHE.glob("??/*"):
+        if d.name not in keep:
+            freed += sum(f.stat().st_size for f in d.iterdir())
+            shutil.rmtree(d, ignore_errors=True)
+    return freed
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    if cmd == "list":
+        if Image is None:
+            print("⚠️ Pillow non installato: le varianti non si generano (pip install Pillow)")
+        total = 0
+        for d in sorted(CACHE.glob(f"??/*-{KEY}")):
+            meta = json.loads((d / "meta.json").read_text(encoding="utf-8"))
+            for fmt in meta["formats"]:
+                ext = ENCODERS[fmt][0]
+                sizes = {int(f.stem): f.stat().st_size for f in d.glob(f"*.{ext}")}
+                total += sum(sizes.values())
+                print(f"  {d.name[:12]}  {meta['w']}x{meta['h']:<6} {ext:<5}"
+                      + " ".join(f"{w}:{kb / 1024:.0f}K" for w, kb in sorted(sizes.items())))
+        print(f"✅ Cache varianti {KEY}: {total / 1024:.1f} KB.")
+    elif cmd == "formats":
+        for fmt, (ext, mime, opts) in ENCODERS.items():
+            ok = fmt in FORMATS
+            print(f"  {'✅' if ok else '⏭️'} {fmt:<5} {mime:<11} {opts}")
+    elif cmd == "gc":
+        # le case del catalogo e le loro foto, come le ha lasciate l'ultimo build
+        import catalog
+        conn = catalog.connect()
+        current = {r["slug"]: r["img"] for r in conn.execute(
+            "SELECT slug, img FROM build_props WHERE slug IN (SELECT slug FROM props)")}
+        freed = gc(current, ROOT / "img" / "case")
+        print(f"✅ Varianti ripulite: {freed / 1024:.1f} KB liberati.")
+    else:
+        print(__doc__.split("Run:", 1)[1].rstrip())
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
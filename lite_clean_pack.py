@@ -13,64 +13,58 @@ Does:
 - Adds minimal JS filter logic: guests range + zone
 - Adds minimal CSS for mini filters
 
-Creates timestamped .bak backups for modified files.
+Backups of the changed files go to the deduplicated store (backup_store.py,
+one snapshot per run): no .bak-<stamp> copies in the site directory.
 Run from project root:
   python3 lite_clean_pack.py
 """
 
 import re
 from pathlib import Path
-from datetime import datetime
-
-STAMP = datetime.now().strftime("%Y%m%d-%H%M%S")
+from html_stream import (after_first, card_data, card_media_link, drop_after_comment, drop_by_id, end_of,
+                         insert_before_cards, lazy_img, rel_img_paths, wa_ghost)
+from patch_runner import Pass, run
 
 ROOT = Path(".").resolve()
 INDEX = ROOT / "index.html"
-CSS = ROOT / "styles.css"
-JS = ROOT / "script.js"
 
 MARK = "LITE_CLEAN_A"
 
-def backup(p: Path):
-    if p.exists():
-        p.with_suffix(p.suffix + f".bak-{STAMP}").write_text(p.read_text(encoding="utf-8", errors="ignore"),
-                                                            encoding="utf-8")
-
-def read(p: Path) -> str:
-    return p.read_text(encoding="utf-8", errors="ignore")
-
-def write(p: Path, s: str):
-    p.write_text(s, encoding="utf-8")
-
-def normalize_spaces(s: str) -> str:
-    return re.sub(r"\s+", " ", s).strip()
-
-def ensure_rel_img_paths(html: str) -> str:
-    html = re.sub(r'src="/img/', 'src="img/', html, flags=re.I)
-    html = re.sub(r'href="/img/', 'href="img/', html, flags=re.I)
-    return html
+SMARTBAR = re.compile(r"<!--\s*PREMIUM_UX_A:SMARTBAR\s*-->", re.I)
+FILTERS = re.compile(r"<!--\s*PREMIUM_UX_A:FILTERS\s*-->", re.I)
 
-def remove_hero_smartbar(html: str) -> str:
-    # remove block if previously inserted
-    html = re.sub(r'<!--\s*PREMIUM_UX_A:SMARTBAR\s*-->[\s\S]*?</div>\s*', '', html, flags=re.I)
-    html = re.sub(r'<!--\s*PREMIUM_UX_A:SMARTBAR\s*-->[\s\S]*', '', html, flags=re.I)
+def remove_hero_smartbar(eng):
+    # remove block if previously inserted (up to the first </div>; with no
+    # </div> after it, up to the end of the file)
+    drop_after_comment(SMARTBAR, end_of("div"), inclusive=True, tags=("div",), strip=True,
+                       rest=lambda held: [])(eng)
     # remove any element with id=smartbar
-    html = re.sub(r'<div[^>]*\bid="smartbar"[^>]*>[\s\S]*?</div>\s*', '', html, flags=re.I)
-    return html
-
-def remove_heavy_filters(html: str) -> str:
-    # remove Premium filters block if present
-    html = re.sub(r'<!--\s*PREMIUM_UX_A:FILTERS\s*-->[\s\S]*?</div>\s*</div>\s*', '', html, flags=re.I)
-    html = re.sub(r'<!--\s*PREMIUM_UX_A:FILTERS\s*-->[\s\S]*?</div>\s*', '', html, flags=re.I)
+    drop_by_id("div", "smartbar", end_of("div"), inclusive=True, tags=("div",), strip=True)(eng)
+
+def remove_heavy_filters(eng):
+    # remove Premium filters block if present: up to two </div> in a row,
+    # or up to the first one if there are never two
+    def on_comment(raw, doc):
+        if not FILTERS.fullmatch(raw):
+            return
+        closed = [False]
+
+        def until(kind, raw, name):
+            if kind == "end" and name == "div":
+                if closed[0]:
+                    return True
+                closed[0] = True
+            elif kind != "text" or raw.strip():
+                closed[0] = False
+            return False
+
+        doc.drop(until, inclusive=True, tags=("div",), strip=True, rest=after_first("div"))
+
+    eng.on_comment(on_comment)
     # remove any filters bar by id
-    html = re.sub(r'<div[^>]*\bid="filtersBar"[^>]*>[\s\S]*?</div>\s*', '', html, flags=re.I)
-    return html
-
-def inject_mini_filters(html: str) -> str:
-    if f"<!-- {MARK}:MINIFILTERS -->" in html:
-        return html
+    drop_by_id("div", "filtersBar", end_of("div"), inclusive=True, tags=("div",), strip=True)(eng)
 
-    mini = f"""
+MINI = f"""
 <!-- {MARK}:MINIFILTERS -->
 <div class="miniFilters" id="miniFilters">
   <div class="miniFilters__row">
@@ -103,60 +97,13 @@ def inject_mini_filters(html: str) -> str:
 </div>
 """
 
-    # insert before the cards grid
-    m = re.search(r'(<div[^>]*class="[^"]*\\bcards\\b[^"]*"[^>]*>)', html, flags=re.I)
-    if m:
-        return html[:m.start()] + mini + "\n" + html[m.start():]
-    # fallback: append end
-    return html + "\n" + mini
-
-def add_lazy_imgs(html: str) -> str:
-    def repl(m):
-        tag = m.group(0)
-        if "loading=" in tag:
-            return tag
-        return tag.replace("<img", '<img loading="lazy" decoding="async"', 1)
-    return re.sub(r"<img\\b[^>]*>", repl, html, flags=re.I)
-
-def make_cards_clickable_and_clean(html: str) -> str:
-    # Remove duplicated text "WhatsApp" links that were appended (keep buttons like "Chiedi su WhatsApp")
-    # Remove <a ...>WhatsApp</a> inside card__foot if present
-    def clean_card(card: str) -> str:
-        card = re.sub(r'<a[^>]*data-wa-card[^>]*>\\s*WhatsApp\\s*</a>', '', card, flags=re.I)
-        card = re.sub(r'<a[^>]*>\\s*WhatsApp\\s*</a>', '', card, flags=re.I)
-
-        # Add data attributes if missing (guests and zone from the small pills)
-        if "data-guests=" not in card:
-            mg = re.search(r"👥\\s*([0-9]{1,2})\\s*osp", card, flags=re.I)
-            if not mg:
-                mg = re.search(r"\\b([0-9]{1,2})\\s*ospiti\\b", card, flags=re.I)
-            if mg:
-                g = mg.group(1)
-                card = re.sub(r'(<article\\b[^>]*class="[^"]*\\bcard\\b[^"]*"[^>]*)',
-                              rf'\\1 data-guests="{g}"', card, flags=re.I, count=1)
-
-        if "data-zone=" not in card:
-            mz = re.search(r"📍\\s*([A-Za-zÀ-ÿ0-9'’\\-\\s]{2,40})", card)
-            if mz:
-                z = normalize_spaces(mz.group(1))
-                card = re.sub(r'(<article\\b[^>]*class="[^"]*\\bcard\\b[^"]*"[^>]*)',
-                              rf'\\1 data-zone="{z}"', card, flags=re.I, count=1)
-
-        # Make first image clickable if there is a details link to /case/...
-        if re.search(r"<a[^>]*>\\s*<img", card, flags=re.I):
-            return card
-
-        mh = re.search(r'<a[^>]*href="([^"]*case/[^"]+)"', card, flags=re.I)
-        if not mh:
-            return card
-        href = mh.group(1)
-        card = re.sub(r'(<img\\b[^>]*>)', rf'<a class="card__mediaLink" href="{href}">\\1</a>', card, flags=re.I, count=1)
-        return card
-
-    html = re.sub(r"(<article\\b[^>]*class=\\"card\\"[\\s\\S]*?</article>)",
-                  lambda m: clean_card(m.group(1)),
-                  html, flags=re.I)
-    return html
+# insert before the cards grid (at the end if there is none)
+inject_mini_filters = insert_before_cards(MINI, f"<!-- {MARK}:MINIFILTERS -->")
+
+# drops ghost "WhatsApp" links, adds data-guests/data-zone, makes the photo
+# clickable: handlers on the runner's html_stream pass. An unclosed card is
+# left as it is (no merged cards, no quadratic time)
+CARDS_HTML = (rel_img_paths, lazy_img, wa_ghost, card_data, card_media_link)
 
 def inject_css(css: str) -> str:
     if f"/* === {MARK}:CSS === */" in css:
@@ -214,7 +161,7 @@ def inject_css(css: str) -> str:
 
 def inject_js(js: str) -> str:
     # Remove old premium block if present to avoid chaos
-    js = re.sub(r"// === PREMIUM_UX_A:JS ===[\\s\\S]*$", "", js, flags=re.I)
+    js = re.sub(r"// === PREMIUM_UX_A:JS ===[\s\S]*$", "", js, flags=re.I)
 
     if f"// === {MARK}:JS ===" in js:
         return js
@@ -321,35 +268,17 @@ def inject_js(js: str) -> str:
 """
     return js.rstrip() + "\n\n" + block + "\n"
 
+PASS = Pass("lite_clean_pack", MARK,
+            files={"css": inject_css, "js": inject_js},
+            html={"index": CARDS_HTML + (remove_hero_smartbar, remove_heavy_filters, inject_mini_filters)},
+            after=("fix_fab_and_duplicates",))
+
 def main():
     if not INDEX.exists():
         print("❌ Non trovo index.html. Esegui lo script dalla cartella del sito.")
         return
 
-    # index
-    backup(INDEX)
-    html = read(INDEX)
-    html = ensure_rel_img_paths(html)
-    html = add_lazy_imgs(html)
-    html = remove_hero_smartbar(html)
-    html = remove_heavy_filters(html)
-    html = inject_mini_filters(html)
-    html = make_cards_clickable_and_clean(html)
-    write(INDEX, html)
-
-    # css
-    if CSS.exists():
-        backup(CSS)
-        css = read(CSS)
-        css = inject_css(css)
-        write(CSS, css)
-
-    # js
-    if JS.exists():
-        backup(JS)
-        js = read(JS)
-        js = inject_js(js)
-        write(JS, js)
+    run([PASS], "lite_clean_pack")
 
     print("✅ LITE CLEAN PACK (A) applicato.")
     print("➡️ Test: python3 -m http.server 8000  →  http://localhost:8000")
@@ -10,79 +10,41 @@ Lite Clean Pack (A) — Salento Stay (NON sticky, pulito)
 - Aggiunge JS minimo per filtro ospiti/zona + contatore risultati
 - Aggiunge CSS minimo per mini-filtri + hover leggero
 
-Crea backup .bak-<timestamp> dei file modificati.
+Backup dei file modificati nello store deduplicato (backup_store.py).
 Run: python3 lite_clean_pack_v2.py
 """
 
 import re
 from pathlib import Path
-from datetime import datetime
-
-STAMP = datetime.now().strftime("%Y%m%d-%H%M%S")
+from html_stream import (card_data, card_media_link, drop_after_comment, drop_by_id, end_of, insert_before_cards,
+                         lazy_img, rel_img_paths, wa_ghost)
+from patch_runner import Pass, run
 
 ROOT = Path(".").resolve()
 INDEX = ROOT / "index.html"
-CSS = ROOT / "styles.css"
-JS = ROOT / "script.js"
 
 MARK = "LITE_CLEAN_A_V2"
 
+SMARTBAR = re.compile(r"<!--\s*PREMIUM_UX_A:SMARTBAR\s*-->", re.I)
+FILTERS = re.compile(r"<!--\s*PREMIUM_UX_A:FILTERS\s*-->", re.I)
 
-def backup(p: Path):
-    if p.exists():
-        p.with_suffix(p.suffix + f".bak-{STAMP}").write_text(
-            p.read_text(encoding="utf-8", errors="ignore"),
-            encoding="utf-8"
-        )
-
-
-def read(p: Path) -> str:
-    return p.read_text(encoding="utf-8", errors="ignore")
-
-
-def write(p: Path, s: str):
-    p.write_text(s, encoding="utf-8")
-
-
-def normalize_spaces(s: str) -> str:
-    return re.sub(r"\s+", " ", s).strip()
-
-
-def ensure_rel_img_paths(html: str) -> str:
-    # /img/... -> img/... così funziona anche in locale
-    html = re.sub(r'src="/img/', 'src="img/', html, flags=re.I)
-    html = re.sub(r'href="/img/', 'href="img/', html, flags=re.I)
-    return html
-
+# dal blocco fino al primo </div> compreso, e gli spazi dopo
+BLOCK = dict(inclusive=True, tags=("div",), strip=True)
 
-def add_lazy_imgs(html: str) -> str:
-    def repl(m):
-        tag = m.group(0)
-        if "loading=" in tag:
-            return tag
-        return tag.replace("<img", '<img loading="lazy" decoding="async"', 1)
-    return re.sub(r"<img\b[^>]*>", repl, html, flags=re.I)
 
-
-def remove_hero_smartbar(html: str) -> str:
+def remove_hero_smartbar(eng):
     # Rimuove eventuale smartbar premium
-    html = re.sub(r'<!--\s*PREMIUM_UX_A:SMARTBAR\s*-->[\s\S]*?</div>\s*', '', html, flags=re.I)
-    html = re.sub(r'<div[^>]*\bid="smartbar"[^>]*>[\s\S]*?</div>\s*', '', html, flags=re.I)
-    return html
+    drop_after_comment(SMARTBAR, end_of("div"), **BLOCK)(eng)
+    drop_by_id("div", "smartbar", end_of("div"), **BLOCK)(eng)
 
 
-def remove_heavy_filters(html: str) -> str:
+def remove_heavy_filters(eng):
     # Rimuove barra filtri "grossa"
-    html = re.sub(r'<!--\s*PREMIUM_UX_A:FILTERS\s*-->[\s\S]*?</div>\s*', '', html, flags=re.I)
-    html = re.sub(r'<div[^>]*\bid="filtersBar"[^>]*>[\s\S]*?</div>\s*', '', html, flags=re.I)
-    return html
-
+    drop_after_comment(FILTERS, end_of("div"), **BLOCK)(eng)
+    drop_by_id("div", "filtersBar", end_of("div"), **BLOCK)(eng)
 
-def inject_mini_filters(html: str) -> str:
-    if f"<!-- {MARK}:MINIFILTERS -->" in html:
-        return html
 
-    mini = f"""
+MINI = f"""
 <!-- {MARK}:MINIFILTERS -->
 <div class="miniFilters" id="miniFilters">
   <div class="miniFilters__row">
@@ -115,61 +77,18 @@ def inject_mini_filters(html: str) -> str:
 </div>
 """
 
-    m = re.search(r'(<div[^>]*class="[^"]*\bcards\b[^"]*"[^>]*>)', html, flags=re.I)
-    if m:
-        return html[:m.start()] + mini + "\n" + html[m.start():]
-    return html + "\n" + mini
-
-
-def make_cards_clickable_and_clean(html: str) -> str:
-    # lavora su ogni card
-    pattern = r'(<article\b[^>]*class="[^"]*\bcard\b[^"]*"[\s\S]*?</article>)'
-
-    def patch_card(card: str) -> str:
-        # rimuove link duplicati "WhatsApp" (testo secco)
-        card = re.sub(r'<a\b[^>]*>\s*WhatsApp\s*</a>', '', card, flags=re.I)
-
-        # data-guests
-        if "data-guests=" not in card:
-            mg = re.search(r"👥\s*([0-9]{1,2})\s*osp", card, flags=re.I)
-            if not mg:
-                mg = re.search(r"\b([0-9]{1,2})\s*ospiti\b", card, flags=re.I)
-            if mg:
-                g = mg.group(1)
-                card = re.sub(
-                    r'(<article\b[^>]*class="[^"]*\bcard\b[^"]*"[^>]*)',
-                    rf'\1 data-guests="{g}"',
-                    card, flags=re.I, count=1
-                )
-
-        # data-zone
-        if "data-zone=" not in card:
-            mz = re.search(r"📍\s*([A-Za-zÀ-ÿ0-9'’\-\s]{2,40})", card)
-            if mz:
-                z = normalize_spaces(mz.group(1))
-                card = re.sub(
-                    r'(<article\b[^>]*class="[^"]*\bcard\b[^"]*"[^>]*)',
-                    rf'\1 data-zone="{z}"',
-                    card, flags=re.I, count=1
-                )
-
-        # foto cliccabile se c'è link alla scheda
-        if re.search(r"<a[^>]*>\s*<img", card, flags=re.I):
-            return card
-
-        mh = re.search(r'<a\b[^>]*href="([^"]*case/[^"]+)"', card, flags=re.I)
-        if not mh:
-            return card
-        href = mh.group(1)
-
-        card = re.sub(
-            r'(<img\b[^>]*>)',
-            rf'<a class="card__mediaLink" href="{href}">\1</a>',
-            card, flags=re.I, count=1
-        )
-        return card
-
-    return re.sub(pattern, lambda m: patch_card(m.group(1)), html, flags=re.I)
+
+inject_mini_filters = insert_before_cards(MINI, f"<!-- {MARK}:MINIFILTERS -->")
+
+
+def card_media_link_any(eng):
+    # qui sono card tutti gli <article class="... card ...">
+    card_media_link(eng, any_card=True)
+
+
+# card: via i link "WhatsApp" secchi, data-guests/data-zone, foto cliccabile
+# se c'è il link alla scheda
+CARDS_HTML = (wa_ghost, card_data, card_media_link_any)
 
 
 def inject_css(css: str) -> str:
@@ -341,32 +260,19 @@ def inject_js(js: str) -> str:
     return js.rstrip() + "\n\n" + block + "\n"
 
 
+PASS = Pass("lite_clean_pack_v2", MARK,
+            files={"css": inject_css, "js": inject_js},
+            html={"index": (rel_img_paths, lazy_img, remove_hero_smartbar, remove_heavy_filters,
+                            inject_mini_filters) + CARDS_HTML},
+            after=("fix_fab_and_duplicates",))
+
+
 def main():
     if not INDEX.exists():
         print("❌ Non trovo index.html. Esegui nella cartella del sito.")
         return
 
-    backup(INDEX)
-    html = read(INDEX)
-    html = ensure_rel_img_paths(html)
-    html = add_lazy_imgs(html)
-    html = remove_hero_smartbar(html)
-    html = remove_heavy_filters(html)
-    html = inject_mini_filters(html)
-    html = make_cards_clickable_and_clean(html)
-    write(INDEX, html)
-
-    if CSS.exists():
-        backup(CSS)
-        css = read(CSS)
-        css = inject_css(css)
-        write(CSS, css)
-
-    if JS.exists():
-        backup(JS)
-        js = read(JS)
-        js = inject_js(js)
-        write(JS, js)
+    run([PASS], "lite_clean_pack_v2")
 
     print("✅ LITE CLEAN PACK (A) applicato (v2).")
     print("➡️ Test: python3 -m http.server 8000  →  http://localhost:8000")
@@ -1,81 +1,19 @@
-import re
-from pathlib import Path
-from datetime import datetime
+from html_stream import action_bar, card_media_link, fab, lazy_img, rel_img_paths
+from patch_runner import Pass, run
 
-ROOT = Path(".")
-INDEX = ROOT / "index.html"
-CSS = ROOT / "styles.css"
-JS = ROOT / "script.js"
-CASE_DIR = ROOT / "case"
-
-STAMP = datetime.now().strftime("%Y%m%d-%H%M%S")
-
-def backup(p: Path):
-    if p.exists():
-        bp = p.with_suffix(p.suffix + f".bak-{STAMP}")
-        bp.write_text(p.read_text(encoding="utf-8"), encoding="utf-8")
-
-def ensure_lazy_images(html: str) -> str:
-    def repl(m):
-        tag = m.group(0)
-        if "loading=" in tag:
-            return tag
-        return tag.replace("<img", '<img loading="lazy" decoding="async"', 1)
-    return re.sub(r"<img\b[^>]*>", repl, html, flags=re.IGNORECASE)
-
-def fix_absolute_img_paths(html: str) -> str:
-    html = re.sub(r'src="/img/', 'src="img/', html, flags=re.IGNORECASE)
-    html = re.sub(r'href="/img/', 'href="img/', html, flags=re.IGNORECASE)
-    return html
-
-def inject_wa_fab(html: str) -> str:
-    if 'id="waSticky"' in html:
-        return html
-    fab = """
+FAB_HTML = """
   <!-- WhatsApp Sticky FAB (Pack A) -->
   <a id="waSticky" class="wa-fab" href="#" target="_blank" rel="noopener" aria-label="Contattaci su WhatsApp">
     <span class="wa-fab__icon" aria-hidden="true">💬</span>
     <span class="wa-fab__text">WhatsApp</span>
   </a>
 """
-    return re.sub(r"</body>", fab + "\n</body>", html, flags=re.IGNORECASE, count=1)
-
-def make_cards_image_clickable(html: str) -> str:
-    def fix_card(card: str) -> str:
-        if re.search(r"<a[^>]*>\s*<img", card, flags=re.IGNORECASE):
-            return card
-        m = re.search(r'<a[^>]*href="([^"]*case/[^"]+)"', card, flags=re.IGNORECASE)
-        if not m:
-            return card
-        href = m.group(1)
-        return re.sub(r'(<img\b[^>]*>)', rf'<a class="card__mediaLink" href="{href}">\1</a>', card, flags=re.IGNORECASE, count=1)
-    return re.sub(
-        r"(<article\b[^>]*class=\"card\"[\s\S]*?</article>)",
-        lambda m: fix_card(m.group(1)),
-        html,
-        flags=re.IGNORECASE
-    )
-
-def add_action_bar_to_case(html: str) -> str:
-    if "action-bar" in html:
-        return html
-    mpdf = re.search(r'href="([^"]+\.pdf)"', html, flags=re.IGNORECASE)
-    if not mpdf:
-        return html
-    pdf_href = mpdf.group(1)
 
-    mt = re.search(r"<h1[^>]*>(.*?)</h1>", html, flags=re.IGNORECASE | re.DOTALL)
-    title = re.sub(r"<[^>]+>", "", mt.group(1)).strip() if mt else "questa casa"
-
-    bar = f"""
-      <!-- Pack A: Action Bar -->
-      <div class="action-bar">
-        <a class="btn btn--primary pdf-btn" href="{pdf_href}" target="_blank" rel="noopener">Apri scheda (PDF)</a>
-        <a class="btn btn--secondary wa-btn" id="waProperty" href="#" target="_blank" rel="noopener"
-           data-property-name="{title}">Chiedi disponibilità su WhatsApp</a>
-      </div>
-"""
-    return re.sub(r"(</h1>)", r"\1" + bar, html, flags=re.IGNORECASE, count=1)
+# path /img/ relativi, lazyload, foto card cliccabile (home) o action bar
+# PDF/WA dopo il titolo (schede), FAB se manca: handler sulla passata
+# html_stream del runner
+INDEX_HTML = (rel_img_paths, lazy_img, card_media_link, fab(inject=FAB_HTML))
+CASE_HTML = (rel_img_paths, lazy_img, action_bar, fab(inject=FAB_HTML))
 
 def ensure_pack_a_css(css: str) -> str:
     if "/* === PACK A UI === */" in css:
@@ -305,32 +243,13 @@ def ensure_pack_a_js(js: str) -> str:
 """
     return js + "\n" + block
 
-def main():
-    for p in [INDEX, CSS, JS]:
-        backup(p)
-
-    html = INDEX.read_text(encoding="utf-8")
-    html = fix_absolute_img_paths(html)
-    html = ensure_lazy_images(html)
-    html = make_cards_image_clickable(html)
-    html = inject_wa_fab(html)
-    INDEX.write_text(html, encoding="utf-8")
+PASS = Pass("pack_a", "PACK A",
+            files={"css": ensure_pack_a_css, "js": ensure_pack_a_js},
+            html={"index": INDEX_HTML, "case": CASE_HTML},
+            after=("site_fix",))
 
-    if CASE_DIR.exists():
-        for f in CASE_DIR.glob("*.html"):
-            backup(f)
-            h = f.read_text(encoding="utf-8")
-            h = fix_absolute_img_paths(h)
-            h = ensure_lazy_images(h)
-            h = add_action_bar_to_case(h)
-            h = inject_wa_fab(h)
-            f.write_text(h, encoding="utf-8")
-
-    css = CSS.read_text(encoding="utf-8")
-    CSS.write_text(ensure_pack_a_css(css), encoding="utf-8")
-
-    js = JS.read_text(encoding="utf-8")
-    JS.write_text(ensure_pack_a_js(js), encoding="utf-8")
+def main():
+    run([PASS], "pack_a")
 
     print("✅ PACK A applicato: sticky WhatsApp (anche schede) + lightbox + action bar PDF/WA + lazyload + UI polish.")
     print("➡️ Test: python3 -m http.server 8000  →  http://localhost:8000")
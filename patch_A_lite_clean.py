@@ -10,86 +10,62 @@ Focus: ordine, chiarezza, zero caos.
 - Filtro immediato + empty state (0 risultati)
 - Barra filtri sticky SOTTILE (solo in sezione case)
 - Aggiunge CSS/JS in modo idempotente (non duplica blocchi)
-- Crea backup .bak-<timestamp>
+- Backup nello store deduplicato (backup_store.py)
 
 Run: python3 patch_A_lite_clean.py
 """
 
 import re
 from pathlib import Path
-from datetime import datetime
+from html_stream import (Tag, after_first, card_overlay, drop_after_comment, drop_by_id, end_of, insert_before_cards,
+                         lazy_img, rel_img_paths, wa_ghost)
+from patch_runner import Pass, run
 
-STAMP = datetime.now().strftime("%Y%m%d-%H%M%S")
 ROOT = Path(".").resolve()
 
 INDEX = ROOT / "index.html"
-CSS = ROOT / "styles.css"
-JS = ROOT / "script.js"
 
 MARK = "PATCH_A_LITE_CLEAN_V1"
 
+# path /img/ relativi, lazyload, via i "WhatsApp" fantasma dalle card,
+# data-guests/data-zone + overlay link: handler sulla passata del runner
+CARDS_HTML = (rel_img_paths, lazy_img, wa_ghost, card_overlay)
 
-def backup(p: Path):
-    if p.exists():
-        p.with_suffix(p.suffix + f".bak-{STAMP}").write_text(
-            p.read_text(encoding="utf-8", errors="ignore"),
-            encoding="utf-8",
-        )
 
+FILTERS = re.compile(r"<!--\s*PREMIUM_UX_A:FILTERS\s*-->", re.I)
+FILTERS_END = re.compile(r"<!--\s*END\s*PREMIUM_UX_A:FILTERS\s*-->", re.I)
 
-def read(p: Path) -> str:
-    return p.read_text(encoding="utf-8", errors="ignore")
 
-
-def write(p: Path, s: str):
-    p.write_text(s, encoding="utf-8")
-
-
-def normalize_spaces(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or "")).strip()
-
-
-def ensure_rel_img_paths(html: str) -> str:
-    html = re.sub(r'src="/img/', 'src="img/', html, flags=re.I)
-    html = re.sub(r'href="/img/', 'href="img/', html, flags=re.I)
-    return html
-
-
-def add_lazy_imgs(html: str) -> str:
-    def repl(m):
-        tag = m.group(0)
-        if "loading=" in tag:
-            return tag
-        return tag.replace("<img", '<img loading="lazy" decoding="async"', 1)
-
-    return re.sub(r"<img\b[^>]*>", repl, html, flags=re.I)
-
-
-def remove_duplicate_filter_bars(html: str) -> str:
+def remove_duplicate_filter_bars(eng):
     """
     Rimuove:
     - blocchi Premium precedenti (se presenti)
     - eventuali duplicazioni di search/sort bar (id filtersBar o commenti)
     Tenendo solo la mini-bar che inseriamo noi.
     """
-    # vecchi marker/blocks
-    html = re.sub(r'<!--\s*PREMIUM_UX_A:FILTERS\s*-->[\s\S]*?<!--\s*END\s*PREMIUM_UX_A:FILTERS\s*-->\s*', '', html, flags=re.I)
-    html = re.sub(r'<!--\s*PREMIUM_UX_A:FILTERS\s*-->[\s\S]*?</div>\s*', '', html, flags=re.I)
-    html = re.sub(r'<div[^>]*\bid="filtersBar"[^>]*>[\s\S]*?</div>\s*', '', html, flags=re.I)
+    # vecchi marker/blocks: fino a END, o (senza END) fino al primo </div>
+    drop_after_comment(FILTERS, lambda kind, raw, name: kind == "comment" and FILTERS_END.fullmatch(raw) is not None,
+                       inclusive=True, tags=("div",), strip=True, rest=after_first("div"))(eng)
+    drop_by_id("div", "filtersBar", end_of("div"), inclusive=True, tags=("div",), strip=True)(eng)
 
     # Rimuovi una seconda toolbar "Case consigliate" duplicata (pattern generico)
-    # Se esistono due select di ordinamento ravvicinate, elimina quella più in alto (greedy safe)
-    html = re.sub(r'(<select[^>]*id="sort"[^>]*>[\s\S]*?</select>)[\s\S]*?(<select[^>]*id="sort"[^>]*>[\s\S]*?</select>)',
-                  r'\2', html, flags=re.I)
+    # Se esistono due select di ordinamento, elimina quella più in alto (e quello che c'è in mezzo)
+    def on_sort(tag, value, doc):
+        if tag.name != "select" or value != "sort" or doc.state.pop("sort_second", False):
+            return
+
+        def second(kind, raw, name):
+            if kind == "start" and name == "select" and Tag(name, raw).get("id") == "sort":
+                doc.state["sort_second"] = True  # questa resta (e non apre un altro drop)
+                return True
+            return False
 
-    return html
+        doc.drop(second, tags=("select",))
 
+    eng.on_attr("id", on_sort, contains="sort")
 
-def inject_single_clean_bar(html: str) -> str:
-    if f"<!-- {MARK}:BAR -->" in html:
-        return html
 
-    bar = f"""
+BAR = f"""
 <!-- {MARK}:BAR -->
 <div class="caseBar" id="caseBar">
   <div class="caseBar__row">
@@ -123,71 +99,9 @@ def inject_single_clean_bar(html: str) -> str:
 </div>
 """
 
-    # inserisci sopra la griglia cards
-    m = re.search(r'(<div[^>]*class="[^"]*\bcards\b[^"]*"[^>]*>)', html, flags=re.I)
-    if m:
-        return html[:m.start()] + bar + "\n" + html[m.start():]
-    return html + "\n" + bar
-
-
-def remove_whatsapp_ghost(html: str) -> str:
-    # elimina qualsiasi link o span col solo testo "WhatsApp" dentro le card
-    html = re.sub(r'(<article\b[^>]*class="[^"]*\bcard\b[^"]*"[\s\S]*?</article>)',
-                  lambda m: re.sub(r'<a\b[^>]*>\s*WhatsApp\s*</a>', '', m.group(1), flags=re.I),
-                  html, flags=re.I)
-    html = re.sub(r'(<article\b[^>]*class="[^"]*\bcard\b[^"]*"[\s\S]*?</article>)',
-                  lambda m: re.sub(r'<span\b[^>]*>\s*WhatsApp\s*</span>', '', m.group(1), flags=re.I),
-                  html, flags=re.I)
-    return html
-
-
-def ensure_card_data_and_clickable(html: str) -> str:
-    pattern = r'(<article\b[^>]*class="[^"]*\bcard\b[^"]*"[\s\S]*?</article>)'
-
-    def patch_card(card: str) -> str:
-        # data-guests
-        if "data-guests=" not in card:
-            mg = re.search(r"👥\s*([0-9]{1,2})\s*osp", card, flags=re.I)
-            if not mg:
-                mg = re.search(r"\b([0-9]{1,2})\s*ospiti\b", card, flags=re.I)
-            if mg:
-                g = mg.group(1)
-                card = re.sub(
-                    r'(<article\b[^>]*class="[^"]*\bcard\b[^"]*"[^>]*)',
-                    rf'\1 data-guests="{g}"',
-                    card, flags=re.I, count=1,
-                )
-
-        # data-zone
-        if "data-zone=" not in card:
-            mz = re.search(r"📍\s*([A-Za-zÀ-ÿ0-9'’\-\s]{2,40})", card)
-            if mz:
-                z = normalize_spaces(mz.group(1))
-                card = re.sub(
-                    r'(<article\b[^>]*class="[^"]*\bcard\b[^"]*"[^>]*)',
-                    rf'\1 data-zone="{z}"',
-                    card, flags=re.I, count=1,
-                )
-
-        # overlay link card-clickable
-        if "cardLinkOverlay" in card:
-            return card
-
-        mh = re.search(r'<a\b[^>]*href="([^"]*case/[^"]+)"', card, flags=re.I)
-        if not mh:
-            return card
-        href = mh.group(1)
-
-        # inserisci overlay link subito dopo l'apertura dell'article
-        card = re.sub(
-            r'(<article\b[^>]*>)',
-            rf'\1<a class="cardLinkOverlay" href="{href}" aria-label="Apri dettagli"></a>',
-            card, flags=re.I, count=1
-        )
-
-        return card
-
-    return re.sub(pattern, lambda m: patch_card(m.group(1)), html, flags=re.I)
+
+# sopra la griglia cards, se non c'è già
+inject_single_clean_bar = insert_before_cards(BAR, f"<!-- {MARK}:BAR -->")
 
 
 def inject_css(css: str) -> str:
@@ -378,32 +292,18 @@ def inject_js(js: str) -> str:
     return js.rstrip() + "\n\n" + block + "\n"
 
 
+PASS = Pass("patch_A_lite_clean", MARK,
+            files={"css": inject_css, "js": inject_js},
+            html={"index": CARDS_HTML + (remove_duplicate_filter_bars, inject_single_clean_bar)},
+            after=("lite_clean_pack_v2",))
+
+
 def main():
     if not INDEX.exists():
         print("❌ Non trovo index.html. Esegui nella cartella del sito.")
         return
 
-    backup(INDEX)
-    html = read(INDEX)
-    html = ensure_rel_img_paths(html)
-    html = add_lazy_imgs(html)
-    html = remove_duplicate_filter_bars(html)
-    html = remove_whatsapp_ghost(html)
-    html = ensure_card_data_and_clickable(html)
-    html = inject_single_clean_bar(html)
-    write(INDEX, html)
-
-    if CSS.exists():
-        backup(CSS)
-        css = read(CSS)
-        css = inject_css(css)
-        write(CSS, css)
-
-    if JS.exists():
-        backup(JS)
-        js = read(JS)
-        js = inject_js(js)
-        write(JS, js)
+    run([PASS], "patch_A_lite_clean")
 
     print("✅ Patch A Lite Clean applicata.")
     print("➡️ Test: python3 -m http.server 8000  →  http://localhost:8000")
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Runner unico delle patch — Salento Stay
+
+- Ogni script di patch dichiara un PASS: il suo MARK, le funzioni
+  testo → testo per tipo di file (css, js; per le pagine solo per
+  crearle se mancano), le trasformazioni html_stream per le pagine
+  (index, case, privacy), le pass che devono girare prima (after) e
+  quelle vecchie che rende inutili (supersedes)
+- Il runner trova le pass (gli script con "PASS = Pass("), le ordina
+  (after/supersedes, a parità per nome) e scarta quelle sostituite:
+  CLEAN_FILTERS_V3 toglie i blocchi di PATCH_A_LITE_CLEAN_V1,
+  LITE_CLEAN_A e LITE_CLEAN_A_V2, inutile metterli per poi toglierli
+- Ogni file si legge UNA volta e tutte le pass lavorano sul testo in
+  memoria. Per le pagine gli handler di tutte le pass stanno su UN
+  html_stream.Engine per ruolo: una scansione del documento, non una (o
+  5-6 re.sub) per pass; la regex resta solo per i blocchi CSS/JS
+- Se il file è cambiato un secondo giro controlla il punto fisso: se
+  rifare tutte le pass cambia ancora il risultato qualcosa non è
+  idempotente e non si scrive niente (--force per scrivere lo stesso).
+  Un file che non cambia non si rifà: stesso testo, stesso risultato
+- I file non dipendono l'uno dall'altro: con tante pagine (case/*.html)
+  si dividono tra i processi di un pool (--jobs=N, di default uno per
+  core); ogni worker ricostruisce le pass una volta e lavora file interi.
+  I risultati tornano nell'ordine dei file: stesso output e stesso
+  riepilogo che in sequenza
+- Se cambia qualcosa si rigenera anche styles.min.css (css_compact.py),
+  quello che le pagine caricano davvero
+- Backup (backup_store.py: uno snapshot per run, versioni deduplicate e
+  compresse in .backups/) e scrittura (OutputTxn, un commit) una volta
+  sola, solo per i file cambiati, dal processo principale
+
+Run:
+  python3 patch_runner.py [--list] [--only=pack_a,fab_refine] [--skip=site_fix] [--jobs=4] [--force] [--profile]
+"""
+
+import importlib
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import backup_store
+import css_compact
+from html_stream import Engine
+from profiler import Profiler
+from site_io import OutputTxn
+
+ROOT = Path(".").resolve()
+HERE = Path(__file__).resolve().parent
+INDEX = ROOT / "index.html"
+CASE_DIR = ROOT / "case"
+PRIVACY = ROOT / "privacy.html"
+CSS = ROOT / "styles.css"
+JS = ROOT / "script.js"
+
+STAMP = datetime.now().strftime("%Y%m%d-%H%M%S")
+
+# sotto questo numero di file avviare i processi costa più del lavoro
+PARALLEL_MIN = 64
+
+# nel riepilogo: la passata html_stream comune a tutte le pass
+HTML = "html"
+
+
+class Pass:
+    def __init__(self, name, mark, files=None, html=None, after=(), supersedes=(), creates=()):
+        self.name = name                    # nome dello script
+        self.mark = mark                    # marcatore dei blocchi che inserisce
+        self.files = files or {}            # ruolo -> fn(testo) -> testo
+        self.html = html or {}              # ruolo -> trasformazioni html_stream
+        self.after = tuple(after)           # pass da far girare prima (se scelte)
+        self.supersedes = tuple(supersedes)  # pass vecchie che questa rende inutili
+        self.creates = tuple(creates)       # ruoli che crea se il file manca
+
+    @property
+    def roles(self):
+        return tuple(dict.fromkeys((*self.files, *self.html)))
+
+
+def chain(*fns):
+    """Più funzioni testo → testo applicate in fila, come una sola."""
+    def run_all(text):
+        for fn in fns:
+            text = fn(text)
+        return text
+    return run_all
+
+
+def targets():
+    """Ruolo -> file del sito."""
+    return {
+        "index": [INDEX],
+        "case": sorted(CASE_DIR.glob("*.html")) if CASE_DIR.exists() else [],
+        "privacy": [PRIVACY],
+        "css": [CSS],
+        "js": [JS],
+    }
+
+
+def discover():
+    """Tutte le pass: gli script accanto al runner che dichiarano PASS."""
+    sys.path.insert(0, str(HERE))
+    found = {}
+    for f in sorted(HERE.glob("*.py")):
+        if f.stem == "patch_runner":
+            continue
+        try:
+            if "\nPASS = Pass(" not in f.read_text(encoding="utf-8"):
+                continue
+            mod = importlib.import_module(f.stem)
+        except (OSError, SyntaxError) as e:
+            print(f"⚠️ {f.name}: salto ({e.__class__.__name__})")
+            continue
+        found[mod.PASS.name] = mod.PASS
+    return found
+
+
+def resolve(passes, only=None, skip=()):
+    """(pass in ordine, {sostituita: da chi})."""
+    unknown = [n for n in (only or ()) + tuple(skip) if n not in passes]
+    if unknown:
+        raise SystemExit(f"❌ Pass sconosciute: {', '.join(unknown)} (disponibili: {', '.join(passes)})")
+
+    chosen = {n: p for n, p in passes.items() if (not only or n in only) and n not in skip}
+    dropped = {}
+    for p in chosen.values():
+        for old in p.supersedes:
+            if old in chosen:
+                dropped[old] = p.name
+    for old in dropped:
+        del chosen[old]
+
+    order, state = [], {}
+
+    def visit(name, path):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "open":
+            raise SystemExit(f"❌ Ciclo tra le pass: {' → '.join(path + (name,))}")
+        state[name] = "open"
+        p = chosen[name]
+        for dep in sorted(p.after + p.supersedes):
+            if dep in chosen:
+                visit(dep, path + (name,))
+        state[name] = "done"
+        order.append(p)
+
+    for name in sorted(chosen):
+        visit(name, ())
+    return order, dropped
+
+
+# (pass, ruolo) -> Engine: costruito una volta per processo
+_ENGINES = {}
+
+
+def engine(passes, role):
+    """Un Engine con le trasformazioni di tutte le pass per il ruolo, in
+    ordine di pass (None se nessuna ne ha)."""
+    key = (tuple(p.name for p in passes), role)
+    if key not in _ENGINES:
+        # la stessa trasformazione in due pass (rel_img_paths) si registra una volta
+        transforms = dict.fromkeys(t for p in passes for t in p.html.get(role, ()))
+        _ENGINES[key] = Engine(transforms) if transforms else None
+    return _ENGINES[key]
+
+
+def patch_text(passes, role, text):
+    """Tutte le pass, in ordine, su un file. -> (testo, pass che l'hanno cambiato, secondi per pass)
+
+    Prima le funzioni testo → testo (CSS/JS, o la pagina che manca), poi
+    le trasformazioni html di tutte le pass in UNA passata (voce HTML).
+    """
+    touched, spent = [], {}
+    for p in passes:
+        fn = p.files.get(role)
+        if fn is None:
+            continue
+        if text is None:
+            if role not in p.creates:
+                continue
+            text = ""
+        t0 = time.perf_counter()
+        new = fn(text)
+        spent[p.name] = time.perf_counter() - t0
+        if new != text:
+            touched.append(p.name)
+            text = new
+    eng = engine(passes, role)
+    if eng is not None and text is not None:
+        t0 = time.perf_counter()
+        new = eng.transform_text(text)
+        spent[HTML] = time.perf_counter() - t0
+        if new != text:
+            touched.append(HTML)
+            text = new
+    return text, touched, spent
+
+
+def patch_index_text(html: str) -> str:
+    """index.html con tutte le pass (quelle di default del runner): per
+    regex_bench.py e bench.py."""
+    passes, _ = resolve(discover())
+    return patch_text(passes, "index", html)[0]
+
+
+def patch_file(passes, path, role):
+    """Un file: lettura, pass, controllo del punto fisso.
+
+    -> (originale, nuovo, pass che l'hanno cambiato, secondi per pass,
+        pass che al secondo giro cambiano ancora o None se è stabile).
+    Originale e nuovo tornano solo se il file cambia: dal worker al
+    processo principale viaggiano solo i file da scrivere.
+    """
+    orig = path.read_text(encoding="utf-8", errors="ignore") if path.exists() else None
+    text, touched, spent = patch_text(passes, role, orig)
+    if text == orig:
+        # niente da scrivere, e il secondo giro darebbe lo stesso
+        return None, None, touched, spent, None
+    # punto fisso: un secondo giro completo deve ridare lo stesso testo.
+    # Che una pass riscriva ciò che un'altra ha messo (le icone del FAB)
+    # va bene, purché alla fine del giro il risultato sia lo stesso
+    again, who, _ = patch_text(passes, role, text)
+    unstable = who if again != text else None
+    return orig, text, touched, spent, unstable
+
+
+# pass del worker: ricostruite una volta per processo dai nomi (le funzioni
+# delle pass non sempre passano per pickle), poi solo lette
+_PASSES = ()
+
+
+def _init_worker(names):
+    global _PASSES
+    # con fork il worker eredita tracemalloc acceso da --profile: qui non
+    # serve (il profilo è del processo principale) e rallenta tutto
+    tracemalloc.stop()
+    sys.path.insert(0, str(HERE))
+    _PASSES = tuple(importlib.import_module(n).PASS for n in names)
+
+
+def _patch_task(task):
+    path, role = task
+    return patch_file(_PASSES, path, role)
+
+
+def run(passes, script="patch_runner", force=None, jobs=None):
+    """Applica le pass (già in ordine) e scrive ogni file cambiato una volta.
+
+    I file sono indipendenti tra loro: da PARALLEL_MIN file in su, con
+    --jobs > 1, si dividono tra i processi di un pool. I risultati tornano
+    nell'ordine dei file, quindi backup, scritture e riepilogo sono gli
+    stessi qualunque worker finisca prima.
+    -> ({pass: [file cambiati]}, [file scritti], {pass: secondi})
+    """
+    force = "--force" in sys.argv if force is None else force
+    jobs = jobs_from_argv() if jobs is None else jobs
+    roles = targets()
+    tasks = [(path, role) for role in sorted({r for p in passes for r in p.roles}) for path in roles[role]]
+    parallel = jobs > 1 and len(tasks) >= PARALLEL_MIN
+
+    prof = Profiler.from_argv(script)
+    with prof:
+        with prof.stage("patch"):
+            if parallel:
+                with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                         initargs=([p.name for p in passes],)) as pool:
+                    results = list(pool.map(_patch_task, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+            else:
+                results = [patch_file(passes, path, role) for path, role in tasks]
+
+        changed, spent, unstable, dirty = {}, {}, [], []
+        for (path, _), (orig, new, touched, secs, again) in zip(tasks, results):
+            for name in touched:
+                changed.setdefault(name, []).append(path)
+            for name, t in secs.items():
+                spent[name] = spent.get(name, 0.0) + t
+            if again is not None:
+                unstable.append((path, again))
+            if new is not None:
+                dirty.append((path, orig, new))
+
+        if unstable:
+            print("⚠️ Risultato non stabile: un secondo giro cambia ancora")
+            for path, who in unstable:
+                print(f"  {path.name}: {', '.join(who)}")
+            if not force:
+                raise SystemExit("❌ Niente scritto (--force per scrivere lo stesso).")
+
+        # le pagine caricano styles.min.css: si rifà insieme alle patch (con
+        # i testi nuovi, non ancora scritti) e si pubblica nello stesso commit
+        min_css = None
+        if dirty:
+            with prof.stage("css compact"):
+                built = css_compact.build({path: new for path, _, new in dirty})
+            min_css = built[0] if built else None
+            old_min = css_compact.MIN_CSS.read_text(encoding="utf-8") if css_compact.MIN_CSS.exists() else None
+            if min_css == old_min:
+                min_css = None
+
+        with prof.stage("backup"):
+            # anche styles.min.css, che si riscrive nello stesso commit: un
+            # restore dello snapshot rimette il sito come lo vedevano le pagine
+            versions = {path: orig for path, orig, _ in dirty}
+            if min_css is not None:
+                versions[css_compact.MIN_CSS] = old_min
+            backup_store.save(versions, script, STAMP)
+        with OutputTxn(prof=prof) as out:
+            for path, _, new in dirty:
+                out.write_text(path, new)
+            if min_css is not None:
+                out.write_text(css_compact.MIN_CSS, min_css)
+
+        prof.note(passes=[p.name for p in passes], files_read=len(tasks), files_written=len(dirty),
+                  jobs=jobs if parallel else 1, pass_s=spent)
+    return changed, [path for path, _, _ in dirty], spent
+
+
+def arg(name, default):
+    for a in sys.argv[1:]:
+        if a.startswith(f"--{name}="):
+            return a.split("=", 1)[1]
+    return default
+
+
+def jobs_from_argv() -> int:
+    # --jobs=N limita i worker; di default uno per core
+    return max(1, int(arg("jobs", os.cpu_count() or 1)))
+
+
+def split(value):
+    return tuple(n for n in (value or "").split(",") if n)
+
+
+def main():
+    passes, dropped = resolve(discover(), split(arg("only", None)) or None, split(arg("skip", None)))
+
+    if "--list" in sys.argv:
+        for i, p in enumerate(passes, 1):
+            print(f"  {i:>2}. {p.name:<24} {p.mark:<24} {', '.join(p.roles)}")
+        for old, new in dropped.items():
+            print(f"   ⏭️ {old:<24} sostituita da {new}")
+        return
+
+    for old, new in dropped.items():
+        print(f"⏭️ {old}: sostituita da {new}")
+    changed, dirty, spent = run(passes)
+    for p in passes:
+        n = len(changed.get(p.name, ()))
+        print(f"  {'✅' if n else '· '} {p.name:<24} {n:>5} file {spent.get(p.name, 0) * 1000:9.1f} ms")
+    if any(p.html for p in passes):
+        # le pagine: gli handler di tutte le pass in una passata per file
+        n = len(changed.get(HTML, ()))
+        print(f"  {'✅' if n else '· '} {'(html, una passata)':<24} {n:>5} file {spent.get(HTML, 0) * 1000:9.1f} ms")
+    print(f"✅ {len(passes)} pass, {len(dirty)} file scritti (una volta ciascuno).")
+    print("➡️ Test: python3 -m http.server 8000  →  http://localhost:8000")
+
+
+if __name__ == "__main__":
+    main()
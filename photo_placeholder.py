@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Segnaposto delle foto nelle card — Salento Stay
+
+- Le foto delle card arrivano lazy: sul telefono, scorrendo #cardsGrid, per
+  un po' si vedono riquadri vuoti. Ogni card porta nel suo .card__media
+  uno sfondo che somiglia alla foto, e la foto vera ci arriva sopra:
+    1. colore dominante (il più frequente tra COLORS colori della foto
+       ridotta), quello che si vede per primo
+    2. LQIP: la foto a LQIP_WIDTH px di larghezza, sfocata e in JPEG
+       leggero, inline in base64 (~0.6 KB): niente richieste in più, il
+       browser la allarga a tutta la card (cover, come object-fit della foto)
+- L'LQIP pesa sulla home card per card: oltre LQIP_MAX byte (foto piene di
+  dettagli) non si tiene, e da LQIP_MAX_CARDS case in su (dove script.js
+  rende la griglia virtuale) le card hanno solo il colore: con 20k case
+  sarebbero ~12 MB di base64 nell'HTML
+- Pixel come quelli pubblicati: photo_tune.normalize() (EXIF, sRGB)
+- Cache in .store/placeholders/<sha[:2]>/<sha>-<KEY>.json ({"color",
+  "lqip"}): stessa foto e stesse impostazioni, niente da rifare.
+  bulk_fix.py la riempie nel pool di processi e mette lo style nel
+  template della card
+- Serve Pillow (pip install Pillow); senza, le card restano senza sfondo
+
+Run:
+  python3 photo_placeholder.py report
+  python3 photo_placeholder.py try <foto.jpg> [...]
+"""
+
+import base64
+import hashlib
+import io
+import json
+import os
+import sys
+from pathlib import Path
+
+from photo_tune import normalize
+
+try:
+    from PIL import Image, ImageFilter
+except ImportError:
+    Image = ImageFilter = None
+
+ROOT = Path(".").resolve()
+CACHE = ROOT / ".store" / "placeholders"
+
+# cambia se cambia il procedimento (non solo le impostazioni)
+VERSION = 1
+
+LQIP_WIDTH = 24
+LQIP_BLUR = 0.5
+# 4:4:4: a 24px la crominanza dimezzata sbaglia i colori
+LQIP_OPTS = {"quality": 60, "optimize": True, "subsampling": 0}
+COLORS = 6
+# data: URI più lungo di così: solo il colore
+LQIP_MAX = 1024
+# come VIRTUAL_MIN in script.js
+LQIP_MAX_CARDS = 60
+
+KEY = hashlib.sha256(json.dumps(
+    {"v": VERSION, "w": LQIP_WIDTH, "blur": LQIP_BLUR, "jpeg": LQIP_OPTS, "colors": COLORS,
+     "max": LQIP_MAX},
+    sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+_meta = {}
+
+
+def cache_path(sha: str) -> Path:
+    return CACHE / sha[:2] / f"{sha}-{KEY}.json"
+
+
+def dominant(im) -> str:
+    """Colore più frequente (#rrggbb) tra COLORS colori della foto ridotta."""
+    small = im.resize((64, 64), Image.BILINEAR).quantize(colors=COLORS)
+    _, idx = max(small.getcolors())
+    r, g, b = small.getpalette()[idx * 3:idx * 3 + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def lqip(im) -> str:
+    """data: URI della foto minuscola e sfocata."""
+    w, h = im.size
+    small = im.resize((LQIP_WIDTH, max(1, round(h * LQIP_WIDTH / w))), Image.BOX)
+    small = small.filter(ImageFilter.GaussianBlur(LQIP_BLUR))
+    buf = io.BytesIO()
+    small.save(buf, "JPEG", **LQIP_OPTS)
+    return "data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def manifest(sha: str):
+    """{"color", "lqip"} della foto sha (lqip None se troppo grande), o None
+    se non è ancora fatto."""
+    meta = _meta.get(sha)
+    if meta is None:
+        try:
+            meta = json.loads(cache_path(sha).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        _meta[sha] = meta
+    return meta
+
+
+def make(src: Path, sha: str):
+    """Colore e LQIP di una foto nella cache (gira nel pool di processi).
+
+    -> meta, None se Pillow manca o la foto non si apre.
+    """
+    meta = manifest(sha)
+    if meta is not None or Image is None:
+        return meta
+    try:
+        with Image.open(src) as raw:
+            raw.draft("RGB", (LQIP_WIDTH * 8, LQIP_WIDTH * 8))  # JPEG: decodifica già ridotta
+            im = normalize(raw)
+    except OSError:
+        return None
+    uri = lqip(im)
+    meta = {"color": dominant(im), "lqip": uri if len(uri) <= LQIP_MAX else None}
+    dst = cache_path(sha)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".tmp-{os.getpid()}-{dst.name}")
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, dst)
+    return manifest(sha)
+
+
+def for_catalog(meta, cards: int):
+    """Il segnaposto per un catalogo di cards case: da LQIP_MAX_CARDS in su
+    senza LQIP, solo il colore."""
+    if not meta or not meta["lqip"] or cards < LQIP_MAX_CARDS:
+        return meta
+    return {"color": meta["color"], "lqip": None}
+
+
+def style(meta) -> str:
+    """' style="background: ..."' per .card__media, '' senza segnaposto."""
+    if not meta:
+        return ""
+    if not meta["lqip"]:
+        return f' style="background: {meta["color"]}"'
+    return f' style="background: {meta["color"]} url({meta["lqip"]}) center / cover no-repeat"'
+
+
+def digest(meta) -> str:
+    # per le chiavi delle card: cambia se cambia lo sfondo
+    return hashlib.sha256(style(meta).encode("utf-8")).hexdigest()[:12] if meta else ""
+
+
+def gc(current) -> int:
+    """Toglie dalla cache le foto che nessuna casa usa più; ritorna i byte liberati."""
+    keep = {f"{sha}-{KEY}.json" for sha in current}
+    freed = 0
+    for p in CACHE.glob("??/*"):
+        if p.name not in keep:
+            freed += p.stat().st_size
+            p.unlink()
+    return freed
+
+
+def line(name: str, meta) -> str:
+    if not meta["lqip"]:
+        return f"  {name:<24} {meta['color']}  solo colore"
+    return f"  {name:<24} {meta['color']}  LQIP {len(meta['lqip']) / 1024:4.1f} KB"
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    if cmd == "report":
+        # le case del catalogo e le loro foto, come le ha lasciate l'ultimo build
+        import catalog
+        conn = catalog.connect()
+        rows = conn.execute(
+            "SELECT slug, img FROM build_props WHERE slug IN (SELECT slug FROM props) ORDER BY slug").fetchall()
+        total = 0
+        for r in rows:
+            meta = for_catalog(manifest(r["img"]), len(rows))
+            if meta is None:
+                print(f"  {r['slug']:<24} ⏭️ senza segnaposto")
+                continue
+            print(line(r["slug"], meta))
+            total += len(meta["lqip"] or "")
+        print(f"✅ {len(rows)} case, {total / 1024:.1f} KB di LQIP inline nella home.")
+        if len(rows) >= LQIP_MAX_CARDS:
+            print(f"➡️ Da {LQIP_MAX_CARDS} case in su le card hanno solo il colore.")
+    elif cmd == "try" and len(sys.argv) > 2:
+        # prova senza cache né build
+        if Image is None:
+            raise SystemExit("❌ Serve Pillow (pip install Pillow)")
+        for a in sys.argv[2:]:
+            with Image.open(a) as raw:
+                im = normalize(raw)
+            uri = lqip(im)
+            print(line(Path(a).name, {"color": dominant(im), "lqip": uri if len(uri) <= LQIP_MAX else None}))
+    else:
+        print(__doc__.split("Run:", 1)[1].rstrip())
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ricompressione delle foto originali — Salento Stay
+
+- Le foto di INBOX arrivano dalla fotocamera: EXIF, miniature incorporate,
+  profili colore e una qualità JPEG che nessuno ha scelto. Quella
+  pubblicata come img/case/<slug>.jpg (il src delle pagine e la foto
+  "intera") viene rifatta:
+    1. rotazione dall'EXIF (Orientation) applicata ai pixel
+    2. profilo colore incorporato -> sRGB (ImageCms, se c'è)
+    3. niente metadati: né EXIF, né XMP, né ICC, né miniature
+    4. JPEG progressivo, tabelle di Huffman ottimizzate, 4:2:0
+    5. la qualità più bassa (ricerca binaria tra Q_MIN e Q_MAX) che tiene
+       la somiglianza con l'originale sopra SSIM_TARGET
+- SSIM a blocchi 8×8 (le finestre del JPEG) sulla luminanza, a piena
+  risoluzione: medie e varianze dei blocchi le calcola Pillow (ImageMath
+  + resize BOX), Python fa solo i conti per blocco
+- Se il risultato non è più piccolo dell'originale e la foto non va
+  ruotata, resta l'originale
+- Cache in .store/tuned/<sha[:2]>/<sha>-<KEY>.jpg (+ .json con qualità,
+  SSIM e byte prima/dopo): stessa foto e stesse impostazioni, niente da
+  rifare. bulk_fix.py la fa nel pool di processi e pubblica il risultato
+  con un hardlink
+- image_variants.py usa normalize() sulle stesse foto: varianti e foto
+  intera hanno lo stesso verso e gli stessi colori
+- Serve Pillow (pip install Pillow); senza, si pubblica l'originale
+
+Run:
+  python3 photo_tune.py report
+  python3 photo_tune.py try <foto.jpg> [...]
+"""
+
+import hashlib
+import io
+import json
+import os
+import sys
+from pathlib import Path
+
+try:
+    from PIL import Image, ImageMath, ImageOps
+except ImportError:
+    Image = ImageMath = ImageOps = None
+
+try:
+    from PIL import ImageCms
+except ImportError:
+    ImageCms = None
+
+ROOT = Path(".").resolve()
+CACHE = ROOT / ".store" / "tuned"
+
+# cambia se cambia il procedimento (non solo le impostazioni)
+VERSION = 1
+
+SSIM_TARGET = 0.96
+Q_MIN, Q_MAX = 60, 92
+BLOCK = 8
+
+JPEG_OPTS = {"optimize": True, "progressive": True, "subsampling": "4:2:0"}
+
+KEY = hashlib.sha256(json.dumps(
+    {"v": VERSION, "ssim": SSIM_TARGET, "q": [Q_MIN, Q_MAX], "block": BLOCK, "jpeg": JPEG_OPTS},
+    sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+_meta = {}
+
+
+def cache_path(sha: str, ext: str) -> Path:
+    return CACHE / sha[:2] / f"{sha}-{KEY}.{ext}"
+
+
+def normalize(im):
+    """Pixel come vanno mostrati: ruotati secondo l'EXIF, in sRGB, RGB."""
+    im = ImageOps.exif_transpose(im)
+    icc = im.info.get("icc_profile")
+    if icc and ImageCms is not None:
+        try:
+            src = ImageCms.ImageCmsProfile(io.BytesIO(icc))
+            im = ImageCms.profileToProfile(im, src, ImageCms.createProfile("sRGB"),
+                                           outputMode="RGB")
+        except (OSError, ValueError, ImageCms.PyCMSError):
+            pass  # profilo rotto: si tengono i valori come sono
+    return im.convert("RGB")
+
+
+def _mul(a, b):
+    # ImageMath.lambda_eval da Pillow 10.3; prima c'era solo eval
+    if hasattr(ImageMath, "lambda_eval"):
+        return ImageMath.lambda_eval(lambda e: e["a"] * e["b"], a=a, b=b)
+    return ImageMath.eval("a * b", a=a, b=b)
+
+
+def _block_means(f, size):
+    small = f.resize(size, Image.BOX)
+    return list(small.get_flattened_data() if hasattr(small, "get_flattened_data") else small.getdata())
+
+
+def luma(im):
+    """Luminanza in float, tagliata a blocchi interi."""
+    f = im.convert("L").convert("F")
+    w, h = f.size[0] // BLOCK * BLOCK, f.size[1] // BLOCK * BLOCK
+    return f.crop((0, 0, w, h))
+
+
+def ssim(x, y) -> float:
+    """SSIM medio a blocchi tra due luminanze della stessa misura (luma())."""
+    size = (x.size[0] // BLOCK, x.size[1] // BLOCK)
+    mx, my = _block_means(x, size), _block_means(y, size)
+    mxx, myy, mxy = (_block_means(_mul(a, b), size) for a, b in ((x, x), (y, y), (x, y)))
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    total = 0.0
+    for ux, uy, xx, yy, xy in zip(mx, my, mxx, myy, mxy):
+        vx, vy, cov = xx - ux * ux, yy - uy * uy, xy - ux * uy
+        total += ((2 * ux * uy + c1) * (2 * cov + c2)) / ((ux * ux + uy * uy + c1) * (vx + vy + c2))
+    return total / len(mx)
+
+
+def encode(im, q: int) -> bytes:
+    buf = io.BytesIO()
+    im.save(buf, "JPEG", quality=q, **JPEG_OPTS)
+    return buf.getvalue()
+
+
+def search(im):
+    """(qualità, byte, ssim) della qualità più bassa che tiene SSIM_TARGET."""
+    ref = luma(im)
+    best = None
+    lo, hi = Q_MIN, Q_MAX
+    while lo <= hi:
+        q = (lo + hi) // 2
+        data = encode(im, q)
+        with Image.open(io.BytesIO(data)) as out:
+            score = ssim(ref, luma(out))
+        if score >= SSIM_TARGET:
+            best = (q, data, score)
+            hi = q - 1
+        else:
+            lo = q + 1
+    if best is None:
+        # neanche Q_MAX basta (foto già rovinata o molto fine): Q_MAX
+        data = encode(im, Q_MAX)
+        with Image.open(io.BytesIO(data)) as out:
+            best = (Q_MAX, data, ssim(ref, luma(out)))
+    return best
+
+
+def manifest(sha: str):
+    """Esito per la foto sha ({"q", "ssim", "in", "out", ...}) o None se non è ancora fatta."""
+    meta = _meta.get(sha)
+    if meta is None:
+        try:
+            meta = json.loads(cache_path(sha, "json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        _meta[sha] = meta
+    return meta
+
+
+def master(sha: str):
+    """JPEG da pubblicare al posto dell'originale, o None (resta l'originale)."""
+    meta = manifest(sha)
+    return cache_path(sha, "jpg") if meta and meta["q"] is not None else None
+
+
+def _write(dst: Path, data: bytes):
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".tmp-{os.getpid()}-{dst.name}")
+    tmp.write_bytes(data)
+    os.replace(tmp, dst)
+
+
+def tune(src: Path, sha: str):
+    """Ricomprime una foto nella cache (gira nel pool di processi).
+
+    -> meta (anche quando resta l'originale), None se Pillow manca o la
+    foto non si apre.
+    """
+    meta = manifest(sha)
+    if meta is not None or Image is None:
+        return meta
+    size = src.stat().st_size
+    try:
+        with Image.open(src) as raw:
+            rotated = raw.getexif().get(0x0112, 1) not in (0, 1)
+            im = normalize(raw)
+        q, data, score = search(im)
+    except OSError:
+        return None
+    if len(data) < size or rotated:
+        _write(cache_path(sha, "jpg"), data)
+        meta = {"q": q, "ssim": round(score, 4), "in": size, "out": len(data), "w": im.size[0], "h": im.size[1]}
+    else:
+        meta = {"q": None, "ssim": None, "in": size, "out": size, "w": im.size[0], "h": im.size[1]}
+    # il .json per ultimo: c'è solo se il .jpg è già al suo posto
+    _write(cache_path(sha, "json"), json.dumps(meta).encode("utf-8"))
+    return manifest(sha)
+
+
+def gc(current) -> int:
+    """Toglie dalla cache le foto che nessuna casa usa più; ritorna i byte liberati."""
+    keep = {f"{sha}-{KEY}" for sha in current}
+    freed = 0
+    for p in CACHE.glob("??/*"):
+        if p.name.rsplit(".", 1)[0] not in keep:
+            freed += p.stat().st_size
+            p.unlink()
+    return freed
+
+
+def line(name: str, meta) -> str:
+    if meta["q"] is None:
+        return f"  {name:<24} {meta['in'] / 1024:8.0f} KB  resta l'originale"
+    saved = meta["in"] - meta["out"]
+    return (f"  {name:<24} {meta['in'] / 1024:8.0f} KB → {meta['out'] / 1024:6.0f} KB"
+            f"  -{saved / 1024:6.0f} KB ({saved / meta['in']:4.0%})  q{meta['q']}  ssim {meta['ssim']:.3f}")
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    if cmd == "report":
+        # le case del catalogo e le loro foto, come le ha lasciate l'ultimo build
+        import catalog
+        conn = catalog.connect()
+        rows = conn.execute(
+            "SELECT slug, img FROM build_props WHERE slug IN (SELECT slug FROM props) ORDER BY slug").fetchall()
+        before = after = 0
+        for r in rows:
+            meta = manifest(r["img"])
+            if meta is None:
+                print(f"  {r['slug']:<24} ⏭️ non ancora ricompressa")
+                continue
+            print(line(r["slug"], meta))
+            before, after = before + meta["in"], after + meta["out"]
+        if before:
+            print(f"✅ {before / 1024 / 1024:.1f} MB → {after / 1024 / 1024:.1f} MB "
+                  f"({(before - after) / before:.0%} in meno).")
+    elif cmd == "try" and len(sys.argv) > 2:
+        # prova senza cache né build: cosa verrebbe fuori da queste foto
+        if Image is None:
+            raise SystemExit("❌ Serve Pillow (pip install Pillow)")
+        for a in sys.argv[2:]:
+            src = Path(a)
+            with Image.open(src) as raw:
+                im = normalize(raw)
+            q, data, score = search(im)
+            print(line(src.name, {"q": q, "ssim": score, "in": src.stat().st_size, "out": len(data)}))
+    else:
+        print(__doc__.split("Run:", 1)[1].rstrip())
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Profiler del build e delle patch — Salento Stay
+
+- Con --profile ogni fase (ingest, render case, patch index, css/js, ...)
+  registra: tempo reale, tempo CPU, byte letti/scritti (/proc/self/io,
+  solo Linux) e picco di memoria Python (tracemalloc)
+- Le fasi ripetute (una per blocco di case) si sommano; "calls" dice quante
+- Report JSON in .profile/<script>-<stamp>.json (o --profile=percorso.json)
+- --cprofile: in più un dump cProfile (.prof) accanto al JSON
+- Senza --profile non fa nulla (niente tracemalloc, costo zero)
+
+Nota: CPU e I/O sono del processo principale; il lavoro dei worker del
+pool di processi (hash degli asset, patch_runner --jobs) si vede solo
+come tempo reale.
+
+Uso:
+    prof = Profiler.from_argv("bulk_fix")
+    with prof:
+        with prof.stage("ingest"):
+            ...
+"""
+
+import cProfile
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(".").resolve()
+PROFILE_DIR = ROOT / ".profile"
+PROC_IO = Path("/proc/self/io")
+
+# chiave nel report -> campo di /proc/self/io
+IO_FIELDS = {
+    "read_bytes": "rchar",
+    "write_bytes": "wchar",
+    "disk_read_bytes": "read_bytes",
+    "disk_write_bytes": "write_bytes",
+}
+
+
+def io_counters():
+    try:
+        text = PROC_IO.read_text()
+    except OSError:
+        return None
+    raw = dict(line.split(":", 1) for line in text.splitlines() if ":" in line)
+    return {k: int(raw.get(f, 0)) for k, f in IO_FIELDS.items()}
+
+
+def fmt_bytes(n) -> str:
+    if n is None:
+        return "-"
+    for unit in ("B", "KB", "MB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+class Profiler:
+    def __init__(self, script, enabled=False, report=None, cprofile=False):
+        self.script = script
+        self.enabled = enabled
+        self.stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.report = Path(report) if report else PROFILE_DIR / f"{script}-{self.stamp}.json"
+        self.cprofile = cProfile.Profile() if enabled and cprofile else None
+        self.stages = {}  # nome -> totali, nell'ordine in cui le fasi si aprono
+        self.notes = {}
+        self.stack = []
+        self.exit = None
+
+    @classmethod
+    def from_argv(cls, script, argv=None):
+        argv = sys.argv[1:] if argv is None else argv
+        enabled = False
+        report = None
+        for a in argv:
+            if a in ("--profile", "--cprofile"):
+                enabled = True
+            elif a.startswith("--profile="):
+                enabled = True
+                report = a.split("=", 1)[1]
+        return cls(script, enabled, report, "--cprofile" in argv)
+
+    def note(self, **values):
+        """Numeri utili per leggere il profilo (case, pagine, worker, ...)."""
+        self.notes.update(values)
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        # il picco di tracemalloc è uno solo: la fase esterna si salva il
+        # suo prima che quella interna lo azzeri
+        if self.stack:
+            parent = self.stack[-1]
+            parent["peak"] = max(parent["peak"], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        frame = {"peak": 0}
+        self.stack.append(frame)
+        io0 = io_counters()
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall0
+            cpu = time.process_time() - cpu0
+            io1 = io_counters()
+            self.stack.pop()
+            peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+            if self.stack:
+                self.stack[-1]["peak"] = max(self.stack[-1]["peak"], peak)
+
+            s = self.stages.setdefault(name, {
+                "calls": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                **{k: (0 if io0 else None) for k in IO_FIELDS},
+                "peak_bytes": 0,
+            })
+            s["calls"] += 1
+            s["wall_s"] += wall
+            s["cpu_s"] += cpu
+            if io0 and io1:
+                for k in IO_FIELDS:
+                    s[k] += io1[k] - io0[k]
+            s["peak_bytes"] = max(s["peak_bytes"], peak)
+
+    def __enter__(self):
+        if not self.enabled:
+            return self
+        tracemalloc.start()
+        self.exit = ExitStack()
+        self.exit.enter_context(self.stage("total"))
+        if self.cprofile:
+            self.cprofile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.enabled:
+            return False
+        if self.cprofile:
+            self.cprofile.disable()
+        self.exit.close()
+        tracemalloc.stop()
+        self.write(ok=exc_type is None)
+        return False
+
+    def write(self, ok=True):
+        self.report.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "script": self.script,
+            "started": self.stamp,
+            "argv": sys.argv[1:],
+            "ok": ok,
+            "notes": self.notes,
+            "stages": [{"name": k, **v} for k, v in self.stages.items()],
+        }
+        if self.cprofile:
+            dump = self.report.with_suffix(".prof")
+            self.cprofile.dump_stats(str(dump))
+            data["cprofile"] = str(dump)
+        self.report.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+        print(f"⏱️  Profilo {self.script} → {self.report}")
+        print(f"  {'fase':<16} {'chiamate':>8} {'reale':>10} {'cpu':>10} {'letti':>10} {'scritti':>10} {'picco mem':>10}")
+        for name, s in self.stages.items():
+            print(f"  {name:<16} {s['calls']:>8} {s['wall_s'] * 1000:>7.1f} ms {s['cpu_s'] * 1000:>7.1f} ms "
+                  f"{fmt_bytes(s['read_bytes']):>10} {fmt_bytes(s['write_bytes']):>10} {fmt_bytes(s['peak_bytes']):>10}")
+        if self.cprofile:
+            print(f"➡️ cProfile: python3 -m pstats {data['cprofile']}")
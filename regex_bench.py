@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark delle passate regex — Salento Stay
+
+- Ogni funzione di patch che lavora su tutto index.html viene misurata su
+  index finti sempre più grandi (1000 → 8000 card di default)
+- Tre varianti di input:
+    ok          card ben formate
+    malformed   una card ogni 50 senza </article>
+    unclosed    nessuna card chiusa (incolla troncato, merge sbagliato)
+- Controllo di complessità: pendenza della retta log(tempo)/log(card)
+  su tutte le taglie; oltre --max-slope (1.5; quadratico ≈ 2) la passata è
+  "superlineare" e il benchmark fallisce
+- Ogni (funzione, variante) gira in un processo a parte con timeout
+  (--timeout, secondi): una regex che si pianta non blocca il resto
+- Esce con 1 se una passata è superlineare o va in timeout
+
+Run:
+  python3 regex_bench.py [--sizes=1000,2000,4000,8000] [--repeat=3] [--timeout=20]
+                         [--max-slope=1.3] [--only=nome_funzione]
+"""
+
+import importlib
+import json
+import math
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+SIZES = (1000, 2000, 4000, 8000)
+REPEAT = 3
+TIMEOUT = 20.0
+MAX_SLOPE = 1.5
+VARIANTS = ("ok", "malformed", "unclosed")
+
+# (modulo, funzione): le passate che girano su tutto index.html. Le pass
+# del runner non fanno più una scansione a testa: si misura la passata
+# html_stream unica con gli handler di tutte
+TARGETS = (
+    ("html_stream", "transform_text"),
+    ("patch_runner", "patch_index_text"),
+)
+
+ZONES = ("Baia Verde", "Gallipoli", "Lido San Giovanni", "Rivabella")
+
+HEAD = """<!doctype html>
+<html lang="it">
+<head><meta charset="utf-8"><title>Salento Stay</title></head>
+<body>
+<!-- CLEAN_FILTERS_V3:BAR -->
+<div class="caseBar" id="caseBar"><div class="caseBar__row">filtri</div></div>
+<div class="toolbar"><select id="sort"><option>Consigliate</option></select></div>
+<div class="cards" id="cardsGrid">
+"""
+
+TAIL = """</div>
+<footer class="footer"><div class="footer__links"><a href="/privacy.html">Privacy</a></div></footer>
+</body>
+</html>
+"""
+
+
+def arg(name, default):
+    for a in sys.argv[1:]:
+        if a.startswith(f"--{name}="):
+            return a.split("=", 1)[1]
+    return default
+
+
+def card(i: int, closed: bool) -> str:
+    # markup "vecchio" (senza data-* né overlay): le passate hanno lavoro da fare
+    slug = f"casa-{i:05d}"
+    zone = ZONES[i % len(ZONES)]
+    return f"""  <article class="card property-card">
+    <img src="/img/case/{slug}.jpg" alt="CASA {i}">
+    <div class="card__body">
+      <h3>CASA {i}</h3>
+      <ul class="meta"><li>📍 {zone}</li><li>👥 {2 + i % 12} ospiti</li></ul>
+      <a class="link" href="case/{slug}.html">Vedi dettagli →</a>
+      <a class="chip" href="https://wa.me/393292272939">WhatsApp</a>
+    </div>
+{"  </article>" if closed else ""}
+"""
+
+
+def make_index(n: int, variant: str) -> str:
+    def closed(i):
+        if variant == "unclosed":
+            return False
+        return not (variant == "malformed" and i % 50 == 7)
+    return HEAD + "".join(card(i, closed(i)) for i in range(n)) + TAIL
+
+
+def worker(module, func, variant, sizes, repeat):
+    # una riga JSON per taglia, subito: se il processo va in timeout il
+    # padre ha comunque le taglie già misurate
+    sys.path.insert(0, str(HERE))
+    fn = getattr(importlib.import_module(module), func)
+    for n in sizes:
+        html = make_index(n, variant)
+        best = math.inf
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn(html)
+            best = min(best, time.perf_counter() - t0)
+        print(json.dumps({"n": n, "seconds": best, "bytes": len(html)}), flush=True)
+
+
+def slope(points) -> float:
+    # minimi quadrati su log(n), log(t): un solo punto rumoroso pesa poco
+    xs = [math.log(n) for n, _ in points]
+    ys = [math.log(max(t, 1e-9)) for _, t in points]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sum((x - mx) ** 2 for x in xs)
+
+
+def main():
+    if sys.argv[1:2] == ["--worker"]:
+        module, func, variant, sizes, repeat = sys.argv[2:7]
+        worker(module, func, variant, [int(s) for s in sizes.split(",")], int(repeat))
+        return
+
+    sizes = [int(s) for s in arg("sizes", ",".join(map(str, SIZES))).split(",") if s]
+    repeat = int(arg("repeat", REPEAT))
+    timeout = float(arg("timeout", TIMEOUT))
+    max_slope = float(arg("max-slope", MAX_SLOPE))
+    only = arg("only", None)
+
+    failed = []
+    print(f"  {'passata':<52} {'variante':<10} " + " ".join(f"{n:>9}" for n in sizes) + "  pendenza")
+    for module, func in TARGETS:
+        if only and func != only:
+            continue
+        for variant in VARIANTS:
+            cmd = [sys.executable, str(Path(__file__).resolve()), "--worker",
+                   module, func, variant, ",".join(map(str, sizes)), str(repeat)]
+            timed_out = False
+            try:
+                r = subprocess.run(cmd, cwd=HERE, capture_output=True, text=True, timeout=timeout)
+                stdout = r.stdout
+                if r.returncode:
+                    raise SystemExit(f"{module}.{func} ({variant}) fallita:\n{r.stderr}")
+            except subprocess.TimeoutExpired as e:
+                timed_out = True
+                stdout = (e.stdout or b"").decode() if isinstance(e.stdout, bytes) else (e.stdout or "")
+
+            points = [(d["n"], d["seconds"]) for d in map(json.loads, stdout.splitlines())]
+            cells = [f"{t * 1000:7.1f}ms" for _, t in points] + ["   ⏱️ ---"] * (len(sizes) - len(points))
+            if timed_out:
+                verdict = f"⚠️ timeout ({timeout:.0f}s)"
+            elif len(points) > 1:
+                s = slope(points)
+                verdict = f"{s:5.2f}" + (" ⚠️ superlineare" if s > max_slope else "")
+            else:
+                verdict = "-"
+            if timed_out or (len(points) > 1 and slope(points) > max_slope):
+                failed.append(f"{module}.{func} ({variant})")
+            print(f"  {module + '.' + func:<52} {variant:<10} " + " ".join(f"{c:>9}" for c in cells) + f"  {verdict}")
+
+    if failed:
+        print("\n❌ Passate superlineari o bloccate:")
+        for f in failed:
+            print(f"  {f}")
+        raise SystemExit(1)
+    print("\n✅ Tutte le passate restano lineari.")
+
+
+if __name__ == "__main__":
+    main()
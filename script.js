@@ -105,26 +105,31 @@ function parseIntSafe(v) {
 }
 
 function initCardsClickthrough() {
-  // Click su tutta la card -> apre la scheda
-  document.querySelectorAll(".property-card").forEach((card) => {
-    const href = card.getAttribute("data-href");
-    if (!href) return;
-
-    card.addEventListener("click", (e) => {
-      // Non hijackare click su link/bottoni/inputs
-      if (e.target && e.target.closest("a, button, input, textarea, select, label")) return;
-      window.location.href = href;
-    });
+  // Click su tutta la card -> apre la scheda. Delegato e letto al momento:
+  // vale anche per le card della griglia virtuale, che riusano i nodi
+  const cardFrom = (e) => (e.target && e.target.closest ? e.target.closest(".property-card[data-href]") : null);
+
+  document.addEventListener("click", (e) => {
+    const card = cardFrom(e);
+    if (!card) return;
+    // Non hijackare click su link/bottoni/inputs
+    if (e.target.closest("a, button, input, textarea, select, label")) return;
+    window.location.href = card.getAttribute("data-href");
+  });
+
+  document.addEventListener("keydown", (e) => {
+    const card = cardFrom(e);
+    if (!card || e.target !== card) return;
+    if (e.key === "Enter" || e.key === " ") {
+      e.preventDefault();
+      window.location.href = card.getAttribute("data-href");
+    }
+  });
 
-    // Cursor e accessibilità
+  // Cursor e accessibilità
+  document.querySelectorAll(".property-card[data-href]").forEach((card) => {
     card.setAttribute("role", "link");
     card.setAttribute("tabindex", "0");
-    card.addEventListener("keydown", (e) => {
-      if (e.key === "Enter" || e.key === " ") {
-        e.preventDefault();
-        window.location.href = href;
-      }
-    });
   });
 }
 
@@ -148,175 +153,614 @@ function initRevealAnimations() {
   });
 }
 
-function initFiltersAndSearch() {
-  const optionCards = Array.from(document.querySelectorAll(".option-card"));
-  const cards = Array.from(document.querySelectorAll(".property-card"));
-  const resultsMeta = document.getElementById("resultsMeta");
-  const btnShowAll = document.getElementById("btnShowAll");
-  const searchInput = document.getElementById("searchInput");
-  const sortSelect = document.getElementById("sortSelect");
-  const cardsGrid = document.getElementById("cardsGrid");
+// Filtri delle case: uno stato, un solo listener delegato, un render per
+// ogni cambio di stato. Comandi (quelli che ci sono nella pagina): fasce
+// (.option-card), chip ospiti e zona (#cbGuests, #cbZones), ricerca
+// (#searchInput), ordinamento (#sortSelect, #cbSort), reset (#cbReset, #btnShowAll)
+const SORT_ALIASES = { default: "featured", guestsAsc: "guests-asc", guestsDesc: "guests-desc", zoneAZ: "zone-asc" };
+
+// un solo collator per tutti gli ordinamenti (localeCompare ne crea uno a confronto)
+const COLLATOR = window.Intl && Intl.Collator ? new Intl.Collator("it", { sensitivity: "base" }) : null;
+
+function compareText(a, b) {
+  return COLLATOR ? COLLATOR.compare(a, b) : a.localeCompare(b, "it", { sensitivity: "base" });
+}
 
-  if (!cards.length || !cardsGrid) return;
+function guestKey(min, max) {
+  return max >= 99 ? `${min}+` : `${min}-${max}`;
+}
 
-  let activeRange = null; // {min, max}
-  let searchTerm = "";
+function parseGuestKey(key) {
+  // "2-4" -> {2, 4}; "12+" -> {12, 99}; "all" -> null
+  const m = safeText(key).match(/^(\d+)\s*(?:[-–]\s*(\d+)|\+)$/);
+  return m ? { min: parseIntSafe(m[1]), max: m[2] ? parseIntSafe(m[2]) : 99 } : null;
+}
 
-  const getGuests = (card) => {
-    const attr = card.getAttribute("data-guests");
-    const n = parseIntSafe(attr);
-    if (n != null) return n;
+// bitset: un bit per card, 32 card per parola di un Uint32Array
+function bitsetNew(n) {
+  return new Uint32Array((n + 31) >>> 5);
+}
 
-    // fallback: prova a leggere "👥 6 ospiti" dal testo
-    const m = card.textContent.match(/\b(\d+)\s*ospiti\b/i);
-    return m ? parseIntSafe(m[1]) : null;
-  };
+function bitsetAdd(bits, i) {
+  bits[i >>> 5] |= 1 << (i & 31);
+}
+
+function bitsetHas(bits, i) {
+  return (bits[i >>> 5] >>> (i & 31)) & 1;
+}
+
+function bitsetAnd(bits, other) {
+  for (let w = 0; w < bits.length; w++) bits[w] &= other[w];
+  return bits;
+}
+
+function bitsetCount(bits) {
+  let n = 0;
+  for (let w = 0; w < bits.length; w++) {
+    let v = bits[w];
+    v -= (v >>> 1) & 0x55555555;
+    v = (v & 0x33333333) + ((v >>> 2) & 0x33333333);
+    n += (((v + (v >>> 4)) & 0x0f0f0f0f) * 0x01010101) >>> 24;
+  }
+  return n;
+}
+
+// minuscole e senza accenti, come fold() in search_index.py
+function foldText(s) {
+  return safeText(s).normalize("NFKD").replace(/[\u0300-\u036f]/g, "").toLowerCase();
+}
+
+function searchWords(s) {
+  return foldText(s).match(/[a-z0-9]+/g) || [];
+}
+
+// JSON prodotti dal build accanto a index.html; null se mancano o se la
+// pagina è aperta da file://, dove fetch non va
+function fetchJSON(url) {
+  if (!window.fetch) return Promise.resolve(null);
+  return fetch(url)
+    .then((res) => (res.ok ? res.json() : null))
+    .catch(() => null);
+}
+
+// search-index.json (bulk_fix.py): termini in ordine, liste di case a differenze
+function loadSearchIndex() {
+  return fetchJSON("search-index.json")
+    .then((idx) => {
+      if (!idx || !Array.isArray(idx.terms)) return null;
+      idx.postings = idx.postings.map((gaps) => {
+        let n = 0;
+        return gaps.map((g) => (n += g));
+      });
+      return idx;
+    });
+}
 
-  const getZone = (card) => safeText(card.getAttribute("data-zone"));
-  const getName = (card) => safeText(card.getAttribute("data-name"));
+// facets.json (bulk_fix.py): case per zona × fascia, già in ogni ordinamento
+function loadFacets() {
+  return fetchJSON("facets.json")
+    .then((t) => (t && t.cells && Array.isArray(t.ids) ? t : null));
+}
 
-  const cardMatches = (card) => {
-    // range
-    if (activeRange) {
-      const g = getGuests(card);
-      if (g == null) return false;
-      if (g < activeRange.min || g > activeRange.max) return false;
+// case con tutte le parole (ognuna come prefisso), come bitset su n card;
+// postings[k] = card (già rimappate sulla pagina) del termine idx.terms[k]
+function searchIndexQuery(idx, postings, words, n) {
+  let hits = null;
+  for (const w of words) {
+    // primo termine >= w, poi tutti quelli che iniziano con w
+    let lo = 0, hi = idx.terms.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >> 1;
+      if (idx.terms[mid] < w) lo = mid + 1; else hi = mid;
     }
+    const found = bitsetNew(n);
+    for (let k = lo; k < idx.terms.length && idx.terms[k].startsWith(w); k++) {
+      postings[k].forEach((i) => bitsetAdd(found, i));
+    }
+    hits = hits ? bitsetAnd(hits, found) : found;
+  }
+  return hits;
+}
+
+// Griglia virtuale: con tante case nel DOM restano solo le righe visibili
+// (più un margine sopra e sotto) e i nodi delle card si riusano, riscrivendo
+// attributi e testi. data-virtual="on"/"off" sulla griglia forza la scelta
+const VIRTUAL_MIN = 60;
+const VIRTUAL_BUFFER_ROWS = 3;
+
+function cardNodes(card) {
+  return [card, ...card.querySelectorAll("*")];
+}
 
-    // search
-    if (searchTerm) {
-      const hay = `${getName(card)} ${getZone(card)} ${safeText(card.textContent)}`.toLowerCase();
-      if (!hay.includes(searchTerm)) return false;
+// -> { show(lista di card), text(i) } oppure null se le card non hanno
+// tutte la stessa struttura (fatte a mano): allora resta la griglia normale
+function initVirtualGrid(grid, els) {
+  const template = els[0].cloneNode(true);
+  template.classList.remove("reveal", "in", "is-hidden", "is-gone");
+  const tplNodes = cardNodes(template);
+
+  // slot: [elemento, attributo] oppure [elemento, null] per il testo di una foglia;
+  // attributi di tutte le card (non tutte le foto hanno srcset). Lo style
+  // della card no (lo toccano reveal e filtri), quello dentro sì: aspect-ratio
+  // delle foto
+  const cards = els.map(cardNodes);
+  if (cards.some((nodes) => nodes.length !== tplNodes.length)) return null;
+  const slots = [];
+  tplNodes.forEach((el, k) => {
+    const names = new Set();
+    cards.forEach((nodes) => Array.from(nodes[k].attributes).forEach((a) => names.add(a.name)));
+    names.forEach((name) => {
+      if (name !== "class" && (name !== "style" || k > 0)) slots.push([k, name]);
+    });
+    if (!el.children.length) slots.push([k, null]);
+  });
+  const textSlots = slots.map((s, k) => (s[1] ? -1 : k)).filter((k) => k >= 0);
+
+  // di ogni card restano solo questi valori, non i nodi
+  const values = cards.map((nodes) => slots.map(([k, name]) => (name ? nodes[k].getAttribute(name) : nodes[k].textContent)));
+
+  // altezza di una riga e colonne, misurate sulla griglia vera
+  const cs = window.getComputedStyle(grid);
+  let gap = parseFloat(cs.rowGap) || 0;
+  let rowH = els[0].offsetHeight + gap;
+  const columns = () => Math.max(1, window.getComputedStyle(grid).gridTemplateColumns.split(" ").filter(Boolean).length);
+  let cols = columns();
+
+  els.forEach((el) => el.remove());
+  const spacer = () => {
+    const el = document.createElement("div");
+    el.setAttribute("aria-hidden", "true");
+    el.style.gridColumn = "1 / -1";
+    el.style.display = "none";
+    grid.appendChild(el);
+    return el;
+  };
+  const top = spacer();
+  const bottom = spacer();
+  const setSpacer = (el, rows) => {
+    const h = rows > 0 ? rows * rowH - gap : 0;
+    el.style.display = h > 0 ? "" : "none";
+    el.style.height = `${h}px`;
+  };
+
+  const pool = []; // { el, nodes, idx }: nodi creati una volta e riusati
+  let mounted = [];
+  let list = [];
+
+  const fill = (slot, i) => {
+    if (slot.idx === i) return;
+    const v = values[i];
+    slots.forEach(([k, name], s) => {
+      const node = slot.nodes[k];
+      if (!name) {
+        if (node.textContent !== v[s]) node.textContent = v[s];
+      } else if (v[s] == null) {
+        node.removeAttribute(name);
+      } else if (node.getAttribute(name) !== v[s]) {
+        node.setAttribute(name, v[s]);
+      }
+    });
+    slot.idx = i;
+  };
+
+  const update = () => {
+    const rows = Math.ceil(list.length / cols);
+    let first = 0;
+    let last = rows;
+    if (rowH > gap) {
+      const rect = grid.getBoundingClientRect();
+      const view = window.innerHeight || document.documentElement.clientHeight;
+      last = Math.min(rows, Math.max(0, Math.ceil((view - rect.top) / rowH)) + VIRTUAL_BUFFER_ROWS);
+      first = Math.min(last, Math.max(0, Math.floor(-rect.top / rowH) - VIRTUAL_BUFFER_ROWS));
     }
+    const want = list.slice(first * cols, last * cols);
+
+    // i nodi che mostrano già una card della finestra restano com'è, gli altri si riusano
+    const wanted = new Set(want);
+    const holding = new Map(pool.filter((s) => wanted.has(s.idx)).map((s) => [s.idx, s]));
+    const free = pool.filter((s) => !wanted.has(s.idx));
+    const next = want.map((i) => {
+      let slot = holding.get(i) || free.pop();
+      if (!slot) {
+        const el = template.cloneNode(true);
+        slot = { el, nodes: cardNodes(el), idx: -1 };
+        pool.push(slot);
+      }
+      fill(slot, i);
+      return slot;
+    });
 
-    return true;
+    if (next.length !== mounted.length || next.some((s, k) => s !== mounted[k])) {
+      const keep = new Set(next);
+      mounted.forEach((s) => { if (!keep.has(s)) s.el.remove(); });
+      const frag = document.createDocumentFragment();
+      next.forEach((s) => frag.appendChild(s.el));
+      grid.insertBefore(frag, bottom);
+      mounted = next;
+    }
+    setSpacer(top, first);
+    setSpacer(bottom, rows - last);
+
+    // righe più alte del previsto (testi lunghi, font caricati): si rimisura
+    const h = mounted.reduce((m, s) => Math.max(m, s.el.offsetHeight), 0) + gap;
+    if (h > gap && Math.abs(h - rowH) > 1) {
+      rowH = h;
+      schedule();
+    }
   };
 
-  const updateMeta = (shown, total) => {
-    if (!resultsMeta) return;
+  let frame = 0;
+  const schedule = () => {
+    if (frame) return;
+    frame = requestAnimationFrame(() => {
+      frame = 0;
+      update();
+    });
+  };
 
-    const rangeTxt = activeRange
-      ? (activeRange.max >= 99
-          ? `Fascia: ${activeRange.min}+ posti`
-          : `Fascia: ${activeRange.min}–${activeRange.max} posti`)
-      : "Tutte le fasce";
-    const searchTxt = searchTerm ? ` • Ricerca: \"${searchTerm}\"` : "";
+  window.addEventListener("scroll", schedule, { passive: true });
+  window.addEventListener("resize", () => {
+    cols = columns();
+    gap = parseFloat(window.getComputedStyle(grid).rowGap) || 0;
+    schedule();
+  });
 
-    resultsMeta.textContent = `Mostrando ${shown} su ${total}. ${rangeTxt}${searchTxt}`;
+  return {
+    show(next) {
+      list = next;
+      update();
+    },
+    text(i) {
+      return textSlots.map((s) => values[i][s]).join(" ");
+    }
   };
+}
 
-  const setCardVisible = (card, visible) => {
-    // animazione (leggera)
-    if (visible) {
-      card.classList.remove("is-gone");
-      requestAnimationFrame(() => card.classList.remove("is-hidden"));
-    } else {
-      card.classList.add("is-hidden");
-      window.setTimeout(() => card.classList.add("is-gone"), 220);
+function initFilters() {
+  const cardsGrid = document.getElementById("cardsGrid") || document.querySelector(".cards");
+  if (!cardsGrid) return;
+
+  const optionCards = Array.from(document.querySelectorAll(".option-card"));
+  const guestChips = document.getElementById("cbGuests");
+  const zoneChips = document.getElementById("cbZones");
+  const searchInput = document.getElementById("searchInput");
+  const sortSelects = ["sortSelect", "cbSort"].map((id) => document.getElementById(id)).filter(Boolean);
+  const metas = ["cbCount", "resultsMeta"].map((id) => document.getElementById(id)).filter(Boolean);
+  const empty = document.getElementById("cbEmpty");
+  const btnShowAll = document.getElementById("btnShowAll");
+
+  // dati delle card letti UNA volta, in colonne: ospiti in un Uint8Array
+  // (0 = non noto), zona come id interno, il resto per posizione
+  const els = Array.from(cardsGrid.querySelectorAll(".property-card"));
+  const n = els.length;
+  if (!n) return;
+  const names = new Array(n);
+  const slugs = new Array(n);
+  const guests = new Uint8Array(n);
+  const zoneOf = new Uint16Array(n);
+  const zoneIds = new Map(); // zona in minuscolo -> id
+  const zoneNames = []; // id -> zona come scritta nella prima card
+  const texts = new Array(n); // testo della card, solo se manca l'indice
+  const timers = new Array(n).fill(null);
+
+  els.forEach((el, i) => {
+    const zone = safeText(el.getAttribute("data-zone"));
+    names[i] = safeText(el.getAttribute("data-name"));
+    slugs[i] = (safeText(el.getAttribute("data-href")).match(/([^/]+)\.html$/) || [])[1] || "";
+    let g = parseIntSafe(el.getAttribute("data-guests"));
+    if (g == null) {
+      // fallback: "👥 6 ospiti" nel testo
+      const m = safeText(el.textContent).match(/\b(\d+)\s*ospiti\b/i);
+      g = m ? parseIntSafe(m[1]) : null;
+    }
+    guests[i] = g == null || g < 1 ? 0 : Math.min(g, 255);
+    const key = zone.toLowerCase();
+    if (!zoneIds.has(key)) {
+      zoneIds.set(key, zoneNames.length);
+      zoneNames.push(zone);
     }
+    zoneOf[i] = zoneIds.get(key);
+  });
+  const slotOf = new Map(slugs.map((slug, i) => [slug, i]));
+
+  const mode = cardsGrid.dataset.virtual;
+  const virtual = mode === "on" || (mode !== "off" && n >= VIRTUAL_MIN) ? initVirtualGrid(cardsGrid, els) : null;
+  // griglia virtuale: le card vere sono staccate, non si tengono in memoria
+  if (virtual) els.length = 0;
+  const cardText = (i) => (virtual ? virtual.text(i) : els[i].textContent);
+
+  // bitset precalcolati: tutte le card, una per zona, una per fascia ospiti
+  const ALL = bitsetNew(n);
+  for (let i = 0; i < n; i++) bitsetAdd(ALL, i);
+  const zoneBits = zoneNames.map(() => bitsetNew(n));
+  for (let i = 0; i < n; i++) bitsetAdd(zoneBits[zoneOf[i]], i);
+  const NONE = bitsetNew(n);
+
+  const bandBits = new Map();
+  const band = (key) => {
+    if (!bandBits.has(key)) {
+      const range = parseGuestKey(key);
+      const bits = bitsetNew(n);
+      if (range) {
+        for (let i = 0; i < n; i++) {
+          if (guests[i] && guests[i] >= range.min && guests[i] <= range.max) bitsetAdd(bits, i);
+        }
+      }
+      bandBits.set(key, range ? bits : ALL);
+    }
+    return bandBits.get(key);
   };
+  optionCards.forEach((b) => band(guestKey(parseIntSafe(b.getAttribute("data-min")), parseIntSafe(b.getAttribute("data-max")))));
+  if (guestChips) guestChips.querySelectorAll("[data-guest]").forEach((b) => band(b.dataset.guest));
 
-  const apply = () => {
-    let shown = 0;
-    const total = cards.length;
+  // la barra a chip sostituisce la vecchia toolbar (ricerca + select)
+  const legacy = document.getElementById("filterbar");
+  if (legacy && document.getElementById("caseBar")) legacy.classList.add("legacyHide");
 
-    cards.forEach((card) => {
-      const ok = cardMatches(card);
-      setCardVisible(card, ok);
-      if (ok) shown += 1;
+  // chip zona dalle zone delle card
+  if (zoneChips) {
+    zoneChips.querySelectorAll('[data-zone]:not([data-zone="all"])').forEach((el) => el.remove());
+    const frag = document.createDocumentFragment();
+    zoneNames.filter(Boolean).sort(compareText).forEach((z) => {
+      const b = document.createElement("button");
+      b.type = "button";
+      b.className = "chip";
+      b.dataset.zone = z;
+      b.textContent = z;
+      frag.appendChild(b);
     });
+    zoneChips.appendChild(frag);
+  }
 
-    updateMeta(shown, total);
-    if (btnShowAll) btnShowAll.hidden = !(activeRange || searchTerm);
+  const DEFAULTS = { guests: "all", zone: "all", query: "", sort: "featured" };
+  let state = { ...DEFAULTS };
+
+  // card di una zona ("all" = tutte) in una fascia, come bitset
+  const facetBits = (zone, bandKey) => {
+    const bits = band(bandKey).slice();
+    if (zone !== "all") {
+      const id = zoneIds.get(zone.toLowerCase());
+      bitsetAnd(bits, id == null ? NONE : zoneBits[id]);
+    }
+    return bits;
   };
 
-  const setActiveOption = (btn) => {
-    optionCards.forEach((b) => {
-      const isActive = b === btn;
-      b.classList.toggle("is-active", isActive);
-      b.setAttribute("aria-pressed", isActive ? "true" : "false");
-    });
+  // tabelle di facets.json: conteggi e liste per zona × fascia, già
+  // ordinate. Cella: undefined = niente tabella per questa fascia (si usano
+  // i bitset), null = nessuna casa
+  let table = null;
+  const tableCell = (zone, bandKey) => {
+    if (!table || (bandKey !== "all" && !table.bands.includes(bandKey))) return undefined;
+    return table.cells[`${zone === "all" ? "all" : zone.toLowerCase()}|${bandKey}`] || null;
+  };
+  const tableList = (cell, mode) => {
+    // ranghi nell'ordine del modo -> card della pagina, decodificati alla prima richiesta
+    if (!cell[mode]) return null;
+    const key = `_${mode}`;
+    if (!cell[key]) {
+      const ord = mode === "featured" ? null : table.orders[mode];
+      let r = 0;
+      cell[key] = cell[mode].map((g) => {
+        r += g;
+        return table.cardOf[ord ? ord[r] : r];
+      });
+    }
+    return cell[key];
   };
 
-  // Click sulle fasce
-  optionCards.forEach((btn) => {
-    btn.addEventListener("click", () => {
-      const min = parseIntSafe(btn.getAttribute("data-min"));
-      const max = parseIntSafe(btn.getAttribute("data-max"));
-      if (min == null || max == null) return;
+  // numeri sui chip: dalla tabella; con una ricerca (o senza tabella) dai bitset
+  const countFor = (zone, bandKey, hits) => {
+    const cell = hits ? undefined : tableCell(zone, bandKey);
+    if (cell !== undefined) return cell ? cell.n : 0;
+    const bits = facetBits(zone, bandKey);
+    if (hits) bitsetAnd(bits, hits);
+    return bitsetCount(bits);
+  };
+  const setChipCount = (chip, count) => {
+    let span = chip.querySelector(".chip__count");
+    if (!span) {
+      span = document.createElement("span");
+      span.className = "chip__count";
+      chip.appendChild(span);
+    }
+    if (span.textContent !== String(count)) span.textContent = String(count);
+    chip.classList.toggle("is-empty", count === 0);
+  };
+
+  // ricerca sull'indice prebuilt; finché non c'è (o se la pagina è aperta
+  // da file://, dove fetch non va) si ripiega sul testo delle card
+  let index = null;
+  let indexPostings = null;
+  const searchHits = (query) => {
+    const words = searchWords(query);
+    if (!words.length) return null;
+    if (index) return searchIndexQuery(index, indexPostings, words, n);
+    const bits = bitsetNew(n);
+    for (let i = 0; i < n; i++) {
+      if (texts[i] == null) texts[i] = foldText(`${names[i]} ${zoneNames[zoneOf[i]]} ${cardText(i)}`);
+      if (words.every((w) => texts[i].includes(w))) bitsetAdd(bits, i);
+    }
+    return bits;
+  };
 
-      // toggle: clicchi la stessa -> reset
-      if (activeRange && activeRange.min === min && activeRange.max === max) {
-        activeRange = null;
-        setActiveOption(null);
+  const setCardVisible = (i, on) => {
+    // animazione (leggera); il timer di una transizione a metà si annulla
+    const el = els[i];
+    window.clearTimeout(timers[i]);
+    if (on) {
+      el.classList.remove("is-gone");
+      requestAnimationFrame(() => el.classList.remove("is-hidden"));
+    } else {
+      el.classList.add("is-hidden");
+      timers[i] = window.setTimeout(() => el.classList.add("is-gone"), 220);
+    }
+  };
+
+  // ordinamenti: chiavi calcolate una volta, permutazione in cache per modo
+  const orders = new Map();
+  const zoneRank = new Uint16Array(zoneNames.length);
+  zoneNames.map((z, id) => id).sort((a, b) => compareText(zoneNames[a], zoneNames[b]))
+    .forEach((id, rank) => { zoneRank[id] = rank; });
+  const by = {
+    "guests-asc": (a, b) => (guests[a] || 999) - (guests[b] || 999),
+    "guests-desc": (a, b) => guests[b] - guests[a],
+    "zone-asc": (a, b) => zoneRank[zoneOf[a]] - zoneRank[zoneOf[b]],
+    "name-asc": (a, b) => compareText(names[a], names[b])
+  };
+  const order = (mode) => {
+    if (!orders.has(mode)) {
+      const cmp = by[mode];
+      // "featured": l'ordine dell'HTML
+      const idx = Array.from({ length: n }, (_, i) => i);
+      if (cmp) idx.sort((a, b) => cmp(a, b) || a - b);
+      orders.set(mode, idx);
+    }
+    return orders.get(mode);
+  };
+
+  const reorder = () => {
+    const frag = document.createDocumentFragment();
+    order(state.sort).forEach((i) => frag.appendChild(els[i]));
+    cardsGrid.appendChild(frag);
+  };
+
+  const summary = (shown) => {
+    const parts = [`Mostro ${shown} case su ${n}`];
+    if (state.guests !== "all") parts.push(`Ospiti: ${state.guests}`);
+    if (state.zone !== "all") parts.push(`Zona: ${state.zone}`);
+    if (state.query) parts.push(`Ricerca: "${state.query}"`);
+    return parts.join(" • ");
+  };
+
+  // card visibili ora, come bitset: il render tocca solo i bit che cambiano
+  const visible = ALL.slice();
+
+  // unico punto che tocca il DOM: solo quello che è cambiato rispetto a prev
+  const render = (prev) => {
+    const filtered = !prev || prev.guests !== state.guests || prev.zone !== state.zone || prev.query !== state.query;
+    if (filtered) {
+      const hits = searchHits(state.query);
+      const cell = hits ? undefined : tableCell(state.zone, state.guests);
+      let want;
+      if (cell !== undefined) {
+        want = bitsetNew(n);
+        if (cell) tableList(cell, "featured").forEach((i) => bitsetAdd(want, i));
       } else {
-        activeRange = { min, max };
-        setActiveOption(btn);
+        want = facetBits(state.zone, state.guests);
+        if (hits) bitsetAnd(want, hits);
       }
 
-      apply();
-      // scroll morbido alla griglia
-      const target = document.getElementById("case");
-      if (target) target.scrollIntoView({ behavior: prefersReducedMotion() ? "auto" : "smooth", block: "start" });
-    });
-  });
+      for (let w = 0; w < want.length && !virtual; w++) {
+        let flip = want[w] ^ visible[w];
+        while (flip) {
+          const low = flip & -flip;
+          setCardVisible((w << 5) + 31 - Math.clz32(low), (want[w] & low) !== 0);
+          flip ^= low;
+        }
+      }
+      visible.set(want);
 
-  // Mostra tutte
-  if (btnShowAll) {
-    btnShowAll.addEventListener("click", () => {
-      activeRange = null;
-      searchTerm = "";
-      if (searchInput) searchInput.value = "";
-      setActiveOption(null);
-      apply();
-    });
-  }
+      if (guestChips) guestChips.querySelectorAll("[data-guest]").forEach((b) => setChipCount(b, countFor(state.zone, b.dataset.guest, hits)));
+      if (zoneChips) zoneChips.querySelectorAll("[data-zone]").forEach((b) => setChipCount(b, countFor(b.dataset.zone, state.guests, hits)));
+    }
+    if (virtual && (filtered || prev.sort !== state.sort)) {
+      // la finestra si rifà sulla lista nuova: dalla tabella se c'è, già in ordine
+      const cell = state.query ? undefined : tableCell(state.zone, state.guests);
+      const fromTable = cell === null ? [] : cell ? tableList(cell, state.sort) : null;
+      virtual.show(fromTable || order(state.sort).filter((i) => bitsetHas(visible, i)));
+    } else if (prev && prev.sort !== state.sort) {
+      reorder();
+    }
+
+    const shown = bitsetCount(visible);
+    const text = summary(shown);
+    metas.forEach((m) => { if (m.textContent !== text) m.textContent = text; });
+    if (empty) empty.style.display = shown === 0 ? "" : "none";
+    if (btnShowAll) btnShowAll.hidden = state.guests === "all" && state.zone === "all" && !state.query;
 
-  // Search
-  if (searchInput) {
-    let t = null;
-    searchInput.addEventListener("input", () => {
-      window.clearTimeout(t);
-      t = window.setTimeout(() => {
-        searchTerm = safeText(searchInput.value).toLowerCase();
-        apply();
-      }, 80);
+    optionCards.forEach((b) => {
+      const on = guestKey(parseIntSafe(b.getAttribute("data-min")), parseIntSafe(b.getAttribute("data-max"))) === state.guests;
+      b.classList.toggle("is-active", on);
+      b.setAttribute("aria-pressed", on ? "true" : "false");
     });
-  }
+    if (guestChips) guestChips.querySelectorAll(".chip").forEach((b) => b.classList.toggle("is-active", b.dataset.guest === state.guests));
+    if (zoneChips) zoneChips.querySelectorAll(".chip").forEach((b) => b.classList.toggle("is-active", b.dataset.zone === state.zone));
+    sortSelects.forEach((s) => {
+      const v = Array.from(s.options).find((o) => (SORT_ALIASES[o.value] || o.value) === state.sort);
+      if (v && s.value !== v.value) s.value = v.value;
+    });
+    if (searchInput && safeText(searchInput.value).toLowerCase() !== state.query) searchInput.value = state.query;
+  };
 
-  // Sorting
-  const sortCards = (mode) => {
-    const list = Array.from(cardsGrid.querySelectorAll(".property-card"));
+  const set = (patch) => {
+    const prev = state;
+    state = { ...state, ...patch };
+    if (Object.keys(state).every((k) => state[k] === prev[k])) return false;
+    render(prev);
+    return true;
+  };
 
-    const by = {
-      "featured": () => 0,
-      "guests-asc": (a, b) => (getGuests(a) ?? 999) - (getGuests(b) ?? 999),
-      "guests-desc": (a, b) => (getGuests(b) ?? -1) - (getGuests(a) ?? -1),
-      "zone-asc": (a, b) => getZone(a).localeCompare(getZone(b), "it", { sensitivity: "base" }),
-      "name-asc": (a, b) => getName(a).localeCompare(getName(b), "it", { sensitivity: "base" })
-    };
+  let searchTimer = null;
+  const dispatch = (e) => {
+    const t = e.target;
+    if (!(t instanceof Element)) return;
 
-    if (!by[mode] || mode === "featured") {
-      // non riordina: mantiene l'ordine in HTML
+    if (e.type === "input") {
+      if (t !== searchInput) return;
+      window.clearTimeout(searchTimer);
+      searchTimer = window.setTimeout(() => set({ query: safeText(searchInput.value).toLowerCase() }), 80);
+      return;
+    }
+    if (e.type === "change") {
+      if (sortSelects.includes(t)) set({ sort: SORT_ALIASES[t.value] || t.value });
       return;
     }
 
-    list.sort(by[mode]);
-    const frag = document.createDocumentFragment();
-    list.forEach((el) => frag.appendChild(el));
-    cardsGrid.appendChild(frag);
+    const el = t.closest(".option-card, #cbGuests [data-guest], #cbZones [data-zone], #cbReset, #btnShowAll");
+    if (!el) return;
+    if (el.matches(".option-card")) {
+      const min = parseIntSafe(el.getAttribute("data-min"));
+      const max = parseIntSafe(el.getAttribute("data-max"));
+      if (min == null || max == null) return;
+      // toggle: clicchi la stessa -> tutte le fasce
+      const key = guestKey(min, max);
+      set({ guests: state.guests === key ? "all" : key });
+      // scroll morbido alla griglia
+      const target = document.getElementById("case");
+      if (target) target.scrollIntoView({ behavior: prefersReducedMotion() ? "auto" : "smooth", block: "start" });
+    } else if (el.dataset.guest) {
+      set({ guests: el.dataset.guest });
+    } else if (el.dataset.zone) {
+      set({ zone: el.dataset.zone });
+    } else {
+      // reset dei filtri; l'ordinamento resta quello scelto
+      window.clearTimeout(searchTimer);
+      set({ guests: DEFAULTS.guests, zone: DEFAULTS.zone, query: DEFAULTS.query });
+    }
   };
 
-  if (sortSelect) {
-    sortSelect.addEventListener("change", () => {
-      sortCards(sortSelect.value);
-      // dopo riordino, riapplica per mantenere le classi corrette
-      apply();
-    });
-  }
+  ["click", "input", "change"].forEach((type) => document.addEventListener(type, dispatch));
+
+  // primo render: solo testi e controlli, le card sono già tutte visibili
+  render(null);
 
-  // primo pass
-  apply();
+  loadSearchIndex().then((idx) => {
+    if (!idx) return;
+    // posizioni dell'indice -> card di questa pagina (per slug)
+    const cardOf = idx.ids.map((slug) => (slotOf.has(slug) ? slotOf.get(slug) : -1));
+    indexPostings = idx.postings.map((list) => list.map((k) => cardOf[k]).filter((i) => i >= 0));
+    index = idx;
+    // una ricerca scritta prima che l'indice arrivasse si rifà sull'indice
+    if (state.query) render({ ...state, query: null });
+  });
+
+  loadFacets().then((t) => {
+    // la tabella vale solo se parla delle stesse case della pagina
+    if (!t || t.ids.length !== n || !t.ids.every((slug) => slotOf.has(slug))) return;
+    t.cardOf = t.ids.map((slug) => slotOf.get(slug));
+    table = t;
+    render({ ...state, guests: null });
+  });
 }
 
 function init() {
@@ -325,8 +769,9 @@ function init() {
   initWhatsAppLinks();
   initRequestForm();
   initCardsClickthrough();
+  // prima dei reveal: con la griglia virtuale le card staccate non vanno osservate
+  initFilters();
   initRevealAnimations();
-  initFiltersAndSearch();
 }
 
 document.addEventListener("DOMContentLoaded", init);
@@ -400,6 +845,16 @@ window.buildWhatsAppLink = buildWhatsAppLink;
     let i = 0;
     function openAt(idx){
       i = (idx + imgs.length) % imgs.length;
+      // varianti grandi per la lightbox (data-lb-srcset, da image_variants.py),
+      // nel formato che il browser ha già scelto per la foto (AVIF/WebP/JPEG)
+      const full = imgs[i].getAttribute("data-lb-srcset");
+      if(full){
+        const fmt = ((imgs[i].currentSrc || "").match(/-\d+w\.(avif|webp)$/) || [])[1];
+        imgEl.srcset = fmt ? full.replace(/-(\d+)w\.jpg\b/g, `-$1w.${fmt}`) : full;
+        imgEl.sizes = imgs[i].getAttribute("data-lb-sizes") || "100vw";
+      } else {
+        imgEl.removeAttribute("srcset");
+      }
       imgEl.src = imgs[i].getAttribute("src");
       imgEl.alt = imgs[i].alt || "Foto";
       lb.classList.add("open");
@@ -480,193 +935,3 @@ window.buildWhatsAppLink = buildWhatsAppLink;
     io.observe(footer);
   }
 })();
-
-
-// === CLEAN_FILTERS_V3:JS ===
-(function(){
-  function norm(s){ return (s||"").toString().trim(); }
-  function cardsWrap(){ return document.querySelector(".cards"); }
-  function cards(){ return Array.from(document.querySelectorAll(".card")); }
-
-  function parseGuestsFromCard(card){
-    var d = card.dataset.guests;
-    if(d) return parseInt(d,10);
-    var t = card.textContent || "";
-    var m = t.match(/(\d{1,2})\s*osp/i) || t.match(/(\d{1,2})\s*ospiti/i);
-    return m ? parseInt(m[1],10) : 0;
-  }
-
-  function parseZoneFromCard(card){
-    var d = card.dataset.zone;
-    if(d) return norm(d);
-    var t = card.textContent || "";
-    // prova a prendere Baia Verde / Gallipoli ecc. se presenti
-    var zones = ["Baia Verde","Gallipoli","Lido San Giovanni","Centro","Rivabella","Alezio"];
-    for(var i=0;i<zones.length;i++){ if(t.toLowerCase().includes(zones[i].toLowerCase())) return zones[i]; }
-    // fallback: cerca dopo 📍
-    var m = t.match(/📍\s*([^\n•]+)/);
-    return m ? norm(m[1]) : "";
-  }
-
-  function uniqueZones(){
-    var set = new Set();
-    cards().forEach(function(c){
-      var z = parseZoneFromCard(c);
-      if(z) set.add(z);
-      c.dataset.zone = z; // normalizza
-      c.dataset.guests = String(parseGuestsFromCard(c)); // normalizza
-    });
-    return Array.from(set).sort(function(a,b){ return a.localeCompare(b); });
-  }
-
-  function populateZones(){
-    var wrap = document.getElementById("cbZones");
-    if(!wrap) return;
-    wrap.querySelectorAll('[data-zone]:not([data-zone="all"])').forEach(function(n){ n.remove(); });
-    uniqueZones().forEach(function(z){
-      var b = document.createElement("button");
-      b.type="button";
-      b.className="chip";
-      b.dataset.zone=z;
-      b.textContent=z;
-      wrap.appendChild(b);
-    });
-  }
-
-  function parseRange(v){
-    if(!v || v==="all") return {min:0,max:99};
-    if(v==="12+") return {min:12,max:99};
-    var m = v.match(/(\d+)\s*[-–]\s*(\d+)/);
-    if(m) return {min:parseInt(m[1],10), max:parseInt(m[2],10)};
-    return {min:0,max:99};
-  }
-
-  function setActive(containerId, attr, value){
-    var wrap = document.getElementById(containerId);
-    if(!wrap) return;
-    wrap.querySelectorAll(".chip").forEach(function(b){
-      b.classList.toggle("is-active", b.dataset[attr] === value);
-    });
-  }
-
-  function applyFilters(state){
-    var guest = state.guest || "all";
-    var zone  = state.zone  || "all";
-    var r = parseRange(guest);
-
-    var visible = 0;
-    cards().forEach(function(c){
-      var g = parseInt(c.dataset.guests || "0", 10);
-      var z = norm(c.dataset.zone);
-      var okG = (guest==="all") ? true : (g>=r.min && g<=r.max);
-      var okZ = (zone==="all")  ? true : (z.toLowerCase() === norm(zone).toLowerCase());
-      var ok = okG && okZ;
-      c.style.display = ok ? "" : "none";
-      if(ok) visible++;
-    });
-
-    var cnt = document.getElementById("cbCount");
-    var empty = document.getElementById("cbEmpty");
-    if(cnt){
-      var parts = [];
-      parts.push("Mostro " + visible + " case");
-      if(zone!=="all") parts.push("Zona: " + zone);
-      if(guest!=="all") parts.push("Ospiti: " + guest);
-      cnt.textContent = parts.join(" • ");
-    }
-    if(empty) empty.style.display = (visible===0) ? "" : "none";
-
-    setActive("cbGuests","guest",guest);
-    setActive("cbZones","zone",zone);
-  }
-
-  function setupSort(){
-    var sel = document.getElementById("cbSort");
-    var wrap = cardsWrap();
-    if(!sel || !wrap) return;
-
-    // salva ordine originale
-    var original = Array.from(wrap.children);
-    original.forEach(function(el, i){ el.dataset.orig = String(i); });
-
-    function sortNow(mode){
-      var items = Array.from(wrap.children);
-      function guests(el){ return parseInt(el.dataset.guests||"0",10); }
-      function zone(el){ return norm(el.dataset.zone).toLowerCase(); }
-      function orig(el){ return parseInt(el.dataset.orig||"0",10); }
-
-      if(mode==="default") items.sort(function(a,b){ return orig(a)-orig(b); });
-      if(mode==="guestsAsc") items.sort(function(a,b){ return guests(a)-guests(b) || orig(a)-orig(b); });
-      if(mode==="guestsDesc") items.sort(function(a,b){ return guests(b)-guests(a) || orig(a)-orig(b); });
-      if(mode==="zoneAZ") items.sort(function(a,b){ return zone(a).localeCompare(zone(b)) || orig(a)-orig(b); });
-
-      items.forEach(function(el){ wrap.appendChild(el); });
-    }
-
-    sel.addEventListener("change", function(){ sortNow(sel.value); });
-    sortNow("default");
-  }
-
-  function makeCardsClickable(){
-    document.addEventListener("click", function(e){
-      var card = e.target.closest(".card");
-      if(!card) return;
-      if(e.target.closest("a,button,select,textarea,input")) return;
-
-      var link = card.querySelector('a[href*="case/"]');
-      if(link) window.location.href = link.getAttribute("href");
-    });
-  }
-
-  function hideLegacyToolbar(){
-    // Cerca l'heading "Case consigliate" e nasconde il box che lo contiene
-    var headings = Array.from(document.querySelectorAll("h1,h2,h3,h4,p,strong"));
-    var h = headings.find(function(x){ return norm(x.textContent).toLowerCase() === "case consigliate"; });
-    if(!h) return;
-
-    var box = h.closest("div");
-    // sali finché trovi un box che contiene input+select (toolbar)
-    for(var i=0;i<4 && box; i++) {
-      var hasInput = !!box.querySelector('input[placeholder*="Cerca"]');
-      var hasSelect = !!box.querySelector("select");
-      var hasCards = box.querySelectorAll(".card").length > 0;
-      if(hasInput && hasSelect && !hasCards) break;
-      box = box.parentElement;
-    }
-    if(box) box.classList.add("legacyHide");
-  }
-
-  function removeDuplicateBars(){
-    var bars = Array.from(document.querySelectorAll("#caseBar"));
-    if(bars.length <= 1) return;
-    // tieni l'ultimo (di solito è quello vicino alle cards)
-    for(var i=0;i<bars.length-1;i++) bars[i].remove();
-  }
-
-  document.addEventListener("DOMContentLoaded", function(){
-    hideLegacyToolbar();
-    removeDuplicateBars();
-    populateZones();
-    applyFilters({guest:"all", zone:"all"});
-    setupSort();
-    makeCardsClickable();
-
-    var reset = document.getElementById("cbReset");
-    if(reset) reset.addEventListener("click", function(){ applyFilters({guest:"all", zone:"all"}); });
-  });
-
-  document.addEventListener("click", function(e){
-    var chip = e.target.closest(".chip");
-    if(!chip) return;
-
-    var gActive = document.querySelector("#cbGuests .chip.is-active")?.dataset.guest || "all";
-    var zActive = document.querySelector("#cbZones .chip.is-active")?.dataset.zone || "all";
-
-    var next = { guest: gActive, zone: zActive };
-    if(chip.dataset.guest) next.guest = chip.dataset.guest;
-    if(chip.dataset.zone)  next.zone  = chip.dataset.zone;
-
-    applyFilters(next);
-  });
-})();
-
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Indice di ricerca delle case — Salento Stay
+
+- bulk_fix.py scrive search-index.json insieme alla home: per ogni parola
+  di nome, zona, ospiti e hint (i servizi: piscina, parcheggio, ...) le
+  case che la contengono
+- Parole normalizzate: minuscole e senza accenti ("Città" = "citta"),
+  le stesse regole di foldText() in script.js
+- Formato compatto: ids = slug delle case nell'ordine delle card,
+  terms = parole in ordine alfabetico, postings[i] = posizioni in ids
+  delle case con terms[i], scritte come differenze dalla precedente
+- Il client non legge il testo delle card: ogni parola della ricerca è un
+  prefisso (ricerca binaria su terms), le liste si uniscono per prefisso
+  e si intersecano tra le parole
+
+Run:
+  python3 search_index.py build
+  python3 search_index.py query "villa pisc"
+"""
+
+import bisect
+import json
+import re
+import sys
+import unicodedata
+from pathlib import Path
+
+import catalog
+from site_io import OutputTxn
+
+ROOT = Path(".").resolve()
+SEARCH_INDEX = ROOT / "search-index.json"
+
+# cambia se cambia il formato: bulk_fix lo mette nella chiave della home
+VERSION = 1
+
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    # NFKD separa le lettere dagli accenti, poi gli accenti si buttano
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def tokens(text: str):
+    return WORD.findall(fold(text))
+
+
+def prop_words(prop):
+    """Le parole con cui si trova una casa: quelle che la card mostra."""
+    return set(tokens(f"{prop['name']} {prop['loc']} {prop['guests']} ospiti {prop['hint']}"))
+
+
+def build(props) -> dict:
+    ids, posting = [], {}
+    for n, prop in enumerate(props):
+        ids.append(prop["slug"])
+        for w in prop_words(prop):
+            posting.setdefault(w, []).append(n)
+    terms = sorted(posting)
+    postings = []
+    for t in terms:
+        gaps, last = [], 0
+        for n in posting[t]:
+            gaps.append(n - last)
+            last = n
+        postings.append(gaps)
+    return {"v": VERSION, "ids": ids, "terms": terms, "postings": postings}
+
+
+def dumps(index: dict) -> str:
+    return json.dumps(index, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode(index: dict):
+    """postings a differenze -> posizioni assolute (come fa il client al caricamento)."""
+    out = []
+    for gaps in index["postings"]:
+        n, ids = 0, []
+        for g in gaps:
+            n += g
+            ids.append(n)
+        out.append(ids)
+    return out
+
+
+def query(index: dict, text: str, postings=None):
+    """Slug delle case con tutte le parole di text (ognuna come prefisso)."""
+    postings = postings or decode(index)
+    terms = index["terms"]
+    hits = None
+    for word in tokens(text):
+        found = set()
+        k = bisect.bisect_left(terms, word)
+        while k < len(terms) and terms[k].startswith(word):
+            found.update(postings[k])
+            k += 1
+        hits = found if hits is None else hits & found
+        if not hits:
+            return []
+    if hits is None:
+        return list(index["ids"])
+    return [index["ids"][n] for n in sorted(hits)]
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    if cmd == "build":
+        conn = catalog.connect()
+        if catalog.CATALOG_FILE.exists():
+            catalog.sync_file(conn)
+        index = build(catalog.iter_props(conn))
+        with OutputTxn() as out:
+            out.write_text(SEARCH_INDEX, dumps(index))
+        print(f"✅ {SEARCH_INDEX.name}: {len(index['ids'])} case, {len(index['terms'])} parole, "
+              f"{SEARCH_INDEX.stat().st_size / 1024:.1f} KB.")
+    elif cmd == "query" and len(sys.argv) > 2:
+        if not SEARCH_INDEX.exists():
+            raise SystemExit(f"❌ Manca {SEARCH_INDEX.name} (python3 search_index.py build)")
+        index = json.loads(SEARCH_INDEX.read_text(encoding="utf-8"))
+        found = query(index, " ".join(sys.argv[2:]))
+        for slug in found:
+            print(f"  {slug}")
+        print(f"✅ {len(found)} case.")
+    else:
+        print(__doc__.split("Run:", 1)[1].rstrip())
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
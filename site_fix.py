@@ -1,11 +1,15 @@
 from pathlib import Path
 import re
 
+from patch_runner import Pass, run
+
 ROOT = Path(".").resolve()
 INDEX = ROOT / "index.html"
 CSS = ROOT / "styles.css"
 PRIVACY = ROOT / "privacy.html"
-FILTER_JS = ROOT / "filter.js"
+
+GUESTS = re.compile(r"👥\s*(\d+)\s*ospiti", re.I)
+FILTER_JS = re.compile(r"/?filter\.js", re.I)
 
 PRIVACY_HTML = """<!doctype html>
 <html lang="it">
@@ -13,7 +17,7 @@ PRIVACY_HTML = """<!doctype html>
   <meta charset="utf-8" />
   <meta name="viewport" content="width=device-width, initial-scale=1" />
   <title>Privacy Policy | Salento Stay</title>
-  <link rel="stylesheet" href="/styles.css" />
+  <link rel="stylesheet" href="/styles.min.css" />
 </head>
 <body>
   <header class="topbar">
@@ -55,93 +59,10 @@ PRIVACY_HTML = """<!doctype html>
   </footer>
 
   <script src="/script.js"></script>
-  <script src="/filter.js"></script>
 </body>
 </html>
 """
 
-FILTER_JS_TEXT = r"""document.addEventListener("DOMContentLoaded", () => {
-  const grid = document.getElementById("propertyGrid");
-  if (!grid) return;
-
-  const cards = Array.from(grid.querySelectorAll("article"));
-
-  function parseGuestsFromText(card) {
-    const txt = card.textContent || "";
-    const m = txt.match(/👥\s*(\d+)\s*ospiti/i);
-    return m ? parseInt(m[1], 10) : null;
-  }
-
-  function getGuests(card) {
-    const v = card.getAttribute("data-guests");
-    if (v) return parseInt(v, 10);
-    return parseGuestsFromText(card);
-  }
-
-  function getDetailsHref(card) {
-    const a = card.querySelector("a.link[href]");
-    if (a) return a.getAttribute("href");
-    const any = card.querySelector("a[href]");
-    return any ? any.getAttribute("href") : null;
-  }
-
-  // Foto cliccabile (stesso link di "Vedi dettagli" se esiste e non è #anchor)
-  cards.forEach(card => {
-    const img = card.querySelector("img");
-    const href = getDetailsHref(card);
-    if (!img || !href) return;
-    if (href.startsWith("#")) return;
-
-    img.style.cursor = "pointer";
-    img.addEventListener("click", () => window.location.href = href);
-  });
-
-  // UI filtro (se già esiste), altrimenti la creiamo sopra la griglia
-  let filterBar = document.getElementById("guestsFilterBar");
-  if (!filterBar) {
-    filterBar = document.createElement("div");
-    filterBar.className = "filterbar";
-    filterBar.id = "guestsFilterBar";
-    filterBar.innerHTML = `
-      <button class="btn btn--ghost" data-filter="all">Tutti</button>
-      <button class="btn btn--ghost" data-filter="1-4">1–4 posti</button>
-      <button class="btn btn--ghost" data-filter="5-6">5–6 posti</button>
-      <button class="btn btn--ghost" data-filter="7-8">7–8 posti</button>
-      <button class="btn btn--ghost" data-filter="9+">9+ posti</button>
-    `;
-    grid.parentElement.insertBefore(filterBar, grid);
-  }
-
-  function matchesRule(g, rule) {
-    if (!g) return rule === "all";
-    if (rule === "all") return True;
-    if (rule === "1-4") return g >= 1 && g <= 4;
-    if (rule === "5-6") return g >= 5 && g <= 6;
-    if (rule === "7-8") return g >= 7 && g <= 8;
-    if (rule === "9+") return g >= 9;
-    return true;
-  }
-
-  function applyFilter(rule) {
-    cards.forEach(card => {
-      const g = getGuests(card);
-      let show = true;
-      if (rule === "all") show = true;
-      else if (rule === "1-4") show = g >= 1 && g <= 4;
-      else if (rule === "5-6") show = g >= 5 && g <= 6;
-      else if (rule === "7-8") show = g >= 7 && g <= 8;
-      else if (rule === "9+") show = g >= 9;
-
-      card.classList.toggle("is-hidden", !show);
-    });
-  }
-
-  filterBar.querySelectorAll("[data-filter]").forEach(btn => {
-    btn.addEventListener("click", () => applyFilter(btn.dataset.filter));
-  });
-});
-"""
-
 CSS_APPEND = """
 /* --- Guests filter bar + animazioni filtro --- */
 .filterbar{
@@ -165,54 +86,58 @@ article.card, article.property-card, #propertyGrid article{
 }
 """
 
-def ensure_privacy():
-  PRIVACY.write_text(PRIVACY_HTML, encoding="utf-8")
+def privacy_page(html: str) -> str:
+  # solo se manca: la privacy.html curata (footer, testi) non si tocca
+  return html if html.strip() else PRIVACY_HTML
 
-def patch_footer_privacy(index_html: str) -> str:
-  if "/privacy.html" in index_html:
-    return index_html
-  # Prova a inserirlo nel blocco footer__links
-  m = re.search(r'(<div\s+class="footer__links"\s*>)', index_html)
-  if not m:
-    return index_html
-  insert = m.group(1) + '\n        <a href="/privacy.html">Privacy Policy</a>'
-  return index_html.replace(m.group(1), insert, 1)
+def footer_privacy(eng):
+  # link alla privacy nel blocco footer__links, se la pagina non ce l'ha già
+  def on_href(tag, value, doc):
+    doc.state["privacy_link"] = True
 
-def ensure_filter_js_include(index_html: str) -> str:
-  if 'src="/filter.js"' in index_html or "src='/filter.js'" in index_html:
-    return index_html
-  # Inserisci prima di </body>
-  return re.sub(r"</body>", '  <script src="/filter.js"></script>\n</body>', index_html, count=1, flags=re.I)
+  def patch(pieces, doc):
+    if doc.state.get("privacy_link"):
+      return pieces
+    return [pieces[0], '\n        <a href="/privacy.html">Privacy Policy</a>', *pieces[1:]]
 
-def add_data_guests(index_html: str) -> str:
-  # Aggiunge data-guests="X" a ogni <article ...> leggendo "👥 X ospiti" nel contenuto
-  def repl(match):
-    open_tag = match.group(1)
-    inner = match.group(2)
+  def on_div(tag, doc):
+    if tag.get("class") == "footer__links" and not doc.state.get("privacy_link"):
+      doc.capture(tag, patch)
 
-    gm = re.search(r"👥\s*(\d+)\s*ospiti", inner, flags=re.I)
-    if not gm:
-      return match.group(0)
+  eng.on_attr("href", on_href, contains="/privacy.html")
+  eng.on_start("div", on_div)
 
-    guests = gm.group(1)
+def drop_filter_js(eng):
+  # filter.js era un terzo motore di filtri (su #propertyGrid): ora i filtri
+  # sono tutti in script.js, l'include si toglie
+  def on_src(tag, value, doc):
+    if tag.name == "script" and FILTER_JS.fullmatch(value):
+      doc.drop(lambda kind, raw, name: kind == "end" and name == "script",
+               inclusive=True, tags=("script",), line=True)
 
-    if re.search(r'\bdata-guests\s*=\s*"', open_tag):
-      open_tag2 = re.sub(r'\bdata-guests\s*=\s*"\d+"', f'data-guests="{guests}"', open_tag)
-    else:
-      open_tag2 = open_tag[:-1] + f' data-guests="{guests}">'
+  eng.on_attr("src", on_src, contains="filter.js")
 
-    return open_tag2 + inner + "</article>"
+def data_guests(eng):
+  # data-guests="X" su ogni <article ...> leggendo "👥 X ospiti" nel contenuto
+  def patch(pieces, doc):
+    gm = GUESTS.search("".join(map(str, pieces[1:])))
+    if gm and pieces[0].get("data-guests") != gm.group(1):
+      pieces[0].set("data-guests", gm.group(1))
+    return pieces
 
-  return re.sub(r"(<article\b[^>]*>)(.*?)</article>", repl, index_html, flags=re.S | re.I)
+  eng.on_start("article", lambda tag, doc: doc.capture(tag, patch))
 
-def ensure_filter_js_file():
-  FILTER_JS.write_text(FILTER_JS_TEXT, encoding="utf-8")
-
-def append_css():
-  css = CSS.read_text(encoding="utf-8")
+def append_css(css: str) -> str:
   if "Guests filter bar" in css or ".filterbar" in css:
-    return
-  CSS.write_text(css + "\n" + CSS_APPEND, encoding="utf-8")
+    return css
+  return css + "\n" + CSS_APPEND
+
+PASS = Pass(
+  "site_fix", "Guests filter bar",
+  files={"privacy": privacy_page, "css": append_css},
+  html={"index": (data_guests, footer_privacy, drop_filter_js)},
+  creates=("privacy",),
+)
 
 def main():
   if not INDEX.exists():
@@ -220,17 +145,9 @@ def main():
   if not CSS.exists():
     raise SystemExit("styles.css non trovato nella cartella corrente.")
 
-  ensure_privacy()
-  ensure_filter_js_file()
-  append_css()
-
-  html = INDEX.read_text(encoding="utf-8")
-  html = add_data_guests(html)
-  html = patch_footer_privacy(html)
-  html = ensure_filter_js_include(html)
-  INDEX.write_text(html, encoding="utf-8")
+  run([PASS], "site_fix")
 
-  print("OK: privacy.html creato, index patchato (privacy link + data-guests + filter.js), styles.css aggiornato, filter.js creato.")
+  print("OK: privacy.html creato (se mancava), index patchato (privacy link + data-guests), styles.css aggiornato.")
 
 if __name__ == "__main__":
   main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Output transazionale per build e patch — Salento Stay
+
+- Ogni file generato o patchato viene scritto prima in .staging/<run>/
+  (stesso filesystem del sito)
+- Al commit: UN solo sync per tutto il build, poi ogni file viene
+  pubblicato con os.replace (atomico): chi legge vede la versione vecchia
+  o quella nuova, mai un file a metà
+- Se lo script fallisce prima del commit, lo staging viene buttato e il
+  sito resta com'era
+
+Uso:
+    with OutputTxn() as out:
+        out.write_text(INDEX, html)
+"""
+
+import itertools
+import os
+import shutil
+import threading
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(".").resolve()
+
+# transazioni aperte da questo processo: due nello stesso secondo (il build
+# ne apre una anche per il CSS) non devono avere la stessa cartella
+_seq = itertools.count(1)
+
+
+class OutputTxn:
+    def __init__(self, root: Path = ROOT, prof=None):
+        self.root = root
+        self.prof = prof
+        self.dir = root / ".staging" / f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{next(_seq)}"
+        self.pending = {}  # destinazione -> file in staging
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def path(self, dst: Path) -> Path:
+        """File di staging per dst (per chi scrive in streaming)."""
+        dst = Path(dst).resolve()
+        with self.lock:
+            staged = self.pending.get(dst)
+            if staged is None:
+                self.count += 1
+                staged = self.dir / f"{self.count:06d}-{dst.name}"
+                self.pending[dst] = staged
+        staged.parent.mkdir(parents=True, exist_ok=True)
+        return staged
+
+    def write_text(self, dst: Path, s: str):
+        self.path(dst).write_text(s, encoding="utf-8")
+
+    def write_bytes(self, dst: Path, b: bytes):
+        self.path(dst).write_bytes(b)
+
+    def link(self, src: Path, dst: Path):
+        staged = self.path(dst)
+        staged.unlink(missing_ok=True)
+        try:
+            os.link(src, staged)
+        except OSError:
+            shutil.copyfile(src, staged)
+
+    def read_text(self, p: Path) -> str:
+        """Legge p come lo vedrà il sito dopo il commit (staging incluso)."""
+        staged = self.pending.get(Path(p).resolve())
+        return (staged or Path(p)).read_text(encoding="utf-8", errors="ignore")
+
+    def commit(self):
+        if not self.pending:
+            self.rollback()
+            return
+        with self.prof.stage("commit") if self.prof else nullcontext():
+            self._publish()
+
+    def _publish(self):
+        # un solo flush su disco per tutto il batch (fsync per file solo se os.sync manca)
+        if hasattr(os, "sync"):
+            os.sync()
+        else:
+            for staged in self.pending.values():
+                with staged.open("rb") as f:
+                    os.fsync(f.fileno())
+
+        dirs = set()
+        for dst, staged in self.pending.items():
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(staged, dst)
+            dirs.add(dst.parent)
+
+        # rende durevoli i rename (dove le directory si possono aprire)
+        for d in dirs:
+            try:
+                fd = os.open(d, os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.fsync(fd)
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+
+        self.pending.clear()
+        self.rollback()
+
+    def rollback(self):
+        self.pending.clear()
+        shutil.rmtree(self.dir, ignore_errors=True)
+        try:
+            self.dir.parent.rmdir()
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
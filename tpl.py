@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini template engine — Salento Stay
+
+- Template in templates/*.html con due sole regole:
+    {{ nome }}              valore escapato per HTML
+    {{ nome|raw }}          valore così com'è (HTML già pronto)
+    {% include "x.html" %}  partial (risolto una volta sola, in compilazione)
+- Ogni template viene letto e compilato UNA volta in una funzione Python;
+  la cache è per hash del sorgente (include compresi)
+- FragmentCache memorizza i pezzi già renderizzati per
+  (hash template, hash record): una casa invariata non si ri-renderizza
+"""
+
+import hashlib
+import html
+import re
+from collections import OrderedDict
+from pathlib import Path
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / "templates"
+
+TOKEN = re.compile(r'\{\{\s*(\w+)(\|raw)?\s*\}\}|\{%\s*include\s+"([^"]+)"\s*%\}')
+
+_compiled = {}  # hash -> Template
+_by_name = {}   # (nome, mtime_ns) -> Template
+
+
+class Template:
+    def __init__(self, name, source, digest, render):
+        self.name = name
+        self.source = source
+        self.digest = digest
+        self.render = render
+
+
+def _resolve(name: str, stack=()) -> str:
+    # inline degli include: il sorgente risolto è quello che conta per l'hash
+    if name in stack:
+        raise SystemExit(f"Include ricorsivo: {' -> '.join(stack + (name,))}")
+    text = (TEMPLATE_DIR / name).read_text(encoding="utf-8")
+    return TOKEN.sub(
+        lambda m: _resolve(m.group(3), stack + (name,)) if m.group(3) else m.group(0),
+        text,
+    )
+
+
+def _compile(name: str, source: str, digest: str) -> Template:
+    parts = []
+    pos = 0
+    for m in TOKEN.finditer(source):
+        if m.start() > pos:
+            parts.append(repr(source[pos:m.start()]))
+        key = m.group(1)
+        if m.group(2):
+            parts.append(f"str(ctx[{key!r}])")
+        else:
+            parts.append(f"_e(str(ctx[{key!r}]))")
+        pos = m.end()
+    if pos < len(source):
+        parts.append(repr(source[pos:]))
+
+    code = "def render(ctx):\n    return ''.join([" + ", ".join(parts) + "])\n"
+    env = {"_e": html.escape}
+    exec(compile(code, f"<template {name}>", "exec"), env)
+    return Template(name, source, digest, env["render"])
+
+
+def load(name: str) -> Template:
+    mtime = (TEMPLATE_DIR / name).stat().st_mtime_ns
+    tpl = _by_name.get((name, mtime))
+    if tpl:
+        return tpl
+    source = _resolve(name)
+    digest = hashlib.sha256(source.encode("utf-8")).hexdigest()
+    tpl = _compiled.get(digest)
+    if tpl is None:
+        tpl = _compiled[digest] = _compile(name, source, digest)
+    _by_name[(name, mtime)] = tpl
+    return tpl
+
+
+class FragmentCache:
+    """LRU in memoria, con un eventuale backing persistente (get / __setitem__)."""
+
+    def __init__(self, size=4096, backing=None):
+        self.size = size
+        self.backing = backing
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, tpl: Template, record_digest: str, ctx) -> str:
+        key = f"{tpl.digest}:{record_digest}"
+        out = self.items.get(key)
+        if out is None and self.backing is not None:
+            out = self.backing.get(key)
+        if out is None:
+            self.misses += 1
+            out = tpl.render(ctx)
+            if self.backing is not None:
+                self.backing[key] = out
+        else:
+            self.hits += 1
+        self.items[key] = out
+        self.items.move_to_end(key)
+        if len(self.items) > self.size:
+            self.items.popitem(last=False)
+        return out
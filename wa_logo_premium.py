@@ -1,17 +1,6 @@
-import re
-from pathlib import Path
-from datetime import datetime
-
-ROOT = Path(".")
-INDEX = ROOT / "index.html"
-CASE_DIR = ROOT / "case"
-CSS = ROOT / "styles.css"
-
-STAMP = datetime.now().strftime("%Y%m%d-%H%M%S")
-
-def backup(p: Path):
-    if p.exists():
-        p.with_suffix(p.suffix + f".bak-{STAMP}").write_text(p.read_text(encoding="utf-8"), encoding="utf-8")
+import tpl
+from html_stream import fab
+from patch_runner import Pass, run
 
 # WhatsApp logo SVG (Font Awesome style) - super riconoscibile e centrato
 WA_SVG = r'''
@@ -20,16 +9,6 @@ WA_SVG = r'''
 </svg>
 '''.strip()
 
-def replace_fab_inner(html: str) -> str:
-    # sostituisce l'interno del link waSticky con lo span+svg premium
-    pat = r'(<a[^>]*id="waSticky"[^>]*>)([\s\S]*?)(</a>)'
-    m = re.search(pat, html, flags=re.IGNORECASE)
-    if not m:
-        return html
-    start, end = m.group(1), m.group(3)
-    inner = f'\n  <span class="wa-fab__icon" aria-hidden="true">{WA_SVG}</span>\n'
-    return html[:m.start()] + start + inner + end + html[m.end():]
-
 def ensure_css_override(css: str) -> str:
     if "/* === WA FAB PREMIUM LOGO === */" in css:
         return css
@@ -67,24 +46,20 @@ def ensure_css_override(css: str) -> str:
 """
     return css + "\n" + block
 
-def process_html(p: Path):
-    backup(p)
-    html = p.read_text(encoding="utf-8")
-    html = replace_fab_inner(html)
-    p.write_text(html, encoding="utf-8")
+# sostituisce l'interno del link waSticky con lo span+svg premium: lo stesso
+# markup di templates/wa_icon.html, quello che scrive bulk_fix (così build
+# e runner non si riscrivono a vicenda il FAB)
+FAB = fab(icon=tpl.load("wa_icon.html").source)
 
-def main():
-    if INDEX.exists():
-        process_html(INDEX)
-
-    if CASE_DIR.exists():
-        for f in CASE_DIR.glob("*.html"):
-            process_html(f)
+# ultima delle pass del FAB: fab_refine e fix_fab_text rimettono le loro
+# icone, questa deve avere l'ultima parola
+PASS = Pass("wa_logo_premium", "WA FAB PREMIUM LOGO",
+            files={"css": ensure_css_override},
+            html={"index": (FAB,), "case": (FAB,)},
+            after=("fab_refine", "fix_fab_and_duplicates", "fix_whatsapp_mobile"))
 
-    if CSS.exists():
-        backup(CSS)
-        css = CSS.read_text(encoding="utf-8")
-        CSS.write_text(ensure_css_override(css), encoding="utf-8")
+def main():
+    run([PASS], "wa_logo_premium")
 
     print("✅ WhatsApp FAB: logo premium (SVG vero) + cerchio pulito (niente doppio bordo).")
 
@@ -1,18 +1,5 @@
-import re
-from pathlib import Path
-from datetime import datetime
-
-ROOT = Path(".")
-FILES = [ROOT/"index.html"]
-CASE_DIR = ROOT/"case"
-CSS = ROOT/"styles.css"
-
-STAMP = datetime.now().strftime("%Y%m%d-%H%M%S")
-
-def backup(p: Path):
-    if p.exists():
-        bp = p.with_suffix(p.suffix + f".bak-{STAMP}")
-        bp.write_text(p.read_text(encoding="utf-8"), encoding="utf-8")
+from html_stream import fab
+from patch_runner import Pass, run
 
 WA_SVG = r'''
 <svg class="wa-fab__svg" viewBox="0 0 32 32" aria-hidden="true" focusable="false">
@@ -62,39 +49,17 @@ def ensure_css(css: str) -> str:
 """
     return css + "\n" + block
 
-def replace_fab_inner(html: str) -> str:
-    # cerca il blocco waSticky e sostituisce il contenuto interno con SVG
-    # Manteniamo id/class/href ecc., sostituiamo solo i figli interni
-    pattern = r'(<a[^>]*id="waSticky"[^>]*>)([\s\S]*?)(</a>)'
-    m = re.search(pattern, html, flags=re.IGNORECASE)
-    if not m:
-        return html
+# sostituisce il contenuto interno di #waSticky con lo SVG (id/class/href restano)
+FAB = fab(icon=f'\n    <span class="wa-fab__icon" aria-hidden="true">{WA_SVG}</span>\n')
 
-    start, _, end = m.group(1), m.group(2), m.group(3)
-    new_inner = f'\n    <span class="wa-fab__icon" aria-hidden="true">{WA_SVG}</span>\n'
-    return html[:m.start()] + start + new_inner + end + html[m.end():]
-
-def process_html_file(p: Path):
-    backup(p)
-    html = p.read_text(encoding="utf-8")
-    html2 = replace_fab_inner(html)
-    p.write_text(html2, encoding="utf-8")
+# HTML: index + tutte le pagine in /case
+PASS = Pass("wa_svg_fix", "WA SVG FIX",
+            files={"css": ensure_css},
+            html={"index": (FAB,), "case": (FAB,)},
+            after=("pack_a",))
 
 def main():
-    # HTML: index + tutte le pagine in /case
-    for f in FILES:
-        if f.exists():
-            process_html_file(f)
-
-    if CASE_DIR.exists():
-        for f in CASE_DIR.glob("*.html"):
-            process_html_file(f)
-
-    # CSS
-    if CSS.exists():
-        backup(CSS)
-        css = CSS.read_text(encoding="utf-8")
-        CSS.write_text(ensure_css(css), encoding="utf-8")
+    run([PASS], "wa_svg_fix")
 
     print("✅ WhatsApp sticky aggiornato: SVG premium + cerchio icon-only (home + schede).")
     print("➡️ Test: python3 -m http.server 8000  →  http://localhost:8000")